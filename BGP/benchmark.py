@@ -0,0 +1,426 @@
+# benchmark.py
+
+# Benchmark suite for the BGP tooling, driven by synthetic data (synthetic.py).
+#
+# Stages:
+#   summary  - get_bgp_peers_summary() against a SyntheticDevice
+#   extract  - extract_routes_from_rpc() (extract_destinations_from_rib() for jxmlease)
+#   collect  - collect_routes() + collect_advertised_routes() against a SyntheticDevice
+#   diff     - parse + diff of a before/after snapshot pair, per diff engine
+#
+# Before the diff stage, every diff engine runs once on the snapshot pair and on its
+# binary conversion (binary_snapshot.py); all of them must print exactly what the dict
+# engine prints for the text files, or the run fails. The pair includes a route-less
+# peer section, like the ones a failed route RPC leaves behind.
+#
+# Each stage runs in its own forked process. A fork inherits the parent's memory
+# and high-water mark, so the peak is reset right before the timed part (Linux
+# clear_refs) and reported as the growth over the RSS the stage started with: the
+# memory the stage itself needed, without its inputs or the parent's history.
+# Results can be saved as JSON and compared with a previous run to spot regressions
+# before new versions go out to the collectors.
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic import SyntheticDevice, add_topology_arguments, topology_from_args
+
+
+STAGES = ("summary", "extract", "collect", "diff")
+XML_ENGINES = ("lxml", "jxmlease")
+DIFF_ENGINES = ("dict", "merge", "parallel", "numpy")
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        # VmHWM honours _reset_peak_rss(); ru_maxrss never goes down
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _reset_peak_rss():
+    """Lowers this process's peak RSS to its current RSS (Linux). Returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silences the collectors' per-peer status lines while a stage is timed."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# === Stages: setup() builds the inputs (untimed), run() does the work and returns items ===
+# Modules are imported in setup() too, so their import time isn't counted in run().
+
+def _setup_summary(topology, engine, context):
+    import route_collector  # noqa: F401
+    dev = SyntheticDevice(topology)
+    # Render the replies once so the timing covers parsing, not the generator
+    dev.rpc.get_bgp_summary_information()
+    dev.rpc.get_bgp_neighbor_information()
+    return dev
+
+
+def _run_summary(dev, engine):
+    from route_collector import get_bgp_peers_summary
+    with _quiet():
+        return len(get_bgp_peers_summary(dev, engine=engine))
+
+
+def _setup_extract(topology, engine, context):
+    import route_dump  # noqa: F401
+    from lxml import etree
+    parser = etree.XMLParser(huge_tree=True)
+    return [(etree.fromstring(topology.route_xml(peer), parser=parser), peer["table"]) for peer in topology.peers]
+
+
+def _run_extract(replies, engine):
+    from route_dump import extract_routes_from_rpc
+    return sum(extract_routes_from_rpc(element, table, engine)[1] for element, table in replies)
+
+
+def _setup_collect(topology, engine, context):
+    import route_dump  # noqa: F401
+    from route_collector import get_bgp_peers_summary
+    dev = SyntheticDevice(topology)
+    with _quiet():
+        peers = get_bgp_peers_summary(dev, engine=engine)
+    for peer in topology.peers:
+        dev.rpc.get_route_information(receive_protocol_name="bgp", peer=peer["address"], table=peer["table"])
+        dev.rpc.get_route_information(advertising_protocol_name="bgp", neighbor=peer["address"], table=peer["table"])
+    return dev, peers, topology, context["workdir"]
+
+
+def _run_collect(state, engine):
+    from route_dump import collect_routes, collect_advertised_routes
+    dev, peers, topology, workdir = state
+    with _quiet():
+        collect_routes(dev, peers, "bench", "run", engine=engine,
+                       filename=os.path.join(workdir, "bench-BGP-Routes-run.txt"))
+        collect_advertised_routes(dev, peers, "bench", "run", engine=engine,
+                                  filename=os.path.join(workdir, "bench-BGP-Advertised-Routes-run.txt"))
+    return len(peers) * (topology.route_count("received") + topology.route_count("advertised"))
+
+
+def _setup_diff(topology, engine, context):
+    import importlib
+    importlib.import_module({"dict": "diff_tool", "merge": "merge_diff", "parallel": "parallel_diff",
+                             "numpy": "vector_diff"}[engine])
+    import output_formatter  # noqa: F401
+    return context["before"], context["after"], context["diff_routes"]
+
+
+def _run_diff(state, engine):
+    before, after, routes = state
+    with open(os.devnull, "w") as devnull:
+        write = devnull.write
+        if engine == "dict":
+            from diff_tool import parse_routes, diff_routes
+            from output_formatter import TextSink
+            diff_routes(parse_routes(before), parse_routes(after), sink=TextSink(devnull))
+        elif engine == "merge":
+            from merge_diff import merge_diff
+            merge_diff(before, after, write=write)
+        elif engine == "parallel":
+            from parallel_diff import parallel_diff
+            parallel_diff(before, after, write=write)
+        elif engine == "numpy":
+            from vector_diff import vector_diff
+            vector_diff(before, after, write=write)
+    return routes
+
+
+def _diff_output(before, after, engine):
+    """Runs one diff engine in-process and returns everything it printed."""
+    import io
+    from output_formatter import TextSink
+
+    stream = io.StringIO()
+    sink = TextSink(stream)
+    if engine == "dict":
+        from diff_tool import load_routes, diff_routes
+        diff_routes(load_routes(before), load_routes(after), sink=sink)
+    elif engine == "merge":
+        from merge_diff import merge_diff
+        merge_diff(before, after, write=sink.line)
+    elif engine == "parallel":
+        from parallel_diff import parallel_diff
+        parallel_diff(before, after, write=sink.line)
+    elif engine == "numpy":
+        from vector_diff import vector_diff
+        vector_diff(before, after, write=sink.line)
+    sink.flush()
+    return stream.getvalue()
+
+
+def _append_failed_peer(path):
+    """Adds a route-less peer section, as route_dump writes one for a failed RPC."""
+    with open(path, "a") as f:
+        f.write("== Peer: 192.0.2.254 | Table: inet.0 | Routes: 0 ==\n")
+        f.write("\n--- RECEIVED ROUTES ---\n")
+        f.write("[!] Failed to get received routes for 192.0.2.254: benchmark\n")
+        f.write("=" * 60 + "\n\n")
+
+
+def check_diff_engines(context, engines):
+    """
+    Diffs the text snapshot pair and its binary conversion with every engine.
+
+    Returns:
+        List[dict]: One "check" result per engine and format, with an "error" key
+                    when the output differs from the dict engine on the text files.
+    """
+    from binary_snapshot import convert_text_snapshot
+
+    pairs = {"text": (context["before"], context["after"])}
+    binary = []
+    for path in pairs["text"]:
+        binary.append(os.path.splitext(path)[0] + ".bgps")
+        convert_text_snapshot(path, binary[-1])
+    pairs["binary"] = tuple(binary)
+
+    with _quiet():
+        expected = _diff_output(*pairs["text"], "dict")
+    results = []
+    for engine in engines:
+        for name, (before, after) in pairs.items():
+            result = {"stage": "check", "engine": f"{engine}/{name}"}
+            try:
+                with _quiet():
+                    output = _diff_output(before, after, engine)
+                if output != expected:
+                    result["error"] = "output differs from the dict engine on the text snapshots"
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+    return results
+
+
+_STAGE_FUNCS = {
+    "summary": (_setup_summary, _run_summary, "peers"),
+    "extract": (_setup_extract, _run_extract, "routes"),
+    "collect": (_setup_collect, _run_collect, "routes"),
+    "diff": (_setup_diff, _run_diff, "routes"),
+}
+
+
+def _measure(stage, topology, engine, context):
+    setup, run, unit = _STAGE_FUNCS[stage]
+    state = setup(topology, engine, context)
+    start_rss = _current_rss_mb()
+    peak_before = None if _reset_peak_rss() else _peak_rss_mb()
+    started = time.perf_counter()
+    items = run(state, engine)
+    seconds = time.perf_counter() - started
+    peak_rss = _peak_rss_mb()
+
+    stage_rss = None
+    if start_rss is not None and peak_rss is not None:
+        if peak_before is None:
+            stage_rss = round(max(0.0, peak_rss - start_rss), 1)
+        elif peak_rss > peak_before:
+            # No reset: only known when the stage pushed the inherited high-water mark up
+            stage_rss = round(peak_rss - start_rss, 1)
+    return {
+        "stage": stage,
+        "engine": engine,
+        "items": items,
+        "unit": unit,
+        "seconds": round(seconds, 4),
+        "rate": round(items / seconds, 1) if seconds else None,
+        "start_rss_mb": start_rss,
+        "peak_rss_mb": peak_rss,
+        "stage_rss_mb": stage_rss,
+    }
+
+
+def _child(conn, stage, topology, engine, context):
+    try:
+        conn.send(_measure(stage, topology, engine, context))
+    except Exception as e:
+        conn.send({"stage": stage, "engine": engine, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_stage(stage, topology, engine, context):
+    """
+    Runs one stage in a forked child (or in-process where fork isn't available).
+
+    Returns:
+        dict: stage, engine, items, unit, seconds, rate (items/s), start/peak RSS in MB
+              and stage_rss_mb (peak growth over the start, None if unknown), or an
+              "error" key if the stage failed.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        try:
+            return _measure(stage, topology, engine, context)
+        except Exception as e:
+            return {"stage": stage, "engine": engine, "error": f"{type(e).__name__}: {e}"}
+
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(sender, stage, topology, engine, context))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"stage": stage, "engine": engine, "error": f"worker exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def run_benchmarks(topology, stages=STAGES, xml_engines=XML_ENGINES, diff_engines=DIFF_ENGINES, churn=0.01):
+    """Runs every requested stage/engine pair and returns the list of results."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bgp-bench-") as workdir:
+        context = {"workdir": workdir}
+        if "diff" in stages:
+            context["before"] = os.path.join(workdir, "before.txt")
+            context["after"] = os.path.join(workdir, "after.txt")
+            context["diff_routes"] = (
+                topology.write_snapshot(context["before"], "bench", "before")
+                + topology.after(churn).write_snapshot(context["after"], "bench", "after")
+            )
+            for path in (context["before"], context["after"]):
+                _append_failed_peer(path)
+
+            checks = check_diff_engines(context, diff_engines)
+            for result in checks:
+                if "error" in result:
+                    print_result(result)
+            results.extend(checks)
+            if not any("error" in r for r in checks):
+                print(f"✅ All {len(diff_engines)} diff engines agree on text and binary snapshots")
+
+        for stage in stages:
+            engines = diff_engines if stage == "diff" else xml_engines
+            for engine in engines:
+                result = run_stage(stage, topology, engine, context)
+                print_result(result)
+                results.append(result)
+    return results
+
+
+def print_result(result, baseline=None):
+    if "error" in result:
+        print(f"❌ {result['stage']:<8} {result['engine']:<9} {result['error']}")
+        return
+    if result["stage"] == "check":
+        print(f"✅ {result['stage']:<8} {result['engine']:<9} output matches")
+        return
+    line = (f"⏱  {result['stage']:<8} {result['engine']:<9} {result['seconds']:>9.3f}s "
+            f"{result['items']:>10} {result['unit']:<6} {result['rate'] or 0:>12,.0f}/s "
+            f"stage RSS +{result.get('stage_rss_mb')} MB")
+    if baseline and baseline.get("seconds"):
+        change = (result["seconds"] - baseline["seconds"]) / baseline["seconds"] * 100
+        line += f"  ({change:+.1f}% vs baseline)"
+    print(line)
+
+
+def compare_with_baseline(results, baseline_path, threshold=10.0):
+    """
+    Prints each result next to the same stage/engine from a saved run.
+
+    Returns:
+        List[dict]: Results that got slower than the baseline by more than threshold percent.
+    """
+    with open(baseline_path) as f:
+        saved = json.load(f)
+    previous = {(r["stage"], r["engine"]): r for r in saved.get("results", []) if "error" not in r}
+
+    print(f"\n==== Compared with {baseline_path} ====\n")
+    regressions = []
+    for result in results:
+        if "error" in result:
+            continue
+        old = previous.get((result["stage"], result["engine"]))
+        print_result(result, old)
+        if old and old.get("seconds") and result["seconds"] > old["seconds"] * (1 + threshold / 100):
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BGP collectors and diff engines on synthetic data.")
+    add_topology_arguments(parser)
+    parser.add_argument("--churn", type=float, default=0.01, help="Churn between the diffed snapshots")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--xml-engines", nargs="+", choices=XML_ENGINES, default=list(XML_ENGINES))
+    parser.add_argument("--diff-engines", nargs="+", choices=DIFF_ENGINES, default=list(DIFF_ENGINES))
+    parser.add_argument("--json", help="Save results (and parameters) to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a JSON file saved by an earlier run")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent slowdown vs --baseline that counts as a regression")
+    args = parser.parse_args()
+
+    diff_engines = list(args.diff_engines)
+    if "numpy" in diff_engines:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("[!] numpy not installed — skipping the numpy diff engine.")
+            diff_engines.remove("numpy")
+
+    topology = topology_from_args(args)
+    print(f"🧪 {args.peers} peers x {args.routes} routes, multipath {args.multipath}, "
+          f"IPv6 ratio {args.ipv6_ratio}\n")
+    results = run_benchmarks(topology, args.stages, args.xml_engines, diff_engines, churn=args.churn)
+
+    if args.json:
+        params = {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}
+        with open(args.json, "w") as f:
+            json.dump({"parameters": params, "results": results}, f, indent=2)
+        print(f"\n✅ Results saved to: {args.json}")
+
+    mismatches = [r for r in results if r["stage"] == "check" and "error" in r]
+    if mismatches:
+        print(f"\n[!] {len(mismatches)} diff engine run(s) disagree with the dict engine")
+        sys.exit(1)
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"\n[!] {len(regressions)} stage(s) slower than baseline by more than {args.threshold}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
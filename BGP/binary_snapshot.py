@@ -0,0 +1,357 @@
+# binary_snapshot.py
+
+# Compact binary route snapshot format + memory-mapped reader.
+#
+# Layout (all integers little-endian):
+#
+#   header        magic "BGPSNAP1", version, flags, peer/string counts,
+#                 string-table offset, peer-index offset
+#   sections      one per peer section, optionally zlib-compressed:
+#                   counts (v4, v6, other)
+#                   v4 routes     <I B I>   network, prefix length, next-hop id
+#                   v6 routes     <16s B I> network, prefix length, next-hop id
+#                   other routes  <I I>     prefix string id, next-hop id
+#   string table  every interned string (peers, tables, next hops, odd prefixes)
+#   peer index    peer id, table id, kind, route count, offset, stored/raw size
+#
+# Prefixes that wouldn't format back to exactly the same text (e.g. "N/A", or an
+# address written in a non-canonical form) are kept in the "other" block, so a
+# conversion never changes what diff_tool sees.
+
+import argparse
+import mmap
+import re
+import socket
+import struct
+import zlib
+
+
+MAGIC = b"BGPSNAP1"
+VERSION = 1
+FLAG_COMPRESSED = 0x1
+
+KIND_RECEIVED = 0
+KIND_ADVERTISED = 1
+KIND_NONE = 2
+KIND_NAMES = {KIND_RECEIVED: "received", KIND_ADVERTISED: "advertised", KIND_NONE: "none"}
+
+_HEADER = struct.Struct("<8sHHIIQQ")
+_SECTION_COUNTS = struct.Struct("<III")
+_V4_ROUTE = struct.Struct("<IBI")
+_V6_ROUTE = struct.Struct("<16sBI")
+_OTHER_ROUTE = struct.Struct("<II")
+_INDEX_ENTRY = struct.Struct("<IIBIQQQ")
+_STR_LEN = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+_PEER_HEADER = re.compile(r"== Peer: (\S+) \| Table: (\S+)")
+
+
+def pack_prefix(prefix):
+    """
+    Packs "10.0.0.0/24" / "2001:db8::/32" into (family, network, length).
+    Returns None when the text wouldn't survive a round trip unchanged.
+    """
+    address, sep, length = prefix.partition("/")
+    if not sep or not length.isdigit():
+        return None
+
+    try:
+        plen = int(length)
+    except ValueError:  # isdigit() also accepts digits int() won't parse ("²")
+        return None
+    if str(plen) != length:
+        return None  # "/010" would come back as "/10"; keep it in the string block
+
+    try:
+        if ":" in address:
+            packed = socket.inet_pton(socket.AF_INET6, address)
+            if plen > 128 or socket.inet_ntop(socket.AF_INET6, packed) != address:
+                return None
+            return 6, packed, plen
+
+        packed = socket.inet_pton(socket.AF_INET, address)
+        if plen > 32 or socket.inet_ntop(socket.AF_INET, packed) != address:
+            return None
+        return 4, _U32.unpack(packed[::-1])[0], plen
+
+    except OSError:
+        return None
+
+
+def _format_v4(network, plen):
+    return f"{socket.inet_ntop(socket.AF_INET, _U32.pack(network)[::-1])}/{plen}"
+
+
+def _format_v6(network, plen):
+    return f"{socket.inet_ntop(socket.AF_INET6, network)}/{plen}"
+
+
+class BinarySnapshotWriter:
+    """
+    Writes a binary snapshot one peer section at a time, so a converter never has to
+    hold more than one peer in memory.
+
+    Usage:
+        with BinarySnapshotWriter("snap.bgps", compress=True) as w:
+            w.add_peer("10.1.1.1", "inet.0", KIND_RECEIVED, [("10.0.0.0/24", "10.1.1.1")])
+    """
+
+    def __init__(self, path, compress=False):
+        self.path = path
+        self.compress = compress
+        self._strings = {}
+        self._string_list = []
+        self._index = []
+        self._f = open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0))
+
+    def _intern(self, value):
+        value = str(value)
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = len(self._string_list)
+            self._strings[value] = string_id
+            self._string_list.append(value)
+        return string_id
+
+    def add_peer(self, peer, table, kind, routes):
+        """
+        Appends one peer section.
+
+        Parameters:
+            peer (str): Peer address.
+            table (str): RIB table name.
+            kind (int): KIND_RECEIVED, KIND_ADVERTISED or KIND_NONE.
+            routes (Iterable[tuple[str, str]]): (prefix, next_hop) pairs.
+        """
+        v4, v6, other = bytearray(), bytearray(), bytearray()
+        counts = [0, 0, 0]
+
+        for prefix, nh in routes:
+            nh_id = self._intern(nh)
+            packed = pack_prefix(prefix)
+            if packed is None:
+                other += _OTHER_ROUTE.pack(self._intern(prefix), nh_id)
+                counts[2] += 1
+            elif packed[0] == 4:
+                v4 += _V4_ROUTE.pack(packed[1], packed[2], nh_id)
+                counts[0] += 1
+            else:
+                v6 += _V6_ROUTE.pack(packed[1], packed[2], nh_id)
+                counts[1] += 1
+
+        raw = _SECTION_COUNTS.pack(*counts) + bytes(v4) + bytes(v6) + bytes(other)
+        stored = zlib.compress(raw, 6) if self.compress else raw
+
+        offset = self._f.tell()
+        self._f.write(stored)
+        self._index.append((
+            self._intern(peer), self._intern(table), kind, sum(counts),
+            offset, len(stored), len(raw),
+        ))
+
+    def close(self):
+        """Writes the string table and peer index, then fills in the header."""
+        if self._f is None:
+            return
+
+        strings_offset = self._f.tell()
+        for value in self._string_list:
+            data = value.encode("utf-8")
+            self._f.write(_STR_LEN.pack(len(data)))
+            self._f.write(data)
+
+        index_offset = self._f.tell()
+        for entry in self._index:
+            self._f.write(_INDEX_ENTRY.pack(*entry))
+
+        flags = FLAG_COMPRESSED if self.compress else 0
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(
+            MAGIC, VERSION, flags, len(self._index), len(self._string_list),
+            strings_offset, index_offset,
+        ))
+        self._f.close()
+        self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinarySnapshotReader:
+    """
+    Memory-maps a binary snapshot. Only the header, string table and peer index are
+    decoded up front; a peer's routes are read (and decompressed) when asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, peer_count, string_count, strings_offset, index_offset = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary BGP snapshot")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported snapshot version {version}")
+
+        self.compressed = bool(flags & FLAG_COMPRESSED)
+
+        self.strings = []
+        pos = strings_offset
+        for _ in range(string_count):
+            (length,) = _STR_LEN.unpack_from(self._mm, pos)
+            pos += _STR_LEN.size
+            self.strings.append(self._mm[pos:pos + length].decode("utf-8"))
+            pos += length
+
+        self.sections = []
+        for i in range(peer_count):
+            peer_id, table_id, kind, count, offset, stored, raw = \
+                _INDEX_ENTRY.unpack_from(self._mm, index_offset + i * _INDEX_ENTRY.size)
+            self.sections.append({
+                "peer": self.strings[peer_id],
+                "table": self.strings[table_id],
+                "kind": kind,
+                "routes": count,
+                "offset": offset,
+                "stored": stored,
+                "raw": raw,
+            })
+
+    def _listed(self, section, kind):
+        # A section without routes (failed RPC, empty peer) never makes a peer, just as
+        # diff_tool.parse_routes() only learns a peer from its first route
+        return section["routes"] and (kind is None or section["kind"] == kind)
+
+    def peers(self, kind=None):
+        """Peer addresses in file order, optionally limited to one section kind."""
+        return [s["peer"] for s in self.sections if self._listed(s, kind)]
+
+    def _section_bytes(self, section):
+        data = self._mm[section["offset"]:section["offset"] + section["stored"]]
+        return zlib.decompress(data) if self.compressed else data
+
+    def iter_section(self, section):
+        """Yields (prefix, next_hop) for one index entry, in v4 → v6 → other order."""
+        data = self._section_bytes(section)
+        n4, n6, n_other = _SECTION_COUNTS.unpack_from(data, 0)
+        strings = self.strings
+        pos = _SECTION_COUNTS.size
+
+        for network, plen, nh_id in _V4_ROUTE.iter_unpack(data[pos:pos + n4 * _V4_ROUTE.size]):
+            yield _format_v4(network, plen), strings[nh_id]
+        pos += n4 * _V4_ROUTE.size
+
+        for network, plen, nh_id in _V6_ROUTE.iter_unpack(data[pos:pos + n6 * _V6_ROUTE.size]):
+            yield _format_v6(network, plen), strings[nh_id]
+        pos += n6 * _V6_ROUTE.size
+
+        for prefix_id, nh_id in _OTHER_ROUTE.iter_unpack(data[pos:pos + n_other * _OTHER_ROUTE.size]):
+            yield strings[prefix_id], strings[nh_id]
+
+    def load_peer(self, peer, kind=KIND_RECEIVED):
+        """
+        Returns {prefix: next_hop} for one peer without touching any other section.
+        Later sections for the same peer win, like diff_tool.parse_routes().
+        """
+        routes = {}
+        for section in self.sections:
+            if section["peer"] == peer and self._listed(section, kind):
+                routes.update(self.iter_section(section))
+        return routes
+
+    def load_all(self, kind=KIND_RECEIVED):
+        """Returns {peer: {prefix: next_hop}} in the same shape as diff_tool.parse_routes()."""
+        peer_routes = {}
+        for section in self.sections:
+            if self._listed(section, kind):
+                peer_routes.setdefault(section["peer"], {}).update(self.iter_section(section))
+        return peer_routes
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_binary_snapshot(path):
+    """True if the file starts with the binary snapshot magic."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_text_sections(file_path):
+    """
+    Walks a route_dump text snapshot and yields (peer, table, kind, routes) per peer
+    section, where routes is a list of (prefix, next_hop) pairs.
+    """
+    peer = table = None
+    kind = KIND_NONE
+    routes = []
+
+    with open(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+
+            if line.startswith("== Peer:"):
+                if peer is not None:
+                    yield peer, table, kind, routes
+                match = _PEER_HEADER.match(line)
+                peer, table = (match.group(1), match.group(2)) if match else (None, None)
+                kind = KIND_NONE
+                routes = []
+
+            elif line.startswith("--- RECEIVED ROUTES ---"):
+                kind = KIND_RECEIVED
+
+            elif line.startswith("--- ADVERTISED ROUTES ---"):
+                kind = KIND_ADVERTISED
+
+            elif peer is not None and kind != KIND_NONE and line.startswith("- "):
+                prefix, sep, nh = line[2:].partition(", Next hop: ")
+                if sep:
+                    routes.append((prefix.strip(), nh.strip()))
+
+    if peer is not None:
+        yield peer, table, kind, routes
+
+
+def convert_text_snapshot(text_path, binary_path, compress=False):
+    """
+    Converts a route_dump text snapshot into the binary format.
+
+    Returns:
+        int: Number of routes written.
+    """
+    total = 0
+    with BinarySnapshotWriter(binary_path, compress=compress) as writer:
+        for peer, table, kind, routes in iter_text_sections(text_path):
+            writer.add_peer(peer, table, kind, routes)
+            total += len(routes)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a text route snapshot into the binary format.")
+    parser.add_argument("text_file", help="Snapshot written by route_dump")
+    parser.add_argument("binary_file", help="Output path for the binary snapshot")
+    parser.add_argument("--compress", action="store_true", help="zlib-compress each peer section")
+    args = parser.parse_args()
+
+    total = convert_text_snapshot(args.text_file, args.binary_file, compress=args.compress)
+    print(f"✅ Converted {total} routes → {args.binary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import os
 import yaml
 from jnpr.junos import Device
 from getpass import getpass
 
+import metrics  # Reply sizes for --metrics, taken from the raw NETCONF reply
+
 def load_device_from_yaml(path):
     """
     Load the first device from a YAML inventory file.
@@ -16,23 +19,67 @@ def load_device_from_yaml(path):
         print(f"[!] Error loading YAML inventory: {e}")
         raise
 
-def connect_to_device(device_info):
+def load_devices_from_yaml(path):
+    """
+    Load every device from a YAML inventory file.
+    Returns a list of dictionaries with device connection info.
+    """
+    try:
+        with open(path, "r") as f:
+            data = yaml.safe_load(f)
+        return list(data.get("devices") or [])
+    except Exception as e:
+        print(f"[!] Error loading YAML inventory: {e}")
+        raise
+
+
+def get_shared_password(env_var="JUNOS_PASSWORD"):
+    """
+    Single credential source for fleet runs: the environment variable if set,
+    otherwise one getpass prompt that is reused for every device.
+    """
+    password = os.getenv(env_var)
+    if password:
+        print(f"🔑 Using password from ${env_var}")
+        return password
+    return getpass("Enter password for all devices: ")
+
+
+def connect_to_device(device_info, password=None, timeout=None):
     """
     Attempt to connect to a Junos device using NETCONF over SSH (port 830).
+    Prompts for the password unless one is passed in. When timeout is set it bounds
+    both the connection attempt and every RPC on the session.
     Returns an open Device object or None if connection fails.
+
+    Inventory entries with a "standin" block are served by standin.py instead
+    (recorded, replayed or synthetic replies).
     """
+    if device_info.get("standin"):
+        from standin import open_standin
+        return open_standin(device_info, connect_to_device, password=password, timeout=timeout)
+
     try:
         print(f"🔑 Connecting to {device_info['host']} as {device_info['username']}...")
-        password = getpass(f"Enter password for {device_info['host']}: ")
+        if password is None:
+            password = getpass(f"Enter password for {device_info['host']}: ")
+
+        options = {}
+        if timeout:
+            options["conn_open_timeout"] = int(timeout)
 
         dev = Device(
             host=device_info["host"],
             user=device_info["username"],
             passwd=password,
-            port=830,
-            gather_facts=False  # Keep it lightweight
+            port=device_info.get("port", 830),
+            gather_facts=False,  # Keep it lightweight
+            **options
         )
         dev.open()
+        metrics.track_reply_sizes(dev)
+        if timeout:
+            dev.timeout = int(timeout)
         print(f"[+] Connected to {device_info['host']}")
         return dev
 
@@ -2,73 +2,211 @@ import argparse
 import re
 from collections import defaultdict
 
+from binary_snapshot import BinarySnapshotReader, is_binary_snapshot, KIND_RECEIVED
+from output_formatter import TextSink, FORMATS, classify_change, diff_record, format_diff_line, open_sink
 
-def parse_routes(file_path):
-    peer_routes = defaultdict(dict)
+
+def iter_received_routes(file_path):
+    """
+    Yields (peer, prefix, next_hop) for every RECEIVED route line in a text snapshot,
+    in file order. parse_routes() and the streaming engines all read through this.
+    """
+    with open(file_path, 'r') as f:
+        yield from iter_received_lines(f)
+
+
+def iter_received_lines(lines):
+    """Same as iter_received_routes(), over any iterable of snapshot lines."""
     current_peer = None
     in_routes = False
 
-    with open(file_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            # Match peer line
-            if line.startswith("== Peer:"):
-                match = re.match(r"== Peer: (\S+) \| Table: (\S+)", line)
-                if match:
-                    current_peer = match.group(1)
-                    in_routes = False  # reset flag
-
-            elif line.startswith("--- RECEIVED ROUTES ---"):
-                in_routes = True
-                continue
-
-            elif in_routes and current_peer:
-                # actual route line
-                if line.startswith("- "):
-                    route_data = line[2:]
-                    prefix, nh_part = route_data.split(", Next hop: ")
-                    peer_routes[current_peer][prefix.strip()] = nh_part.strip()
+    for line in lines:
+        line = line.strip()
+
+        # Match peer line
+        if line.startswith("== Peer:"):
+            match = re.match(r"== Peer: (\S+) \| Table: (\S+)", line)
+            if match:
+                current_peer = match.group(1)
+                in_routes = False  # reset flag
+
+        elif line.startswith("--- RECEIVED ROUTES ---"):
+            in_routes = True
+            continue
+
+        elif in_routes and current_peer:
+            # actual route line
+            if line.startswith("- "):
+                route_data = line[2:]
+                prefix, nh_part = route_data.split(", Next hop: ")
+                yield current_peer, prefix.strip(), nh_part.strip()
+
+
+def iter_snapshot_routes(file_path):
+    """Same as iter_received_routes(), but also accepts binary snapshots."""
+    if is_binary_snapshot(file_path):
+        with BinarySnapshotReader(file_path) as reader:
+            for section in reader.sections:
+                if section["kind"] == KIND_RECEIVED:
+                    for prefix, nh in reader.iter_section(section):
+                        yield section["peer"], prefix, nh
+        return
+
+    yield from iter_received_routes(file_path)
+
+
+def parse_routes(file_path):
+    peer_routes = defaultdict(dict)
+
+    for peer, prefix, nh in iter_received_routes(file_path):
+        peer_routes[peer][prefix] = nh
 
     return peer_routes
 
 
-def diff_routes(before_routes, after_routes):
+def load_routes(file_path, peer=None, cache=None):
+    """
+    Loads received routes from a text or binary snapshot.
+    With a binary snapshot and a peer, only that peer's section is read.
+    A parse_cache.ParseCache, if given, serves text snapshots parsed before.
+    """
+    if is_binary_snapshot(file_path):
+        with BinarySnapshotReader(file_path) as reader:
+            if peer:
+                return {peer: reader.load_peer(peer)} if peer in reader.peers() else {}
+            return reader.load_all()
+
+    peer_routes = cache.load(file_path, parse_routes) if cache else parse_routes(file_path)
+    if peer:
+        return {peer: peer_routes[peer]} if peer in peer_routes else {}
+    return peer_routes
+
+
+def format_change(prefix, nh_before, nh_after):
+    """
+    Returns the diff line for one prefix, or None if it didn't change.
+    A missing route is passed as None. Shared by every diff engine so output stays identical.
+    """
+    change = classify_change(nh_before, nh_after)
+    if change is None:
+        return None
+    return format_diff_line({"prefix": prefix, "change": change, "nh_before": nh_before, "nh_after": nh_after})
+
+
+def diff_routes(before_routes, after_routes, sink=None):
+    """
+    Diffs two parsed snapshots peer by peer. Output goes to sink (an
+    output_formatter sink; buffered text on stdout by default).
+
+    Returns:
+        dict: Counts of added, removed and changed prefixes.
+    """
+    owned = sink is None
+    sink = sink or TextSink()
+    totals = {"added": 0, "removed": 0, "changed": 0}
     all_peers = sorted(set(before_routes.keys()) | set(after_routes.keys()))
 
     for peer in all_peers:
-        print(f"\n=== Diff for Peer: {peer} ===")
+        sink.begin("diff", peer=peer)
 
         before = before_routes.get(peer, {})
         after = after_routes.get(peer, {})
+        counts = {"added": 0, "removed": 0, "changed": 0}
 
         all_prefixes = sorted(set(before.keys()) | set(after.keys()))
 
         for prefix in all_prefixes:
             nh_before = before.get(prefix)
             nh_after = after.get(prefix)
+            change = classify_change(nh_before, nh_after)
+            if change:
+                counts[change] += 1
+                sink.emit(diff_record(peer, prefix, change, nh_before, nh_after))
 
-            if nh_before and not nh_after:
-                print(f"- {prefix} (was: {nh_before})")
-            elif not nh_before and nh_after:
-                print(f"+ {prefix} (new: {nh_after})")
-            elif nh_before != nh_after:
-                print(f"~ {prefix} (next-hop changed: {nh_before} → {nh_after})")
+        sink.end("diff", peer=peer, counts=counts)
+        for key, value in counts.items():
+            totals[key] += value
 
-        print("-" * 50)
+    if owned:
+        sink.flush()
+    return totals
 
 
 def main():
     parser = argparse.ArgumentParser(description="Diff received BGP routes between two files.")
     parser.add_argument('--before', required=True, help='Path to pre-change received routes file')
     parser.add_argument('--after', required=True, help='Path to post-change received routes file')
+    parser.add_argument('--peer', help='Only diff this peer')
+    parser.add_argument('--engine', choices=['dict', 'merge', 'trie', 'numpy', 'parallel'], default='dict',
+                        help='dict: load both files in memory; merge: external sort + streaming merge-join; '
+                             'trie: prefix-aware diff (aggregation, more-specifics, coverage); '
+                             'numpy: vectorized columnar diff (requires numpy); '
+                             'parallel: parse and diff peers on a process pool')
+    parser.add_argument('--run-records', type=int, default=500_000,
+                        help='merge engine: routes buffered before spilling a sorted run to disk')
+    parser.add_argument('--destinations', default='',
+                        help='trie engine: comma-separated addresses to compare longest-prefix matches for')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parallel engine: worker processes (default: CPU count)')
+    parser.add_argument('--cache', action='store_true',
+                        help='dict/trie engines: reuse parsed text snapshots from a persistent cache')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Parse cache location (default: ~/.cache/bgp-diff; implies --cache)')
+    parser.add_argument('--cache-max-mb', type=int, default=1024,
+                        help='Parse cache size limit before least-recently-used entries are evicted')
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help='Output format (jsonl/csv records need the dict engine)')
+    parser.add_argument('--output', default=None, help='Write the diff to this file instead of stdout')
+    parser.add_argument('--summary-only', action='store_true',
+                        help='Only print added/removed/changed counts per peer (dict engine)')
 
     args = parser.parse_args()
 
-    before_routes = parse_routes(args.before)
-    after_routes = parse_routes(args.after)
-
-    diff_routes(before_routes, after_routes)
+    if args.engine != 'dict' and (args.format != 'text' or args.summary_only):
+        parser.error("--format jsonl/csv and --summary-only require --engine dict")
+
+    with open_sink(args.format, args.output, summary_only=args.summary_only) as sink:
+        _run_engine(parser, args, sink)
+
+
+def _run_engine(parser, args, sink):
+    if args.engine == 'merge':
+        from merge_diff import merge_diff
+        if args.peer:
+            parser.error("--peer is not supported with --engine merge")
+        merge_diff(args.before, args.after, write=sink.line, run_records=args.run_records)
+        return
+
+    if args.engine == 'numpy':
+        try:
+            from vector_diff import vector_diff
+        except ImportError:
+            parser.error("--engine numpy requires numpy (pip install numpy)")
+        if args.peer:
+            parser.error("--peer is not supported with --engine numpy")
+        vector_diff(args.before, args.after, write=sink.line)
+        return
+
+    if args.engine == 'parallel':
+        from parallel_diff import parallel_diff
+        parallel_diff(args.before, args.after, write=sink.line, workers=args.workers, peer=args.peer)
+        return
+
+    cache = None
+    if args.cache or args.cache_dir:
+        from parse_cache import ParseCache, DEFAULT_CACHE_DIR
+        cache = ParseCache(args.cache_dir or DEFAULT_CACHE_DIR, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    before_routes = load_routes(args.before, args.peer, cache)
+    after_routes = load_routes(args.after, args.peer, cache)
+
+    if args.engine == 'trie':
+        from prefix_trie import trie_diff
+        destinations = [d.strip() for d in args.destinations.split(',') if d.strip()]
+        trie_diff(before_routes, after_routes, destinations, write=sink.line)
+        return
+
+    diff_routes(before_routes, after_routes, sink)
 
 
 if __name__ == "__main__":
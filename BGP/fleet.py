@@ -0,0 +1,284 @@
+# fleet.py
+
+# Fleet-wide BGP snapshot: runs peer summary, received routes and advertised routes
+# for every device in inventory.yml on a bounded worker pool, then prints one
+# aggregated result table.
+
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from device_handler import load_devices_from_yaml, get_shared_password, connect_to_device
+from route_collector import get_bgp_peers_summary
+from route_dump import (
+    collect_routes, collect_advertised_routes, collect_routes_parallel, verify_lean_routes,
+    CliStream, StreamUnavailable,
+)
+from incremental import collect_routes_incremental, DEFAULT_MAX_AGE_S
+from output_formatter import FORMATS, open_sink, print_peer_summary
+from standin import needs_password
+import metrics
+
+
+def _check_deadline(host, started, timeout, stage):
+    """Raises TimeoutError once a device has used up its time budget."""
+    if timeout and time.monotonic() - started > timeout:
+        raise TimeoutError(f"{host} exceeded {timeout}s before {stage}")
+
+
+class _DeadlineRpc:
+    """
+    Wraps dev.rpc so every RPC gets at most the device's remaining time budget:
+    dev.timeout is lowered before each call, and no call starts once it is spent.
+    """
+
+    def __init__(self, dev, host, deadline, timeout):
+        self._dev = dev
+        self._rpc = dev.rpc
+        self._host = host
+        self._deadline = deadline
+        self._timeout = timeout
+
+    def __getattr__(self, name):
+        method = getattr(self._rpc, name)
+
+        def call(*args, **kwargs):
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{self._host} exceeded {self._timeout}s before {name}")
+            self._dev.timeout = max(1, min(self._timeout, math.ceil(remaining)))
+            return method(*args, **kwargs)
+
+        return call
+
+
+def _with_deadline(dev, host, started, timeout):
+    """Applies the per-device budget to every RPC on dev (a no-op without timeout)."""
+    if dev is not None and timeout:
+        dev.rpc = _DeadlineRpc(dev, host, started + timeout, int(timeout))
+    return dev
+
+
+def _open_cli_stream(device_info, password, started, timeout):
+    """
+    Opens the separate CLI SSH session --stream reads route replies from.
+
+    Returns:
+        CliStream, or None (buffered RPCs) for stand-ins and devices where it can't be opened.
+    """
+    host = device_info["host"]
+    if device_info.get("standin"):
+        print(f"[!] {host} is a stand-in; streaming needs a real device — using buffered RPCs")
+        return None
+
+    remaining = max(1, math.ceil(started + timeout - time.monotonic())) if timeout else None
+    try:
+        return CliStream.open(host, device_info["username"], password,
+                              port=device_info.get("cli_port", 22), timeout=remaining)
+    except StreamUnavailable as e:
+        print(f"[!] Streaming not available on {host}: {e} — using buffered RPCs")
+        return None
+
+
+def snapshot_device(device_info, password, timestamp, timeout=None, engine="lxml", stream=False, sessions=1,
+                    incremental=False, peer_format=None, lean=False, max_age=DEFAULT_MAX_AGE_S):
+    """
+    Runs the full snapshot (summary, received, advertised) for one device.
+
+    Parameters:
+        device_info (dict): Inventory entry with "host", "username" and optional "port"/"hostname".
+        password (str): Shared credential for the run.
+        timestamp (str): Timestamp used in every output filename of the run.
+        timeout (int): Per-device budget in seconds. Bounds connect, and each RPC gets
+                       only what is left of it.
+        stream (bool): Stream the route replies over a separate CLI SSH session
+                       (route_dump.CliStream), falling back to buffered RPCs.
+        sessions (int): NETCONF sessions per device for the route RPCs (1 = sequential,
+                        and not used while streaming).
+        incremental (bool): Only re-fetch peers whose summary changed since the last run.
+        max_age (int): With incremental, also re-fetch peers last fetched more than this
+                       many seconds ago (0 = only on summary changes).
+        peer_format (str): Also write the peer summary as "text", "jsonl" or "csv" records.
+        lean (bool): Use terse route RPCs once verify_lean_routes() confirms they parse
+                     to the same routes on this device.
+
+    Returns:
+        dict: host, success flag, peer count, elapsed seconds and error (if any).
+    """
+    host = device_info["host"]
+    hostname = device_info.get("hostname", host)
+    started = time.monotonic()
+    result = {"host": host, "success": False, "peers": 0, "seconds": 0.0, "error": None}
+
+    # Every RPC sample taken for this device (metrics.py) is labelled with its hostname
+    with metrics.device_scope(hostname):
+        dev = None
+        cli = None
+        try:
+            dev = _with_deadline(connect_to_device(device_info, password=password, timeout=timeout),
+                                 host, started, timeout)
+            if dev is None:
+                raise ConnectionError("connection failed")
+
+            _check_deadline(host, started, timeout, "peer summary")
+            peers = get_bgp_peers_summary(dev, engine=engine, raise_errors=True)
+            result["peers"] = len(peers)
+
+            if peer_format:
+                extension = "txt" if peer_format == "text" else peer_format
+                with open_sink(peer_format, f"{hostname}-BGP-Peers-{timestamp}.{extension}") as sink:
+                    print_peer_summary(hostname, peers, sink)
+
+            if lean:
+                _check_deadline(host, started, timeout, "lean route check")
+                lean = verify_lean_routes(dev, peers, engine=engine)
+
+            if stream:
+                _check_deadline(host, started, timeout, "CLI session for streaming")
+                cli = _open_cli_stream(device_info, password, started, timeout)
+
+            # Extra sessions for --sessions, each with the same per-device budget
+            open_session = lambda: _with_deadline(
+                connect_to_device(device_info, password=password, timeout=timeout), host, started, timeout
+            )
+
+            if incremental:
+                _check_deadline(host, started, timeout, "route collection")
+                collect_routes_incremental(dev, peers, hostname, timestamp, engine=engine, stream=cli,
+                                           max_age=max_age, lean=lean, open_session=open_session,
+                                           sessions=sessions)
+            elif sessions > 1 and cli is None:
+                _check_deadline(host, started, timeout, "route collection")
+                collect_routes_parallel(dev, peers, hostname, timestamp, open_session=open_session,
+                                        sessions=sessions, engine=engine, lean=lean)
+            else:
+                _check_deadline(host, started, timeout, "received routes")
+                collect_routes(dev, peers, hostname, timestamp, engine=engine, stream=cli, lean=lean)
+
+                _check_deadline(host, started, timeout, "advertised routes")
+                collect_advertised_routes(dev, peers, hostname, timestamp, engine=engine, stream=cli, lean=lean)
+
+            result["success"] = True
+
+        except Exception as e:
+            result["error"] = str(e)
+            print(f"[!] Snapshot failed for {host}: {e}")
+
+        finally:
+            for session in (cli, dev):
+                if session is not None:
+                    try:
+                        session.close()
+                    except Exception:
+                        pass
+            result["seconds"] = round(time.monotonic() - started, 1)
+
+    return result
+
+
+def run_fleet_snapshot(devices, password, workers=8, timeout=600, engine="lxml", stream=False, sessions=1,
+                       incremental=False, peer_format=None, lean=False, max_age=DEFAULT_MAX_AGE_S):
+    """
+    Snapshots every device on a bounded thread pool. All files share one timestamp so
+    pre/post runs line up per device.
+
+    Returns:
+        List[dict]: One result per device, in inventory order.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    results = [None] * len(devices)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(
+                snapshot_device, device, password, timestamp, timeout, engine, stream, sessions, incremental,
+                peer_format, lean, max_age
+            ): index
+            for index, device in enumerate(devices)
+        }
+        done = 0
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            done += 1
+            status = "✅" if result["success"] else "❌"
+            print(f"{status} {result['host']} finished in {result['seconds']}s "
+                  f"({done}/{len(devices)})")
+
+    return results
+
+
+def print_fleet_summary(results):
+    """Prints one aggregated line per device plus fleet totals."""
+    print("\n==== Fleet BGP Snapshot Summary ====\n")
+    for r in results:
+        status = "✅ OK    " if r["success"] else "❌ FAILED"
+        line = f"{status} {r['host']:<20} peers: {r['peers']:<5} time: {r['seconds']}s"
+        if r["error"]:
+            line += f"  ({r['error']})"
+        print(line)
+
+    ok = sum(1 for r in results if r["success"])
+    print("----------------------------------------------------")
+    print(f"✔ Devices completed: {ok}")
+    print(f"✖ Failures: {len(results) - ok}")
+    print(f"📡 Peers collected: {sum(r['peers'] for r in results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent BGP snapshot across the whole inventory.")
+    parser.add_argument("--inventory", default="inventory.yml", help="Path to inventory YAML")
+    parser.add_argument("--workers", type=int, default=8, help="Max devices processed at once")
+    parser.add_argument("--timeout", type=int, default=600, help="Per-device time budget in seconds")
+    parser.add_argument("--engine", choices=["lxml", "jxmlease"], default="lxml", help="XML extraction engine")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream routes to disk (full-table peers) over a separate CLI SSH login "
+                             "(port 22, or the inventory's cli_port; needs SSH enabled and an account "
+                             "that lands in the Junos CLI). Devices where it can't be opened use buffered RPCs")
+    parser.add_argument("--sessions", type=int, default=1, help="NETCONF sessions per device for route RPCs")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-fetch only peers whose summary changed; carry the rest forward")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE_S,
+                        help="With --incremental, re-fetch a peer whose routes are older than this many "
+                             "seconds even if its summary is unchanged (default: %(default)s; 0 = never)")
+    parser.add_argument("--peer-format", choices=FORMATS, default=None,
+                        help="Also save each device's peer summary as text, JSONL or CSV records")
+    parser.add_argument("--lean", action="store_true",
+                        help="Request terse route output (verified against the full reply per device)")
+    parser.add_argument("--metrics", nargs="?", const="", default=None, metavar="PREFIX",
+                        help="Record per-RPC latency, reply size and parse time; writes PREFIX.json "
+                             "and PREFIX.prom (default prefix: BGP-Metrics-<timestamp>)")
+    parser.add_argument("--profile-parse", metavar="PATH",
+                        help="With --metrics, also cProfile the parse phase and save the stats to PATH")
+    args = parser.parse_args()
+
+    devices = load_devices_from_yaml(args.inventory)
+    if not devices:
+        print("[!] No devices found in inventory.")
+        return
+
+    # Replay/synthetic stand-ins (standin.py) don't need credentials
+    password = get_shared_password() if any(needs_password(d) for d in devices) else None
+
+    if args.metrics is not None:
+        metrics.enable(profile_path=args.profile_parse)
+    results = run_fleet_snapshot(
+        devices, password,
+        workers=args.workers, timeout=args.timeout, engine=args.engine, stream=args.stream,
+        sessions=args.sessions, incremental=args.incremental, peer_format=args.peer_format,
+        lean=args.lean, max_age=args.max_age
+    )
+    print_fleet_summary(results)
+
+    if args.metrics is not None:
+        prefix = args.metrics or f"BGP-Metrics-{datetime.now().strftime('%Y-%m-%d_%H-%M')}"
+        recorder = metrics.disable()
+        for path in metrics.write(recorder, prefix):
+            print(f"📊 Metrics saved to: {path}")
+        print(f"📊 {len(recorder.samples)} RPC samples recorded")
+
+
+if __name__ == "__main__":
+    main()
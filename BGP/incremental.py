@@ -0,0 +1,328 @@
+# incremental.py
+
+# Skip-unchanged-peer incremental snapshots.
+#
+# A per-device state file remembers, for every peer, the summary counters, session
+# state and session age seen at the last snapshot, plus which files that snapshot
+# went to. On the next run a peer is only re-fetched when something in the summary
+# suggests its table may have moved: a counter changed, the session isn't
+# Established, or the session age shows it was reset in between. Every other peer
+# section is copied byte-for-byte from the previous snapshot file.
+#
+# Same counters don't strictly prove an identical table (a next-hop change can
+# keep every count), so a peer is also re-fetched once its routes are older than
+# max_age (DEFAULT_MAX_AGE_S unless the caller says otherwise; fleet.py --max-age).
+# A peer whose section holds an error ("[!] Failed to get ...") is never carried
+# forward: it is re-fetched on the next run, and its state keeps the counters of
+# its last good fetch.
+
+import json
+import os
+import re
+import time
+
+from route_dump import collect_routes, collect_advertised_routes, collect_routes_parallel
+
+
+COUNTER_FIELDS = (
+    "state", "rib_table", "received_prefixes", "accepted_prefixes",
+    "active_prefixes", "suppressed_prefixes", "advertised_prefixes",
+)
+
+# Slack between "session age grew by at least the wall-clock gap" and reality
+# (polling jitter, clock rounding in the summary output).
+ELAPSED_TOLERANCE_S = 120
+
+# Longest a peer's routes are carried forward before a re-fetch, even with matching
+# counters: bounds how long a next-hop-only change can go unnoticed.
+DEFAULT_MAX_AGE_S = 24 * 3600
+
+_UNIT_SECONDS = {"w": 604800, "d": 86400, "h": 3600, "m": 60, "s": 1}
+
+
+def parse_elapsed(value):
+    """
+    Converts a Junos elapsed-time string ("1w2d 3:04:05", "2d3h", "45:12", "12") to seconds.
+    Returns None if the format isn't recognised.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text == "N/A":
+        return None
+
+    total = 0
+    for amount, unit in re.findall(r"(\d+)([wdhms])", text):
+        total += int(amount) * _UNIT_SECONDS[unit]
+    text = re.sub(r"\d+[wdhms]", "", text).strip()
+
+    if text:
+        parts = text.split(":")
+        if not all(p.isdigit() for p in parts) or len(parts) > 3:
+            return None
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + int(part)
+        total += seconds
+
+    return total
+
+
+def state_path(hostname, directory="."):
+    return os.path.join(directory, f"{hostname}-BGP-State.json")
+
+
+def load_state(hostname, directory="."):
+    """Returns the previous snapshot state for a device, or None."""
+    path = state_path(hostname, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[!] Ignoring unreadable state file {path}: {e}")
+        return None
+
+
+def save_state(hostname, state, directory="."):
+    path = state_path(hostname, directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def plan_refresh(peers, previous, now, max_age=None):
+    """
+    Decides which peers need a fresh download.
+
+    Returns:
+        dict: peer_ip -> reason string for every peer to re-fetch. Peers not in the
+              dict can have their previous sections carried forward.
+    """
+    refresh = {}
+
+    if not previous or not os.path.exists(previous.get("received_file", "")) \
+            or not os.path.exists(previous.get("advertised_file", "")):
+        return {str(p["peer_ip"]): "no previous snapshot" for p in peers}
+
+    wall_gap = now - previous.get("taken_at", now)
+
+    for peer in peers:
+        peer_ip = str(peer["peer_ip"])
+        old = previous.get("peers", {}).get(peer_ip)
+
+        if old is None:
+            refresh[peer_ip] = "new peer"
+            continue
+        if old.get("failed"):
+            refresh[peer_ip] = "previous fetch failed"
+            continue
+        if str(peer["state"]) != "Established":
+            refresh[peer_ip] = f"state {peer['state']}"
+            continue
+
+        changed = [f for f in COUNTER_FIELDS if str(peer.get(f)) != old.get(f)]
+        if changed:
+            refresh[peer_ip] = "changed: " + ", ".join(changed)
+            continue
+
+        elapsed = parse_elapsed(peer.get("elapsed_time"))
+        old_elapsed = old.get("elapsed_seconds")
+        if elapsed is None or old_elapsed is None:
+            refresh[peer_ip] = "session age unknown"
+            continue
+        if elapsed + ELAPSED_TOLERANCE_S < old_elapsed + wall_gap:
+            refresh[peer_ip] = "session reset"
+            continue
+
+        if max_age and now - old.get("fetched_at", 0) > max_age:
+            refresh[peer_ip] = "max age reached"
+
+    return refresh
+
+
+def index_sections(path):
+    """
+    Scans a snapshot once and returns {peer_ip: (start, end)} byte ranges of each
+    peer section (header through the closing ==== line and blank line).
+    """
+    sections = {}
+    current = None
+    start = 0
+    offset = 0
+
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"== Peer: "):
+                if current is not None:
+                    sections[current] = (start, offset)
+                current = line[len(b"== Peer: "):].split(b" ", 1)[0].decode()
+                start = offset
+            offset += len(line)
+
+    if current is not None:
+        sections[current] = (start, offset)
+    return sections
+
+
+def failed_sections(path):
+    """Returns the peers whose section in a snapshot file contains an "[!]" error line."""
+    failed = set()
+    current = None
+
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"== Peer: "):
+                current = line[len(b"== Peer: "):].split(b" ", 1)[0].decode()
+            elif line.startswith(b"[!]") and current is not None:
+                failed.add(current)
+    return failed
+
+
+def _copy_range(src, dst, start, end, chunk_size=1 << 20):
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        data = src.read(min(chunk_size, remaining))
+        if not data:
+            break
+        dst.write(data)
+        remaining -= len(data)
+
+
+def _assemble(final_path, title, peers, refresh, fresh_path, previous_path):
+    """
+    Builds the final snapshot in peer order from the freshly fetched sections and
+    the sections carried forward from the previous file.
+
+    Written to a temp file and renamed, so a run in the same minute as the previous
+    one can still read the file it is replacing.
+    """
+    fresh_index = index_sections(fresh_path) if fresh_path else {}
+    previous_index = index_sections(previous_path) if previous_path else {}
+    fresh = open(fresh_path, "rb") if fresh_path else None
+    old = open(previous_path, "rb") if previous_path else None
+    reused = []
+
+    try:
+        with open(final_path + ".tmp", "wb") as out:
+            out.write(title.encode())
+
+            for peer in peers:
+                peer_ip = str(peer["peer_ip"])
+                if peer_ip not in refresh and peer_ip in previous_index:
+                    _copy_range(old, out, *previous_index[peer_ip])
+                    reused.append(peer_ip)
+                elif peer_ip in fresh_index:
+                    _copy_range(fresh, out, *fresh_index[peer_ip])
+    finally:
+        for f in (fresh, old):
+            if f is not None:
+                f.close()
+
+    os.replace(final_path + ".tmp", final_path)
+    return reused
+
+
+def collect_routes_incremental(dev, peers, hostname, timestamp, engine="lxml", stream=None,
+                               state_dir=".", max_age=DEFAULT_MAX_AGE_S, lean=False, open_session=None, sessions=1):
+    """
+    Incremental replacement for collect_routes() + collect_advertised_routes().
+
+    Only peers whose summary suggests a change, or whose last fetch is more than
+    max_age seconds old (None or 0 = no limit), are downloaded; the rest are carried
+    forward from the previous snapshot files. Both output files keep the normal
+    format and peer order, and the state file records which sections were reused.
+    With sessions > 1 (and open_session, not streaming), the peers to re-fetch are
+    spread over that many NETCONF sessions by collect_routes_parallel().
+
+    Returns:
+        dict: "refreshed" (peer -> reason) and "reused" (list of peers).
+    """
+    now = time.time()
+    previous = load_state(hostname, state_dir)
+    refresh = plan_refresh(peers, previous, now, max_age=max_age)
+    to_fetch = [p for p in peers if str(p["peer_ip"]) in refresh]
+
+    # If a peer was carried forward, don't let a missing old section drop it
+    if previous:
+        received_index = index_sections(previous["received_file"]) if os.path.exists(previous["received_file"]) else {}
+        for p in peers:
+            peer_ip = str(p["peer_ip"])
+            if peer_ip not in refresh and peer_ip not in received_index:
+                refresh[peer_ip] = "missing from previous snapshot"
+                to_fetch.append(p)
+        to_fetch.sort(key=peers.index)
+
+    print(f"♻️  Incremental: re-fetching {len(to_fetch)} of {len(peers)} peers")
+    for peer_ip, reason in refresh.items():
+        print(f"    ↻ {peer_ip}: {reason}")
+
+    received_file = f"{hostname}-BGP-Routes-{timestamp}.txt"
+    advertised_file = f"{hostname}-BGP-Advertised-Routes-{timestamp}.txt"
+    fresh_received = received_file + ".partial"
+    fresh_advertised = advertised_file + ".partial"
+
+    try:
+        if to_fetch and sessions > 1 and open_session and stream is None:
+            collect_routes_parallel(dev, to_fetch, hostname, timestamp, open_session=open_session,
+                                    sessions=min(sessions, len(to_fetch)), engine=engine, lean=lean,
+                                    received_file=fresh_received, advertised_file=fresh_advertised)
+        elif to_fetch:
+            collect_routes(dev, to_fetch, hostname, timestamp, engine=engine, stream=stream,
+                           filename=fresh_received, lean=lean)
+            collect_advertised_routes(dev, to_fetch, hostname, timestamp, engine=engine, stream=stream,
+                                      filename=fresh_advertised, lean=lean)
+
+        reused_received = _assemble(
+            received_file,
+            f"BGP Route Collection for {hostname}\nGenerated: {timestamp}\n\n",
+            peers, refresh,
+            fresh_received if to_fetch else None,
+            previous["received_file"] if previous else None,
+        )
+        _assemble(
+            advertised_file,
+            f"BGP Advertised Route Collection for {hostname}\nGenerated: {timestamp}\n\n",
+            peers, refresh,
+            fresh_advertised if to_fetch else None,
+            previous["advertised_file"] if previous else None,
+        )
+    finally:
+        for path in (fresh_received, fresh_advertised):
+            if os.path.exists(path):
+                os.remove(path)
+
+    previous_peers = (previous or {}).get("peers", {})
+    failed = failed_sections(received_file) | failed_sections(advertised_file)
+    state = {
+        "hostname": hostname,
+        "timestamp": timestamp,
+        "taken_at": now,
+        "received_file": os.path.abspath(received_file),
+        "advertised_file": os.path.abspath(advertised_file),
+        "reused": reused_received,
+        "refreshed": refresh,
+        "peers": {},
+    }
+    for peer in peers:
+        peer_ip = str(peer["peer_ip"])
+        if peer_ip in failed:
+            # Keep the last good fetch's counters; the failed flag forces a re-fetch next run
+            entry = dict(previous_peers.get(peer_ip) or {f: str(peer.get(f)) for f in COUNTER_FIELDS})
+            entry["failed"] = True
+        elif peer_ip in refresh:
+            entry = {f: str(peer.get(f)) for f in COUNTER_FIELDS}
+            entry["elapsed_seconds"] = parse_elapsed(peer.get("elapsed_time"))
+            entry["fetched_at"] = now
+        else:
+            entry = {f: str(peer.get(f)) for f in COUNTER_FIELDS}
+            entry["elapsed_seconds"] = parse_elapsed(peer.get("elapsed_time"))
+            entry["fetched_at"] = previous_peers.get(peer_ip, {}).get("fetched_at", now)
+        state["peers"][peer_ip] = entry
+    save_state(hostname, state, state_dir)
+
+    print(f"✅ Incremental snapshot: {len(reused_received)} peer sections reused, {len(to_fetch)} re-fetched")
+    return {"refreshed": refresh, "reused": reused_received}
@@ -0,0 +1,129 @@
+# merge_diff.py
+
+# Streaming sorted-merge diff for snapshots larger than RAM.
+#
+# Each snapshot is externally sorted by (peer, prefix): routes are buffered up to a
+# fixed record count, sorted, and spilled to a temp run file. The runs are then
+# k-way merged back into one sorted stream, and the before/after streams are
+# merge-joined in a single pass. Memory is bounded by the run size, not the table.
+
+import heapq
+import os
+import tempfile
+from itertools import groupby
+
+from diff_tool import iter_snapshot_routes, format_change
+
+
+DEFAULT_RUN_RECORDS = 500_000
+
+
+def _spill(records, tmpdir, run_index):
+    """Sorts one run and writes it as tab-separated lines. Returns the run path."""
+    records.sort()
+    path = os.path.join(tmpdir, f"run-{run_index:05d}.tsv")
+    with open(path, "w") as f:
+        for peer, prefix, seq, nh in records:
+            f.write(f"{peer}\t{prefix}\t{seq}\t{nh}\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r") as f:
+        for line in f:
+            peer, prefix, seq, nh = line.rstrip("\n").split("\t", 3)
+            yield peer, prefix, int(seq), nh
+
+
+def iter_sorted_routes(file_path, tmpdir, run_records=DEFAULT_RUN_RECORDS):
+    """
+    Yields (peer, prefix, next_hop) sorted by peer then prefix, spilling to disk
+    whenever more than run_records routes are buffered.
+
+    A prefix repeated within one peer keeps its last value, matching the dict
+    semantics of diff_tool.parse_routes().
+    """
+    buffer = []
+    runs = []
+
+    for seq, (peer, prefix, nh) in enumerate(iter_snapshot_routes(file_path)):
+        buffer.append((peer, prefix, seq, nh))
+        if len(buffer) >= run_records:
+            runs.append(_spill(buffer, tmpdir, len(runs)))
+            buffer = []
+
+    if runs:
+        if buffer:
+            runs.append(_spill(buffer, tmpdir, len(runs)))
+            buffer = []
+        merged = heapq.merge(*(_read_run(path) for path in runs))
+    else:
+        buffer.sort()
+        merged = iter(buffer)
+
+    # Sorted by (peer, prefix, seq), so the last record of each group is the latest.
+    for (peer, prefix), group in groupby(merged, key=lambda r: (r[0], r[1])):
+        last = None
+        for last in group:
+            pass
+        yield peer, prefix, last[3]
+
+
+def merge_join(before_iter, after_iter):
+    """
+    Joins two (peer, prefix, next_hop) streams sorted by (peer, prefix) and yields
+    (peer, prefix, nh_before, nh_after), with None for the missing side.
+    """
+    sentinel = object()
+    before = next(before_iter, sentinel)
+    after = next(after_iter, sentinel)
+
+    while before is not sentinel or after is not sentinel:
+        if after is sentinel or (before is not sentinel and before[:2] < after[:2]):
+            yield before[0], before[1], before[2], None
+            before = next(before_iter, sentinel)
+        elif before is sentinel or after[:2] < before[:2]:
+            yield after[0], after[1], None, after[2]
+            after = next(after_iter, sentinel)
+        else:
+            yield before[0], before[1], before[2], after[2]
+            before = next(before_iter, sentinel)
+            after = next(after_iter, sentinel)
+
+
+def merge_diff(before_path, after_path, write=print, run_records=DEFAULT_RUN_RECORDS, tmpdir=None):
+    """
+    Streams the diff between two snapshots with bounded memory. Output is line-for-line
+    identical to diff_tool.diff_routes().
+
+    Parameters:
+        write (callable): Receives each output line (defaults to print).
+        run_records (int): Routes buffered per snapshot before spilling a sorted run.
+        tmpdir (str): Where spill files go (defaults to the system temp dir).
+
+    Returns:
+        dict: Counts of added, removed and changed prefixes.
+    """
+    counts = {"added": 0, "removed": 0, "changed": 0}
+
+    with tempfile.TemporaryDirectory(prefix="bgp-diff-", dir=tmpdir) as workdir:
+        before_dir = os.path.join(workdir, "before")
+        after_dir = os.path.join(workdir, "after")
+        os.mkdir(before_dir)
+        os.mkdir(after_dir)
+
+        joined = merge_join(
+            iter_sorted_routes(before_path, before_dir, run_records),
+            iter_sorted_routes(after_path, after_dir, run_records),
+        )
+
+        for peer, rows in groupby(joined, key=lambda r: r[0]):
+            write(f"\n=== Diff for Peer: {peer} ===")
+            for _, prefix, nh_before, nh_after in rows:
+                change = format_change(prefix, nh_before, nh_after)
+                if change:
+                    write(change)
+                    counts[{"-": "removed", "+": "added", "~": "changed"}[change[0]]] += 1
+            write("-" * 50)
+
+    return counts
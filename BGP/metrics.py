@@ -0,0 +1,326 @@
+# metrics.py
+
+# Per-RPC instrumentation for the BGP collectors.
+#
+# Every dev.rpc.* call made by route_collector and route_dump (and every streamed
+# "show route" in route_dump) becomes one sample:
+#   device latency   - time until PyEZ hands back the reply element
+#   response bytes   - size of the reply XML, where it is known without extra work
+#   serialize time   - etree.tostring() (jxmlease engine only)
+#   parse time       - jxmlease.parse() / lxml extraction
+#   route count      - routes extracted from the reply
+#
+# Collection is off unless enable() was called. Reply sizes never cost a
+# re-serialization: they come from the raw reply text ncclient received (real devices,
+# see track_reply_sizes()), from the stand-ins and streamed replies, or from the text
+# the jxmlease engine serializes anyway. The device a sample belongs to comes from a
+# thread-local scope (device_scope()), since fleet runs many devices at once.
+#
+# write() produces a JSON file and a Prometheus text-format file with percentiles
+# per device and per peer. With a profile path, the parse phase also runs under
+# cProfile (serialized across threads) and the stats are dumped alongside.
+
+import contextlib
+import cProfile
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# (sample field, Prometheus metric name, help text)
+_SERIES = (
+    ("latency_s", "bgp_rpc_latency_seconds", "Device time until the RPC reply was received"),
+    ("bytes", "bgp_rpc_response_bytes", "Size of the RPC reply XML"),
+    ("serialize_s", "bgp_rpc_serialize_seconds", "Time spent in etree.tostring() on the reply"),
+    ("parse_s", "bgp_rpc_parse_seconds", "Time spent parsing/extracting the reply"),
+    ("routes", "bgp_rpc_routes", "Routes extracted from the reply"),
+)
+
+_recorder = None
+_local = threading.local()
+
+
+class _Sample:
+    def __init__(self, device, rpc, peer=None, kind=None):
+        self.fields = {
+            "device": device, "rpc": rpc, "peer": peer, "kind": kind,
+            "latency_s": None, "bytes": None, "serialize_s": 0.0, "parse_s": 0.0, "routes": None,
+        }
+        self._started = time.perf_counter()
+
+    def reply(self, size=None):
+        """Marks the reply as received: stops the latency clock and records its size, if known."""
+        self.fields["latency_s"] = time.perf_counter() - self._started
+        self.fields["bytes"] = size
+
+    def routes(self, count):
+        self.fields["routes"] = count
+
+
+class _NullSample:
+    """Returned while metrics are disabled, so call sites don't need to check."""
+
+    def reply(self, size=None):
+        pass
+
+    def routes(self, count):
+        pass
+
+
+_NULL_SAMPLE = _NullSample()
+
+
+class Recorder:
+    """Collects samples for one run."""
+
+    def __init__(self, profile_path=None):
+        self.samples = []
+        self.started = time.time()
+        self.profile_path = profile_path
+        self._lock = threading.Lock()
+        self._profiler = cProfile.Profile() if profile_path else None
+        self._profile_lock = threading.Lock()
+
+    def add(self, sample):
+        with self._lock:
+            self.samples.append(sample.fields)
+
+
+def enable(profile_path=None):
+    """Starts collecting samples (and cProfile stats of the parse phase, if a path is given)."""
+    global _recorder
+    _recorder = Recorder(profile_path)
+    return _recorder
+
+
+def disable():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def enabled():
+    return _recorder is not None
+
+
+@contextlib.contextmanager
+def device_scope(device):
+    """Attributes samples taken in this thread to device."""
+    previous = getattr(_local, "device", None)
+    _local.device = device
+    try:
+        yield
+    finally:
+        _local.device = previous
+
+
+def current_device():
+    return getattr(_local, "device", None)
+
+
+@contextlib.contextmanager
+def rpc_sample(rpc, peer=None, kind=None):
+    """
+    Times one RPC. Call sample.reply(reply_size(dev)) once the reply is back and
+    sample.routes(n) once it's parsed; serialize/parse phases inside the block are
+    added to the sample automatically. Failed RPCs are not recorded.
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield _NULL_SAMPLE
+        return
+
+    sample = _Sample(current_device(), rpc, peer, kind)
+    outer = getattr(_local, "sample", None)
+    _local.sample = sample
+    try:
+        yield sample
+    finally:
+        _local.sample = outer
+    if sample.fields["latency_s"] is not None:
+        recorder.add(sample)
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Adds the block's duration to the current sample's "<name>_s" field."""
+    sample = getattr(_local, "sample", None) if _recorder is not None else None
+    if sample is None:
+        yield
+        return
+
+    profiler = _recorder._profiler if name == "parse" else None
+    if profiler is None:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            sample.fields[f"{name}_s"] += time.perf_counter() - started
+        return
+
+    # One profiler for the run; parses are serialized while profiling
+    with _recorder._profile_lock:
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sample.fields[f"{name}_s"] += time.perf_counter() - started
+
+
+def track_reply_sizes(dev):
+    """
+    Makes an open PyEZ device record the length of every NETCONF reply in
+    dev.last_reply_bytes, read from the raw reply text ncclient already holds
+    (RPCReply._raw) instead of re-serializing the parsed element.
+
+    Returns:
+        dev, unchanged when it has no ncclient session (stand-ins report sizes themselves).
+    """
+    conn = getattr(dev, "_conn", None)
+    if conn is None or "rpc" in vars(conn):
+        return dev
+    send = conn.rpc  # ncclient resolves operations through Manager.__getattr__
+
+    def rpc(*args, **kwargs):
+        dev.last_reply_bytes = None
+        reply = send(*args, **kwargs)
+        # PyEZ gets the RPCReply wrapped in an NCElement
+        raw = getattr(getattr(reply, "_NCElement__result", reply), "_raw", None)
+        if raw is not None:
+            dev.last_reply_bytes = len(raw)
+        return reply
+
+    dev.last_reply_bytes = None
+    conn.rpc = rpc
+    return dev
+
+
+def reply_size(dev):
+    """Raw length of dev's last RPC reply (see track_reply_sizes()), or None if unknown."""
+    return getattr(dev, "last_reply_bytes", None)
+
+
+def serialized(size):
+    """
+    Records the length of a reply the jxmlease engine has just serialized as the current
+    sample's size, unless the transport already reported the raw length.
+    """
+    sample = getattr(_local, "sample", None) if _recorder is not None else None
+    if sample is not None and sample.fields["bytes"] is None:
+        sample.fields["bytes"] = size
+
+
+def counted(chunks, sample):
+    """
+    Passes streamed reply chunks through, recording their total size on sample once
+    the stream ends. Streaming interleaves device time and parsing, so the sample's
+    latency covers the whole stream.
+    """
+    if sample is _NULL_SAMPLE:
+        yield from chunks
+        return
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        yield chunk
+    sample.reply(size=size)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+def _stats(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    stats = {f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES}
+    stats.update({"max": max(values), "sum": sum(values), "count": len(values)})
+    return stats
+
+
+def summarize(samples):
+    """
+    Percentiles of every series per device (and RPC) and per peer.
+
+    Returns:
+        dict: {"devices": {device: {rpc: {field: stats}}},
+               "peers": {device: {peer: {field: stats}}}}
+    """
+    by_device = defaultdict(lambda: defaultdict(list))
+    by_peer = defaultdict(lambda: defaultdict(list))
+    for sample in samples:
+        by_device[str(sample["device"])][sample["rpc"]].append(sample)
+        if sample["peer"]:
+            by_peer[str(sample["device"])][str(sample["peer"])].append(sample)
+
+    def series(group):
+        return {field: _stats([s[field] for s in group]) for field, _, _ in _SERIES}
+
+    return {
+        "devices": {d: {rpc: series(g) for rpc, g in rpcs.items()} for d, rpcs in by_device.items()},
+        "peers": {d: {p: series(g) for p, g in peers.items()} for d, peers in by_peer.items()},
+    }
+
+
+def _label_string(labels):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+    return ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped))
+
+
+def to_prometheus(summary):
+    """Renders summarize() output as Prometheus text exposition format (summaries)."""
+    lines = []
+    for field, metric, help_text in _SERIES:
+        for scope, groups in (("device", summary["devices"]), ("peer", summary["peers"])):
+            name = metric if scope == "device" else metric.replace("bgp_rpc_", "bgp_peer_")
+            block = []
+            for device, children in groups.items():
+                for child, series in children.items():
+                    stats = series.get(field)
+                    if not stats:
+                        continue
+                    labels = {"device": device, "rpc" if scope == "device" else "peer": child}
+                    for q in QUANTILES:
+                        quantile_labels = _label_string({**labels, "quantile": q})
+                        block.append(f"{name}{{{quantile_labels}}} {stats[f'p{int(q * 100)}']}")
+                    block.append(f"{name}_sum{{{_label_string(labels)}}} {stats['sum']}")
+                    block.append(f"{name}_count{{{_label_string(labels)}}} {stats['count']}")
+            if block:
+                lines.append(f"# HELP {name} {help_text}{'' if scope == 'device' else ' (per peer)'}")
+                lines.append(f"# TYPE {name} summary")
+                lines.extend(block)
+    return "\n".join(lines) + "\n"
+
+
+def write(recorder, path_prefix):
+    """
+    Writes <path_prefix>.json (samples + percentiles) and <path_prefix>.prom, plus the
+    cProfile stats when the parse phase was profiled. Returns the paths written.
+    """
+    summary = summarize(recorder.samples)
+    paths = [f"{path_prefix}.json", f"{path_prefix}.prom"]
+
+    with open(paths[0], "w") as f:
+        json.dump({
+            "started": recorder.started,
+            "finished": time.time(),
+            "summary": summary,
+            "samples": recorder.samples,
+        }, f, indent=2)
+    with open(paths[1], "w") as f:
+        f.write(to_prometheus(summary))
+
+    if recorder._profiler is not None:
+        recorder._profiler.dump_stats(recorder.profile_path)
+        paths.append(recorder.profile_path)
+
+    return paths
@@ -1,13 +1,220 @@
-def print_peer_summary(hostname, peers):
-    print(f"\n==== BGP Peer Summary for {hostname} ====\n")
+# output_formatter.py
+
+# Output sinks shared by the peer summary (print_peer_summary, fleet.py --peer-format)
+# and the diff tool.
+#
+# Both emit records with one schema (RECORD_FIELDS), and a sink decides how they
+# look: text (the classic human-readable layout), JSONL or CSV. Sinks buffer lines
+# and write them in large chunks, to a file or stdout, and a summary-only mode
+# drops per-prefix diff records in favour of per-peer counts. Route snapshots are
+# still written by route_dump in their own text format, which diff_tool reads.
+
+import csv
+import io
+import json
+import sys
+
+
+# One schema for every record. "kind" is one of:
+#   peer    - a BGP peer from the summary (route_collector)
+#   diff    - one changed prefix (diff_tool)
+#   summary - per-peer diff counts
+RECORD_FIELDS = (
+    "kind", "host", "peer", "table", "prefix", "change", "nh_before", "nh_after",
+    "peer_as", "state", "elapsed_time", "peer_group", "peer_rti", "peer_type", "local_address", "local_as",
+    "received_prefixes", "accepted_prefixes", "active_prefixes", "suppressed_prefixes", "advertised_prefixes",
+    "added", "removed", "changed",
+)
+
+FORMATS = ("text", "jsonl", "csv")
+
+_DIFF_LINES = {
+    "removed": "- {prefix} (was: {nh_before})",
+    "added": "+ {prefix} (new: {nh_after})",
+    "changed": "~ {prefix} (next-hop changed: {nh_before} → {nh_after})",
+}
+
+
+def classify_change(nh_before, nh_after):
+    """"removed", "added", "changed" or None. A missing route is passed as None."""
+    if nh_before and not nh_after:
+        return "removed"
+    elif not nh_before and nh_after:
+        return "added"
+    elif nh_before != nh_after:
+        return "changed"
+    return None
+
+
+def format_diff_line(record):
+    return _DIFF_LINES[record["change"]].format(**record)
+
+
+def peer_record(host, peer):
+    """Builds a peer record from a route_collector peer dict."""
+    return {
+        "kind": "peer",
+        "host": host,
+        "peer": str(peer["peer_ip"]),
+        "table": peer.get("rib_table"),
+        "peer_as": peer.get("peer_as"),
+        "state": peer.get("state"),
+        "elapsed_time": peer.get("elapsed_time"),
+        "peer_group": peer.get("peer_group", peer.get("group")),
+        "peer_rti": peer.get("peer_rti", peer.get("instance")),
+        "peer_type": peer.get("peer_type", peer.get("type")),
+        "local_address": peer.get("local_address"),
+        "local_as": peer.get("local_as"),
+        "received_prefixes": peer.get("received_prefixes"),
+        "accepted_prefixes": peer.get("accepted_prefixes"),
+        "active_prefixes": peer.get("active_prefixes"),
+        "suppressed_prefixes": peer.get("suppressed_prefixes"),
+        "advertised_prefixes": peer.get("advertised_prefixes"),
+    }
+
+
+def diff_record(peer, prefix, change, nh_before, nh_after, host=None):
+    return {"kind": "diff", "host": host, "peer": peer, "prefix": prefix, "change": change,
+            "nh_before": nh_before, "nh_after": nh_after}
+
+
+def summary_record(peer, counts, host=None):
+    return {"kind": "summary", "host": host, "peer": peer, **counts}
+
+
+class TextSink:
+    """
+    Human-readable output. Lines are buffered and written in chunks.
+
+    Framing (section titles, per-peer footers) comes from begin()/end(); records
+    are formatted by kind.
+    """
+
+    def __init__(self, stream=None, summary_only=False, buffer_lines=8192):
+        self.stream = stream or sys.stdout
+        self.summary_only = summary_only
+        self.buffer_lines = buffer_lines
+        self._lines = []
+
+    def line(self, text=""):
+        self._lines.append(text)
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self._lines.append("")
+            self.stream.write("\n".join(self._lines))
+            self._lines = []
+        self.stream.flush()
+
+    def begin(self, section, host=None, peer=None):
+        if section == "peers":
+            self.line(f"\n==== BGP Peer Summary for {host} ====\n")
+        elif section == "diff" and not self.summary_only:
+            self.line(f"\n=== Diff for Peer: {peer} ===")
+
+    def end(self, section, host=None, peer=None, counts=None):
+        if section != "diff":
+            return
+        if self.summary_only:
+            self.line(f"{peer}: +{counts['added']} -{counts['removed']} ~{counts['changed']}")
+        else:
+            self.line("-" * 50)
+
+    def emit(self, record):
+        kind = record["kind"]
+        if kind == "diff":
+            if not self.summary_only:
+                self.line(format_diff_line(record))
+        elif kind == "peer":
+            self.line(f"📡 Peer: {record['peer']} ({record['peer_rti']})")
+            self.line(f"    Group: {record['peer_group']}")
+            self.line(f"    AS: {record['peer_as']}")
+            self.line(f"    Type: {record['peer_type']}")
+            self.line(f"    State: {record['state']}")
+            self.line(f"    Prefixes - Active: {record['active_prefixes']}, "
+                      f"Received: {record['received_prefixes']}, "
+                      f"Accepted: {record['accepted_prefixes']}, "
+                      f"Advertised: {record['advertised_prefixes']}")
+            self.line("----------------------------------------------------")
+        elif kind == "summary":
+            self.line(f"{record['peer']}: +{record['added']} -{record['removed']} ~{record['changed']}")
+
+    def close(self):
+        self.flush()
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(TextSink):
+    """One JSON object per record. Per-peer diff counts are emitted as summary records."""
+
+    def begin(self, section, host=None, peer=None):
+        pass
+
+    def end(self, section, host=None, peer=None, counts=None):
+        if section == "diff":
+            self.emit(summary_record(peer, counts, host=host))
+
+    def emit(self, record):
+        if self.summary_only and record["kind"] == "diff":
+            return
+        self.line(json.dumps({k: v for k, v in record.items() if v is not None}, ensure_ascii=False))
+
+
+class CsvSink(JsonlSink):
+    """CSV with RECORD_FIELDS as the header; fields a record doesn't use are left empty."""
+
+    def __init__(self, stream=None, summary_only=False, buffer_lines=8192):
+        super().__init__(stream, summary_only, buffer_lines)
+        self._row = io.StringIO()
+        self._writer = csv.DictWriter(self._row, fieldnames=RECORD_FIELDS, lineterminator="")
+        self._writer.writeheader()
+        self._take_row()
+
+    def _take_row(self):
+        self.line(self._row.getvalue())
+        self._row.seek(0)
+        self._row.truncate()
+
+    def emit(self, record):
+        if self.summary_only and record["kind"] == "diff":
+            return
+        self._writer.writerow(record)
+        self._take_row()
+
+
+_SINKS = {"text": TextSink, "jsonl": JsonlSink, "csv": CsvSink}
+
+
+def open_sink(fmt="text", path=None, summary_only=False):
+    """
+    Returns a sink for fmt ("text", "jsonl" or "csv") writing to path, or stdout
+    when path is None or "-". Close it (or use it as a context manager) to flush.
+    """
+    if fmt not in _SINKS:
+        raise ValueError(f"Unknown output format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if path and path != "-":
+        stream = open(path, "w", encoding="utf-8", newline="", buffering=1 << 20)
+    else:
+        stream = sys.stdout
+    return _SINKS[fmt](stream, summary_only=summary_only)
+
+
+def print_peer_summary(hostname, peers, sink=None):
+    """Writes the peer summary for one device (to stdout as text by default)."""
+    owned = sink is None
+    sink = sink or TextSink()
+    sink.begin("peers", host=hostname)
     for peer in peers:
-        print(f"📡 Peer: {peer['peer_ip']} ({peer['instance']})")
-        print(f"    Group: {peer['group']}")
-        print(f"    AS: {peer['peer_as']}")
-        print(f"    Type: {peer['type']}")
-        print(f"    State: {peer['state']}")
-        print(f"    Prefixes - Active: {peer['active_prefixes']}, "
-              f"Received: {peer['received_prefixes']}, "
-              f"Accepted: {peer['accepted_prefixes']}, "
-              f"Advertised: {peer['advertised_prefixes']}")
-        print("----------------------------------------------------")
+        sink.emit(peer_record(hostname, peer))
+    sink.end("peers", host=hostname)
+    if owned:
+        sink.flush()
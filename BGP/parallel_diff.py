@@ -0,0 +1,154 @@
+# parallel_diff.py
+
+# Multi-process diff across peers.
+#
+# Peer sections are independent, so the work splits cleanly: the parent scans each
+# text snapshot once for the byte offsets of every "== Peer:" section, then hands
+# (peer, before ranges, after ranges) jobs to a process pool. Each worker reads only
+# its peer's bytes, parses them with the same rules as diff_tool.iter_received_routes(),
+# diffs them and sends back the formatted lines. The parent writes results in sorted
+# peer order, so the output is identical to diff_tool.diff_routes().
+#
+# Binary snapshots need no scan: a worker opens the file and loads just its peer.
+
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from binary_snapshot import BinarySnapshotReader, is_binary_snapshot, KIND_RECEIVED
+from diff_tool import iter_received_lines, format_change
+
+
+_PEER_HEADER = re.compile(rb"== Peer: (\S+) \| Table: (\S+)")
+
+
+def index_peer_sections(path):
+    """
+    Scans a text snapshot once and returns {peer: [(start, end), ...]} byte ranges.
+
+    A peer can own several sections (later ones win per prefix, as in parse_routes()).
+    Header lines that diff_tool wouldn't recognise don't start a section, so each
+    range parses exactly as it would in a full read.
+    """
+    sections = {}
+    current = None
+    start = 0
+    offset = 0
+
+    with open(path, "rb") as f:
+        for line in f:
+            if line.lstrip().startswith(b"== Peer:"):
+                match = _PEER_HEADER.match(line.strip())
+                if match:
+                    if current is not None:
+                        sections.setdefault(current, []).append((start, offset))
+                    current = match.group(1).decode()
+                    start = offset
+            offset += len(line)
+
+    if current is not None:
+        sections.setdefault(current, []).append((start, offset))
+    return sections
+
+
+def _snapshot_index(path):
+    """(is_binary, {peer: ranges}) — binary snapshots only need their peer list."""
+    if is_binary_snapshot(path):
+        with BinarySnapshotReader(path) as reader:
+            return True, {peer: None for peer in reader.peers(KIND_RECEIVED)}
+    return False, index_peer_sections(path)
+
+
+def _load_peer(path, is_binary, ranges, peer):
+    if ranges is None and not is_binary:
+        return {}
+    if is_binary:
+        with BinarySnapshotReader(path) as reader:
+            return reader.load_peer(peer)
+
+    routes = {}
+    with open(path, "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            text = io.StringIO(f.read(end - start).decode(), newline=None)
+            for _, prefix, nh in iter_received_lines(text):
+                routes[prefix] = nh
+    return routes
+
+
+def _diff_peer(job):
+    """Worker: loads one peer from both snapshots and returns (peer, output, counts)."""
+    peer, before, after = job
+    before_routes = _load_peer(*before, peer) if before else {}
+    after_routes = _load_peer(*after, peer) if after else {}
+    counts = {"added": 0, "removed": 0, "changed": 0}
+
+    # Like parse_routes(), a peer without routes on either side has nothing to print
+    if not (before_routes or after_routes):
+        return peer, None, counts
+
+    lines = [f"\n=== Diff for Peer: {peer} ==="]
+    for prefix in sorted(set(before_routes) | set(after_routes)):
+        change = format_change(prefix, before_routes.get(prefix), after_routes.get(prefix))
+        if change:
+            lines.append(change)
+            counts[{"-": "removed", "+": "added", "~": "changed"}[change[0]]] += 1
+    lines.append("-" * 50)
+    return peer, "\n".join(lines), counts
+
+
+def parallel_diff(before_path, after_path, write=print, workers=None, peer=None):
+    """
+    Diffs two snapshots with one job per peer on a process pool. Output is identical
+    to diff_tool.diff_routes().
+
+    Parameters:
+        write (callable): Receives each peer's output block (defaults to print).
+        workers (int): Worker processes (defaults to the CPU count; 1 runs in-process).
+        peer (str): Only diff this peer.
+
+    Returns:
+        dict: Counts of added, removed and changed prefixes.
+    """
+    before_binary, before_index = _snapshot_index(before_path)
+    after_binary, after_index = _snapshot_index(after_path)
+
+    peers = sorted(set(before_index) | set(after_index))
+    if peer:
+        peers = [p for p in peers if p == peer]
+
+    jobs = [
+        (
+            p,
+            (before_path, before_binary, before_index[p]) if p in before_index else None,
+            (after_path, after_binary, after_index[p]) if p in after_index else None,
+        )
+        for p in peers
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    counts = {"added": 0, "removed": 0, "changed": 0}
+
+    if workers == 1 or len(jobs) <= 1:
+        results = map(_diff_peer, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+        # Many small peers: batch them so pickling overhead doesn't dominate
+        chunksize = max(1, len(jobs) // (workers * 4))
+        results = executor.map(_diff_peer, jobs, chunksize=chunksize)
+
+    try:
+        # map() yields in job order, i.e. sorted peer order
+        for _, output, peer_counts in results:
+            if output is None:
+                continue
+            write(output)
+            for key, value in peer_counts.items():
+                counts[key] += value
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return counts
@@ -0,0 +1,155 @@
+# parse_cache.py
+
+# Persistent cache of parsed snapshots for diff_tool.
+#
+# During a change the same "before" baseline is diffed against many "after"
+# snapshots, and parsing a full-table text file dominates each run. The cache keeps
+# the parsed {peer: {prefix: next_hop}} maps as pickles named by the SHA-256 of the
+# snapshot, so identical content is parsed once no matter where the file lives.
+#
+# An index (index.json) remembers path, size and mtime per snapshot, so a known
+# file is not even re-hashed; any change to size or mtime triggers a re-hash, and
+# a different hash simply misses. Entries are evicted least-recently-used first
+# once the cache grows past max_bytes.
+
+import hashlib
+import json
+import os
+import pickle
+import time
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bgp-diff")
+DEFAULT_MAX_BYTES = 1 << 30
+
+_INDEX = "index.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Content-addressed cache of parsed snapshots.
+
+    Parameters:
+        directory (str): Where entries and the index are stored.
+        max_bytes (int): Total size of cached entries before LRU eviction.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    # === Index ===
+
+    def _load_index(self):
+        path = os.path.join(self.directory, _INDEX)
+        try:
+            with open(path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("files", {})    # abspath -> {size, mtime_ns, digest}
+        index.setdefault("entries", {})  # digest -> {bytes, last_used}
+        return index
+
+    def _save_index(self):
+        path = os.path.join(self.directory, _INDEX)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, path)
+
+    def _entry_path(self, digest):
+        return os.path.join(self.directory, f"{digest}.pickle")
+
+    def digest_for(self, path):
+        """Content hash of path, re-hashing only if its size or mtime changed."""
+        abspath = os.path.abspath(path)
+        st = os.stat(abspath)
+        known = self._index["files"].get(abspath)
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["digest"]
+
+        digest = file_digest(abspath)
+        self._index["files"][abspath] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest}
+        return digest
+
+    # === Entries ===
+
+    def get(self, path):
+        """Returns the cached parse of path, or None."""
+        digest = self.digest_for(path)
+        entry = self._index["entries"].get(digest)
+        entry_path = self._entry_path(digest)
+        if entry is None or not os.path.exists(entry_path):
+            return None
+
+        try:
+            with open(entry_path, "rb") as f:
+                routes = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"[!] Dropping unreadable cache entry {entry_path}: {e}")
+            self._drop(digest)
+            return None
+
+        entry["last_used"] = time.time()
+        return routes
+
+    def put(self, path, routes):
+        """Stores a parse of path and evicts old entries if the cache is over budget."""
+        digest = self.digest_for(path)
+        entry_path = self._entry_path(digest)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(routes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+        self._index["entries"][digest] = {"bytes": os.path.getsize(entry_path), "last_used": time.time()}
+        self.evict()
+
+    def _drop(self, digest):
+        self._index["entries"].pop(digest, None)
+        try:
+            os.remove(self._entry_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Removes least-recently-used entries until the cache fits in max_bytes."""
+        entries = self._index["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for digest, entry in sorted(entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["bytes"]
+            self._drop(digest)
+
+        # Forget files whose content is no longer cached
+        live = set(entries)
+        self._index["files"] = {p: f for p, f in self._index["files"].items() if f["digest"] in live}
+
+    def load(self, path, parse):
+        """
+        Returns parse(path), served from the cache when the file's content was seen before.
+        """
+        routes = self.get(path)
+        if routes is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            routes = dict(parse(path))
+            self.put(path, routes)
+        self._save_index()
+        return routes
@@ -0,0 +1,305 @@
+# prefix_trie.py
+
+# Path-compressed binary radix (Patricia) trie over IPv4/IPv6 prefixes, and a
+# prefix-aware diff built on it.
+#
+# Exact-string diffs report a /16 replaced by 256 /24s as 257 unrelated lines.
+# With a trie per snapshot the diff can see that relationship: more-specifics that
+# replaced a removed aggregate, new aggregates that absorbed removed prefixes,
+# removed routes that stay reachable through a covering prefix, and how the
+# longest-prefix match for chosen destinations moved. Every lookup walks at most
+# one node per prefix bit, so queries are O(prefix length).
+
+import socket
+
+from diff_tool import format_change
+
+
+_WIDTH = {4: 32, 6: 128}
+_EMPTY = object()
+
+
+def parse_prefix(text):
+    """
+    Parses "10.0.0.0/24" or "2001:db8::/32" (or a bare address, as a host route).
+
+    Returns:
+        (family, network, length) with host bits masked off, or None if not an IP prefix.
+    """
+    address, sep, length = str(text).partition("/")
+    family = 6 if ":" in address else 4
+    width = _WIDTH[family]
+
+    try:
+        packed = socket.inet_pton(socket.AF_INET6 if family == 6 else socket.AF_INET, address)
+    except OSError:
+        return None
+
+    if sep:
+        # ASCII digits only: isdigit() also accepts "²" (int() raises) and "٣" (int() parses)
+        if not length or length.strip("0123456789") or int(length) > width:
+            return None
+        plen = int(length)
+    else:
+        plen = width
+
+    network = int.from_bytes(packed, "big")
+    if plen < width:
+        network &= ~((1 << (width - plen)) - 1)
+    return family, network, plen
+
+
+def format_prefix(family, network, plen):
+    """Inverse of parse_prefix()."""
+    if family == 6:
+        return f"{socket.inet_ntop(socket.AF_INET6, network.to_bytes(16, 'big'))}/{plen}"
+    return f"{socket.inet_ntop(socket.AF_INET, network.to_bytes(4, 'big'))}/{plen}"
+
+
+class _Node:
+    __slots__ = ("key", "plen", "value", "children")
+
+    def __init__(self, key, plen, value=_EMPTY):
+        self.key = key
+        self.plen = plen
+        self.value = value
+        self.children = [None, None]
+
+
+class RadixTrie:
+    """
+    Patricia trie for one address family. Keys are (network, length) pairs where the
+    network is an int with host bits cleared. Nodes without a value are branch points.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+
+    def _bit(self, key, position):
+        return (key >> (self.width - 1 - position)) & 1
+
+    def _matches(self, node, key, plen):
+        """True if node's prefix covers the first plen bits of key (node.plen <= plen)."""
+        shift = self.width - node.plen
+        return node.plen <= plen and (key >> shift) == (node.key >> shift)
+
+    def insert(self, key, plen, value):
+        # Hot path for full tables: bit tests are inlined rather than calling _bit().
+        width = self.width
+        node = self.root
+        while True:
+            node_plen = node.plen
+            if node_plen == plen and node.key == key:
+                if node.value is _EMPTY:
+                    self.size += 1
+                node.value = value
+                return
+
+            bit = (key >> (width - 1 - node_plen)) & 1
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(key, plen, value)
+                self.size += 1
+                return
+
+            child_plen = child.plen
+            diff = key ^ child.key
+            common = width - diff.bit_length() if diff else width
+            if plen < common:
+                common = plen
+            if child_plen < common:
+                common = child_plen
+
+            if common == child_plen:
+                node = child
+                continue
+
+            new = _Node(key, plen, value)
+            self.size += 1
+            if common == plen:
+                # New prefix sits above the existing child
+                new.children[(child.key >> (width - 1 - plen)) & 1] = child
+                node.children[bit] = new
+                return
+
+            # Split: add a value-less branch node at the common prefix
+            glue = _Node((key >> (width - common)) << (width - common), common)
+            glue.children[(key >> (width - 1 - common)) & 1] = new
+            glue.children[(child.key >> (width - 1 - common)) & 1] = child
+            node.children[bit] = glue
+            return
+
+    def get(self, key, plen, default=None):
+        """Exact-match lookup."""
+        node = self.root
+        while node is not None and self._matches(node, key, plen):
+            if node.plen == plen:
+                return default if node.value is _EMPTY else node.value
+            if node.plen >= self.width:
+                break
+            node = node.children[self._bit(key, node.plen)]
+        return default
+
+    def covering(self, key, plen, include_self=False):
+        """
+        Returns [(network, length, value), ...] for every stored prefix that covers
+        key/plen, shortest first.
+        """
+        found = []
+        node = self.root
+        while node is not None and self._matches(node, key, plen):
+            if node.plen == plen and not include_self:
+                break
+            if node.value is not _EMPTY:
+                found.append((node.key, node.plen, node.value))
+            if node.plen >= plen:
+                break
+            node = node.children[self._bit(key, node.plen)]
+        return found
+
+    def longest_match(self, address):
+        """Longest-prefix match for a host address. Returns (network, length, value) or None."""
+        matches = self.covering(address, self.width, include_self=True)
+        return matches[-1] if matches else None
+
+
+class PrefixIndex:
+    """IPv4 + IPv6 tries for one peer's routes ({prefix: next_hop})."""
+
+    def __init__(self):
+        self.tries = {4: RadixTrie(32), 6: RadixTrie(128)}
+
+    @classmethod
+    def from_routes(cls, routes):
+        index = cls()
+        for prefix, nh in routes.items():
+            parsed = parse_prefix(prefix)
+            if parsed:
+                family, network, plen = parsed
+                index.tries[family].insert(network, plen, (prefix, nh))
+        return index
+
+    def covering(self, parsed):
+        family, network, plen = parsed
+        return [value for _, _, value in self.tries[family].covering(network, plen)]
+
+    def lookup(self, address):
+        """Longest-prefix match for an address string. Returns (prefix, next_hop) or None."""
+        parsed = parse_prefix(address)
+        if not parsed:
+            return None
+        family, network, _ = parsed
+        match = self.tries[family].longest_match(network)
+        return match[2] if match else None
+
+
+def _sort_key(prefix):
+    parsed = parse_prefix(prefix)
+    return (0, parsed) if parsed else (1, prefix)
+
+
+def trie_diff_peer(before, after, destinations=()):
+    """
+    Prefix-aware diff for one peer.
+
+    Parameters:
+        before, after (dict): {prefix: next_hop} for the peer.
+        destinations (Iterable[str]): Addresses whose longest-prefix match is compared.
+
+    Returns:
+        List[str]: Output lines (without the peer header/footer).
+    """
+    removed = {p for p in before if p not in after}
+    added = {p for p in after if p not in before}
+
+    if not removed and not added and not destinations:
+        # Only next-hop changes (or nothing): no need to pay for building the tries
+        return [
+            change for change in
+            (format_change(p, before[p], after[p]) for p in sorted(before, key=_sort_key))
+            if change
+        ]
+
+    before_index = PrefixIndex.from_routes(before)
+    after_index = PrefixIndex.from_routes(after)
+
+    # Added more-specifics grouped under the removed prefix they replaced
+    replaced_by = {}
+    for prefix in added:
+        parsed = parse_prefix(prefix)
+        if not parsed:
+            continue
+        parents = [p for p, _ in before_index.covering(parsed) if p in removed]
+        if parents:
+            replaced_by.setdefault(parents[-1], []).append(prefix)
+
+    # Removed more-specifics grouped under the new aggregate that absorbed them
+    absorbed_by = {}
+    for prefix in removed:
+        parsed = parse_prefix(prefix)
+        if not parsed:
+            continue
+        parents = [p for p, _ in after_index.covering(parsed) if p in added]
+        if parents:
+            absorbed_by.setdefault(parents[-1], []).append(prefix)
+
+    consumed_added = {p for children in replaced_by.values() for p in children}
+    consumed_removed = {p for children in absorbed_by.values() for p in children}
+
+    lines = []
+    for prefix in sorted(set(before) | set(after), key=_sort_key):
+        nh_before = before.get(prefix)
+        nh_after = after.get(prefix)
+        parsed = parse_prefix(prefix)
+
+        if prefix in replaced_by:
+            children = replaced_by[prefix]
+            lengths = sorted({c.rsplit("/", 1)[-1] for c in children}, key=int)
+            lines.append(f"⇣ {prefix} (was: {nh_before}) replaced by {len(children)} "
+                         f"more-specifics (/{', /'.join(lengths)})")
+        elif prefix in absorbed_by:
+            children = absorbed_by[prefix]
+            lines.append(f"⇡ {prefix} (new: {nh_after}) aggregates {len(children)} removed more-specifics")
+        elif prefix in consumed_added or prefix in consumed_removed:
+            continue
+        elif prefix in removed and parsed:
+            cover = after_index.covering(parsed)
+            if cover:
+                lines.append(f"- {prefix} (was: {nh_before}) still covered by {cover[-1][0]} via {cover[-1][1]}")
+            else:
+                lines.append(f"- {prefix} (was: {nh_before}) no covering route")
+        elif prefix in added and parsed:
+            cover = before_index.covering(parsed)
+            if cover:
+                lines.append(f"+ {prefix} (new: {nh_after}) more-specific of {cover[-1][0]}")
+            else:
+                change = format_change(prefix, nh_before, nh_after)
+                if change:
+                    lines.append(change)
+        else:
+            change = format_change(prefix, nh_before, nh_after)
+            if change:
+                lines.append(change)
+
+    for destination in destinations:
+        match_before = before_index.lookup(destination)
+        match_after = after_index.lookup(destination)
+        if match_before != match_after:
+            was = f"{match_before[0]} via {match_before[1]}" if match_before else "unreachable"
+            now = f"{match_after[0]} via {match_after[1]}" if match_after else "unreachable"
+            lines.append(f"→ {destination}: {was} → {now}")
+
+    return lines
+
+
+def trie_diff(before_routes, after_routes, destinations=(), write=print):
+    """
+    Prefix-aware counterpart of diff_tool.diff_routes(), with the same peer framing.
+    """
+    for peer in sorted(set(before_routes.keys()) | set(after_routes.keys())):
+        write(f"\n=== Prefix-aware Diff for Peer: {peer} ===")
+        for line in trie_diff_peer(before_routes.get(peer, {}), after_routes.get(peer, {}), destinations):
+            write(line)
+        write("-" * 50)
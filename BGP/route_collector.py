@@ -1,11 +1,148 @@
 from lxml import etree               # Required for converting RPC responses to XML strings
 import jxmlease                      # Converts XML to native Python dictionaries
 
+import xml_extract                   # Direct lxml extraction (no re-serialize + re-parse)
+import metrics                       # Per-RPC timing/size samples (no-op unless enabled)
 
-def get_bgp_peers_summary(dev):
+
+def load_bgp_peer_entries(rpc_reply, engine="lxml"):
+    """
+    Turns a <bgp-information> RPC reply into a list of per-peer dicts keyed by XML tag.
+
+    Parameters:
+        rpc_reply (lxml.etree._Element): Element returned by a BGP summary/neighbor RPC.
+        engine (str): "lxml" reads the element tree directly; "jxmlease" serializes
+                      the reply and re-parses it (the original path).
+
+    Returns:
+        List[dict]: One dict per <bgp-peer>.
+    """
+    if engine == "lxml":
+        with metrics.phase("parse"):
+            return xml_extract.extract_bgp_peers(rpc_reply)
+
+    with metrics.phase("serialize"):
+        reply_xml = etree.tostring(rpc_reply, pretty_print=True, encoding="unicode")
+        metrics.serialized(len(reply_xml))
+    with metrics.phase("parse"):
+        reply_data = jxmlease.parse(reply_xml)
+
+        entries = reply_data.get("bgp-information", {}).get("bgp-peer", [])
+        if not isinstance(entries, list):
+            entries = [entries]
+        return [entry for entry in entries if isinstance(entry, dict)]
+
+
+def normalize_peer_address(address):
+    """
+    Strips the "+port" suffix Junos appends to neighbor addresses (e.g. "10.1.1.1+179").
+    The summary RPC reports bare addresses, so this is what we join on.
+    """
+    if not address:
+        return address
+    return str(address).split("+", 1)[0].strip()
+
+
+def parse_neighbor_entry(bgp_peer_info):
+    """
+    Pulls the neighbor-level fields we care about out of one parsed <bgp-peer> block.
+
+    Returns:
+        dict: RIB table, prefix counts and peer attributes. Missing values are omitted
+              so the caller can keep its own summary-level fallbacks.
+    """
+    fields = {}
+
+    rib = bgp_peer_info.get("bgp-rib", {})
+    if isinstance(rib, list):
+        rib = rib[0] if rib else {}
+    if isinstance(rib, dict):
+        if "name" in rib:
+            fields["rib_table"] = rib.get("name")
+        # Prefer neighbor-level prefix counts (more accurate)
+        for key, xml_key in (
+            ("received_prefixes", "received-prefix-count"),
+            ("accepted_prefixes", "accepted-prefix-count"),
+            ("active_prefixes", "active-prefix-count"),
+            ("suppressed_prefixes", "suppressed-prefix-count"),
+            ("advertised_prefixes", "advertised-prefix-count"),
+        ):
+            if xml_key in rib:
+                fields[key] = rib.get(xml_key)
+
+    fields["local_address"] = bgp_peer_info.get("local-address", "N/A")
+    fields["local_as"] = bgp_peer_info.get("local-as", "N/A")
+    fields["peer_group"] = bgp_peer_info.get("peer-group", "N/A")
+    fields["peer_rti"] = bgp_peer_info.get("peer-cfg-rti", "N/A")
+    fields["peer_type"] = bgp_peer_info.get("peer-type", "N/A")
+
+    return fields
+
+
+def get_bulk_neighbor_details(dev, engine="lxml"):
+    """
+    Fetches neighbor detail for every BGP peer with a single RPC
+    (equivalent to "show bgp neighbor" with no address).
+
+    Returns:
+        dict: Neighbor fields keyed by normalized peer address. Empty if the RPC fails,
+              in which case the caller falls back to per-peer lookups.
+    """
+    details = {}
+
+    try:
+        with metrics.rpc_sample("get_bgp_neighbor_information") as sample:
+            neighbor_rpc = dev.rpc.get_bgp_neighbor_information()
+            sample.reply(metrics.reply_size(dev))
+            entries = load_bgp_peer_entries(neighbor_rpc, engine)
+
+        for entry in entries:
+            peer_ip = normalize_peer_address(entry.get("peer-address"))
+            if peer_ip:
+                details[peer_ip] = parse_neighbor_entry(entry)
+
+    except Exception as e:
+        print(f"[!] Warning: Bulk neighbor RPC failed, falling back to per-peer lookups: {e}")
+
+    return details
+
+
+def get_single_neighbor_details(dev, peer_ip, engine="lxml"):
+    """
+    Fetches neighbor detail for one peer. Used when the peer is missing from the bulk reply.
+
+    Returns:
+        dict: Neighbor fields for the peer, or an empty dict if the RPC fails.
+    """
+    try:
+        with metrics.rpc_sample("get_bgp_neighbor_information", peer=peer_ip) as sample:
+            neighbor_rpc = dev.rpc.get_bgp_neighbor_information(neighbor_address=peer_ip)
+            sample.reply(metrics.reply_size(dev))
+            entries = load_bgp_peer_entries(neighbor_rpc, engine)
+
+        if len(entries) == 1:
+            return parse_neighbor_entry(entries[0])
+
+    except Exception as e:
+        print(f"[!] Warning: Failed to fetch neighbor details for {peer_ip}: {e}")
+
+    return {}
+
+
+def get_bgp_peers_summary(dev, bulk=True, engine="lxml", raise_errors=False):
     """
     Collects BGP peer information from a Junos device using both summary and neighbor RPCs.
 
+    Parameters:
+        dev (Device): Open PyEZ device.
+        bulk (bool): Pull all neighbor detail in one RPC and join it to the summary by
+                     peer address. Peers missing from the bulk reply are looked up one
+                     at a time. Set to False to always use one RPC per peer.
+        engine (str): "lxml" (direct XPath extraction) or "jxmlease" (re-serialize
+                      and re-parse). Both return the same peer dicts.
+        raise_errors (bool): Re-raise a failed summary collection instead of returning
+                             an empty list, so callers can tell "no peers" from "failed".
+
     Returns:
         List[dict]: One dictionary per peer with routing state, prefix counts, and RIB table.
     """
@@ -13,84 +150,55 @@ def get_bgp_peers_summary(dev):
 
     try:
         # === Step 1: Get BGP summary (prefix counts, state, etc.) ===
-        summary_rpc = dev.rpc.get_bgp_summary_information()
-        summary_xml = etree.tostring(summary_rpc, pretty_print=True, encoding="unicode")
-        summary_data = jxmlease.parse(summary_xml)
-
-        bgp_info = summary_data.get("bgp-information", {})
-        peer_entries = bgp_info.get("bgp-peer", [])
+        with metrics.rpc_sample("get_bgp_summary_information") as sample:
+            summary_rpc = dev.rpc.get_bgp_summary_information()
+            sample.reply(metrics.reply_size(dev))
+            peer_entries = load_bgp_peer_entries(summary_rpc, engine)
 
-        if not isinstance(peer_entries, list):
-            peer_entries = [peer_entries]
+        # === Step 2: Get BGP neighbor information (for RIB + advertised count) ===
+        bulk_details = get_bulk_neighbor_details(dev, engine) if bulk else {}
+        fallback_count = 0
 
         for peer in peer_entries:
             peer_ip = peer.get("peer-address", "N/A")
 
             # Default values (fallbacks in case neighbor RPC fails)
-            accepted = peer.get("accepted-prefix-count", "N/A")
-            received = peer.get("received-prefix-count", "N/A")
-            active = peer.get("active-prefix-count", "N/A")
-            suppressed = peer.get("suppressed-prefix-count", "N/A")
-            advertised = "N/A"
-            rib_table = "N/A"
-            local_addr = "N/A"
-            local_asn = "N/A"
-            peer_group = "N/A"
-            peer_rti = "N/A"
-            peer_type = "N/A"
-
-            # === Step 2: Get BGP neighbor information (for RIB + advertised count) ===
-            try:
-                neighbor_rpc = dev.rpc.get_bgp_neighbor_information(neighbor_address=peer_ip)
-                neighbor_xml = etree.tostring(neighbor_rpc, pretty_print=True, encoding="unicode")
-                neighbor_data = jxmlease.parse(neighbor_xml)
-
-                bgp_peer_info = neighbor_data.get("bgp-information", {}).get("bgp-peer", {})
-
-                if isinstance(bgp_peer_info, dict):
-                    # Extract common fields
-                    rib = bgp_peer_info.get("bgp-rib", {})
-                    if isinstance(rib, dict):
-                        rib_table = rib.get("name", "N/A")
-                        # Prefer neighbor-level prefix counts (more accurate)
-                        received = rib.get("received-prefix-count", received)
-                        accepted = rib.get("accepted-prefix-count", accepted)
-                        active = rib.get("active-prefix-count", active)
-                        suppressed = rib.get("suppressed-prefix-count", suppressed)
-                        advertised = rib.get("advertised-prefix-count", "N/A")
-
-                    local_addr = bgp_peer_info.get("local-address", "N/A")
-                    local_asn = bgp_peer_info.get("local-as", "N/A")
-                    peer_group = bgp_peer_info.get("peer-group", "N/A")
-                    peer_rti = bgp_peer_info.get("peer-cfg-rti", "N/A")
-                    peer_type = bgp_peer_info.get("peer-type", "N/A")
-
-            except Exception as e:
-                print(f"[!] Warning: Failed to fetch neighbor details for {peer_ip}: {e}")
-
             peer_info = {
                 "peer_ip": peer_ip,
                 "peer_as": peer.get("peer-as", "N/A"),
                 "state": peer.get("peer-state", "N/A"),
                 "elapsed_time": peer.get("elapsed-time", "N/A"),
-                "accepted_prefixes": accepted,
-                "received_prefixes": received,
-                "active_prefixes": active,
-                "suppressed_prefixes": suppressed,
-                "advertised_prefixes": advertised,
-                "rib_table": rib_table,
-                "local_address": local_addr,
-                "local_as": local_asn,
-                "peer_group": peer_group,
-                "peer_rti": peer_rti,
-                "peer_type": peer_type,
+                "accepted_prefixes": peer.get("accepted-prefix-count", "N/A"),
+                "received_prefixes": peer.get("received-prefix-count", "N/A"),
+                "active_prefixes": peer.get("active-prefix-count", "N/A"),
+                "suppressed_prefixes": peer.get("suppressed-prefix-count", "N/A"),
+                "advertised_prefixes": "N/A",
+                "rib_table": "N/A",
+                "local_address": "N/A",
+                "local_as": "N/A",
+                "peer_group": "N/A",
+                "peer_rti": "N/A",
+                "peer_type": "N/A",
             }
 
+            neighbor = bulk_details.get(normalize_peer_address(peer_ip))
+            if neighbor is None:
+                # Only hit the device per-peer when the bulk reply didn't cover it
+                neighbor = get_single_neighbor_details(dev, peer_ip, engine)
+                fallback_count += 1
+
+            peer_info.update(neighbor)
             peers.append(peer_info)
 
-        print(f"✅ Parsed {len(peers)} BGP peers (summary + neighbor info).")
+        if bulk:
+            print(f"✅ Parsed {len(peers)} BGP peers (summary + bulk neighbor info, "
+                  f"{fallback_count} per-peer fallbacks).")
+        else:
+            print(f"✅ Parsed {len(peers)} BGP peers (summary + neighbor info).")
         return peers
 
     except Exception as e:
         print(f"[!] Error during BGP summary collection: {e}")
+        if raise_errors:
+            raise
         return []
@@ -1,5 +1,10 @@
 # route_dump.py
 
+# Worker threads + task queue for the multi-session collector.
+import queue
+import threading
+import time
+
 # === Juniper + XML Libraries ===
 # RpcError helps catch NETCONF-related RPC failures.
 from jnpr.junos.exception import RpcError
@@ -10,6 +15,12 @@ from lxml import etree
 # jxmlease parses Junos XML into Python-native dictionaries.
 import jxmlease
 
+# Direct lxml extraction engine (reads the RPC element tree without re-parsing).
+import xml_extract
+
+# Per-RPC timing/size samples (no-op unless enabled).
+import metrics
+
 
 def extract_destinations_from_rib(xml_data, expected_table):
     """
@@ -67,15 +78,245 @@ def extract_destinations_from_rib(xml_data, expected_table):
         return [f"[!] Error extracting routes: {e}"], 0
 
 
-def collect_routes(dev, peers, hostname, timestamp):
+def extract_routes_from_rpc(rpc, expected_table, engine="lxml"):
+    """
+    Extracts formatted routes from a get-route-information reply with the chosen engine.
+
+    Parameters:
+        rpc (lxml.etree._Element): Element returned by the RPC.
+        expected_table (str): Route table name to filter for.
+        engine (str): "lxml" reads the element directly; "jxmlease" serializes it
+                      and re-parses the string (the original path).
+
+    Returns:
+        Same (matched_routes, count) tuple as extract_destinations_from_rib().
+    """
+    if engine == "lxml":
+        with metrics.phase("parse"):
+            return xml_extract.extract_routes(rpc, expected_table)
+
+    with metrics.phase("serialize"):
+        rpc_xml = etree.tostring(rpc, pretty_print=True, encoding="unicode")
+        metrics.serialized(len(rpc_xml))
+    with metrics.phase("parse"):
+        return extract_destinations_from_rib(rpc_xml, expected_table)
+
+
+def route_query(peer_ip, rib, kind, lean=False):
+    """
+    Keyword arguments for get-route-information for one peer and direction.
+
+    With lean=True the device renders terse output: same destinations and next hops,
+    without the per-route attributes we never read. table= already limits the reply
+    to the peer's table on the device side.
+    """
+    if kind == "received":
+        query = {"receive_protocol_name": "bgp", "peer": peer_ip, "table": rib}
+    else:
+        query = {"advertising_protocol_name": "bgp", "neighbor": peer_ip, "table": rib}
+    if lean:
+        query["terse"] = True
+    return query
+
+
+def route_command(peer_ip, rib, kind, lean=False):
+    """CLI equivalent of route_query(), for the streaming collectors."""
+    protocol = "receive-protocol" if kind == "received" else "advertising-protocol"
+    command = f"show route {protocol} bgp {peer_ip} table {rib}"
+    return f"{command} terse" if lean else command
+
+
+def _timed_fetch(dev, query, rib, engine):
+    started = time.perf_counter()
+    rpc = dev.rpc.get_route_information(**query)
+    fetched = time.perf_counter()
+    routes, count = extract_routes_from_rpc(rpc, rib, engine)
+    return {
+        "routes": routes,
+        "count": count,
+        "bytes": len(etree.tostring(rpc)),
+        "rpc_seconds": fetched - started,
+        "parse_seconds": time.perf_counter() - fetched,
+    }
+
+
+def verify_lean_routes(dev, peers, engine="lxml"):
+    """
+    Checks that lean (terse) route RPCs parse to exactly the same routes as the full
+    ones before a run relies on them. The smallest peer with routes is queried both
+    ways, in both directions, so the check stays cheap on full-table devices.
+
+    Returns:
+        bool: True when every comparison matched; False means collect with full RPCs.
+    """
+    def prefix_count(peer):
+        count = str(peer.get("received_prefixes", ""))
+        return int(count) if count.isdigit() else 0
+
+    candidates = [p for p in peers if p.get("rib_table") not in (None, "", "N/A")]
+    with_routes = [p for p in candidates if prefix_count(p) > 0] or candidates
+    if not with_routes:
+        return True
+    peer = min(with_routes, key=prefix_count)
+    peer_ip, rib = peer["peer_ip"], peer["rib_table"]
+
+    for kind in ("received", "advertised"):
+        try:
+            full = _timed_fetch(dev, route_query(peer_ip, rib, kind), rib, engine)
+            lean = _timed_fetch(dev, route_query(peer_ip, rib, kind, lean=True), rib, engine)
+        except RpcError as e:
+            print(f"[!] Lean route RPC not accepted for {peer_ip} ({kind}): {e} — using full RPCs.")
+            return False
+
+        if lean["routes"] != full["routes"]:
+            print(f"[!] Lean {kind} routes for {peer_ip} differ from the full reply "
+                  f"({lean['count']} vs {full['count']} routes) — using full RPCs.")
+            return False
+
+        saved = (1 - lean["bytes"] / full["bytes"]) * 100 if full["bytes"] else 0.0
+        print(f"✅ Lean {kind} routes verified on {peer_ip}: {full['count']} routes, "
+              f"{full['bytes']:,} → {lean['bytes']:,} bytes ({saved:.0f}% smaller), "
+              f"parse {full['parse_seconds']:.3f}s → {lean['parse_seconds']:.3f}s")
+
+    return True
+
+
+class StreamUnavailable(Exception):
+    """The device (or stand-in) can't serve a streamed reply; use the buffered RPC instead."""
+
+
+class CliStream:
+    """
+    A separate SSH session to the device's CLI (port 22 by default) that runs
+    "show route ... | display xml" and hands back the reply bytes as they arrive.
+
+    dev.rpc.* always buffers the whole reply into an element tree, and Junos's NETCONF
+    subsystem (port 830) refuses exec requests, so streaming needs its own login to the
+    CLI: SSH must be enabled on the device and the account must land in the Junos CLI
+    (not a shell). One session serves every peer of a device; close() it when done.
+
+    Usage:
+        with CliStream.open("10.1.1.1", "netops", password) as cli:
+            for chunk in cli.chunks("show route receive-protocol bgp 10.2.2.2 table inet.0"):
+                ...
+    """
+
+    def __init__(self, client, timeout=None):
+        self._client = client
+        self.timeout = timeout
+
+    @classmethod
+    def open(cls, host, username, password=None, port=22, timeout=None):
+        """
+        Logs in with paramiko (keys and the SSH agent are tried too, as ssh would).
+
+        Raises:
+            StreamUnavailable: The CLI session couldn't be opened.
+        """
+        import paramiko  # Only loaded when streaming was asked for (--stream)
+
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(host, port=port, username=username, password=password,
+                           timeout=timeout, banner_timeout=timeout, auth_timeout=timeout)
+        except Exception as e:
+            client.close()
+            raise StreamUnavailable(f"CLI SSH session to {host}:{port} failed ({type(e).__name__}: {e})")
+        return cls(client, timeout)
+
+    def chunks(self, command, chunk_size=65536):
+        """
+        Runs command with "| display xml | no-more" on a new channel of the session.
+
+        The channel is opened before anything is read, so a refused request raises
+        StreamUnavailable here and the caller can still use the buffered RPC.
+
+        Returns:
+            Iterator[bytes]: The raw reply, in whatever chunk sizes the transport delivers.
+        """
+        try:
+            channel = self._client.get_transport().open_session()
+        except Exception as e:
+            raise StreamUnavailable(f"CLI session can't open a channel ({type(e).__name__}: {e})")
+
+        try:
+            channel.settimeout(self.timeout)
+            channel.exec_command(f"{command} | display xml | no-more")
+        except Exception as e:
+            channel.close()
+            raise StreamUnavailable(f"exec request refused ({type(e).__name__}: {e})")
+
+        def read():
+            try:
+                while True:
+                    data = channel.recv(chunk_size)
+                    if not data:
+                        break
+                    yield data
+            finally:
+                channel.close()
+
+        return read()
+
+    def close(self):
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_streamed_peer_routes(f, chunks, peer_ip, rib, section):
+    """
+    Writes one peer section straight to the snapshot file while the reply is still being parsed.
+
+    The route count isn't known until the last route, so the header is written with room
+    to spare and patched in place at the end (padded with trailing spaces).
+
+    Returns:
+        count (int): Routes written for this peer.
+        error (Exception | None): Failure that cut the stream short, if any.
+    """
+    header_pos = f.tell()
+    placeholder = f"== Peer: {peer_ip} | Table: {rib} | Routes: 0 ==" + " " * 12
+    f.write(placeholder + "\n")
+    f.write(f"\n--- {section} ---\n")
+
+    count = 0
+    error = None
+    try:
+        for dest, nh_to in xml_extract.iter_streamed_routes(chunks, rib):
+            f.write(f"- {dest}, Next hop: {nh_to}\n")
+            count += 1
+    except Exception as e:
+        error = e
+
+    end_pos = f.tell()
+    f.seek(header_pos)
+    f.write(f"== Peer: {peer_ip} | Table: {rib} | Routes: {count} ==".ljust(len(placeholder)))
+    f.seek(end_pos)
+
+    return count, error
+
+
+def collect_routes(dev, peers, hostname, timestamp, engine="lxml", stream=None, filename=None, lean=False):
     """
     Collects RECEIVED BGP routes for each peer using the Junos RPC:
         <get-route-information receive-protocol-name="bgp" .../>
 
     Output:
         Creates a timestamped file showing received routes per BGP peer.
+
+    With stream (an open CliStream) each route is written as soon as it is parsed from
+    the reply, so peak memory doesn't grow with the table size (falling back to the
+    buffered RPC when the CLI session can't run the command). With lean=True the
+    device is asked for terse output (see route_query() and verify_lean_routes()).
     """
-    filename = f"{hostname}-BGP-Routes-{timestamp}.txt"
+    filename = filename or f"{hostname}-BGP-Routes-{timestamp}.txt"
 
     with open(filename, "w") as f:
         f.write(f"BGP Route Collection for {hostname}\nGenerated: {timestamp}\n\n")
@@ -93,16 +334,38 @@ def collect_routes(dev, peers, hostname, timestamp):
                 f.write("=" * 60 + "\n\n")
                 continue
 
+            if stream:
+                # Same query as the RPC below, streamed and written route by route;
+                # falls through to the RPC (for this and later peers) if it can't stream
+                command = route_command(peer_ip, rib, "received", lean)
+                try:
+                    chunks = stream.chunks(command)
+                except StreamUnavailable as e:
+                    print(f"[!] Streaming not available on {hostname}: {e} — using buffered RPCs")
+                    stream = None
+                else:
+                    with metrics.rpc_sample("show route receive-protocol", peer=peer_ip, kind="received") as sample:
+                        route_count, error = write_streamed_peer_routes(
+                            f, metrics.counted(chunks, sample), peer_ip, rib, "RECEIVED ROUTES"
+                        )
+                        sample.routes(route_count)
+                    if error:
+                        msg = f"[!] Failed to get received routes for {peer_ip}: {error}"
+                        print(msg)
+                        f.write(msg + "\n")
+                    else:
+                        print(f"📥 Received routes streamed for {peer_ip} ({route_count} routes)")
+                    f.write("=" * 60 + "\n\n")
+                    continue
+
             try:
                 # Perform the RPC call to fetch received BGP routes for this peer.
-                rpc = dev.rpc.get_route_information(
-                    receive_protocol_name="bgp",
-                    peer=peer_ip,
-                    table=rib
-                )
-                # Convert raw XML to string and extract desired data
-                rpc_xml = etree.tostring(rpc, pretty_print=True, encoding="unicode")
-                routes, route_count = extract_destinations_from_rib(rpc_xml, rib)
+                with metrics.rpc_sample("get_route_information", peer=peer_ip, kind="received") as sample:
+                    rpc = dev.rpc.get_route_information(**route_query(peer_ip, rib, "received", lean))
+                    sample.reply(metrics.reply_size(dev))
+                    # Extract destinations + next hops from the reply
+                    routes, route_count = extract_routes_from_rpc(rpc, rib, engine)
+                    sample.routes(route_count)
 
                 # Write routes to file, grouped by peer
                 f.write(f"== Peer: {peer_ip} | Table: {rib} | Routes: {route_count} ==\n")
@@ -124,15 +387,21 @@ def collect_routes(dev, peers, hostname, timestamp):
     print(f"\n✅ Received route data saved to: {filename}")
 
 
-def collect_advertised_routes(dev, peers, hostname, timestamp):
+def collect_advertised_routes(dev, peers, hostname, timestamp, engine="lxml", stream=None, filename=None,
+                              lean=False):
     """
     Collects ADVERTISED BGP routes per peer using the Junos RPC:
         <get-route-information advertising-protocol-name="bgp" .../>
 
     Output:
         Writes advertised route data to a timestamped text file for each peer.
+
+    With stream (an open CliStream) each route is written as soon as it is parsed from
+    the reply, so peak memory doesn't grow with the table size (falling back to the
+    buffered RPC when the CLI session can't run the command). With lean=True the
+    device is asked for terse output (see route_query() and verify_lean_routes()).
     """
-    filename = f"{hostname}-BGP-Advertised-Routes-{timestamp}.txt"
+    filename = filename or f"{hostname}-BGP-Advertised-Routes-{timestamp}.txt"
 
     with open(filename, "w") as f:
         f.write(f"BGP Advertised Route Collection for {hostname}\nGenerated: {timestamp}\n\n")
@@ -149,15 +418,37 @@ def collect_advertised_routes(dev, peers, hostname, timestamp):
                 f.write("=" * 60 + "\n\n")
                 continue
 
+            if stream:
+                # Same query as the RPC below, streamed and written route by route;
+                # falls through to the RPC (for this and later peers) if it can't stream
+                command = route_command(peer_ip, rib, "advertised", lean)
+                try:
+                    chunks = stream.chunks(command)
+                except StreamUnavailable as e:
+                    print(f"[!] Streaming not available on {hostname}: {e} — using buffered RPCs")
+                    stream = None
+                else:
+                    with metrics.rpc_sample("show route advertising-protocol", peer=peer_ip, kind="advertised") as sample:
+                        route_count, error = write_streamed_peer_routes(
+                            f, metrics.counted(chunks, sample), peer_ip, rib, "ADVERTISED ROUTES"
+                        )
+                        sample.routes(route_count)
+                    if error:
+                        msg = f"[!] Failed to get advertised routes for {peer_ip}: {error}"
+                        print(msg)
+                        f.write(msg + "\n")
+                    else:
+                        print(f"📤 Advertised routes streamed for {peer_ip} ({route_count} routes)")
+                    f.write("=" * 60 + "\n\n")
+                    continue
+
             try:
                 # Call Junos RPC to get advertised routes sent TO the neighbor
-                rpc = dev.rpc.get_route_information(
-                    advertising_protocol_name="bgp",
-                    neighbor=peer_ip,
-                    table=rib
-                )
-                rpc_xml = etree.tostring(rpc, pretty_print=True, encoding="unicode")
-                routes, route_count = extract_destinations_from_rib(rpc_xml, rib)
+                with metrics.rpc_sample("get_route_information", peer=peer_ip, kind="advertised") as sample:
+                    rpc = dev.rpc.get_route_information(**route_query(peer_ip, rib, "advertised", lean))
+                    sample.reply(metrics.reply_size(dev))
+                    routes, route_count = extract_routes_from_rpc(rpc, rib, engine)
+                    sample.routes(route_count)
 
                 # Write header + route list
                 f.write(f"== Peer: {peer_ip} | Table: {rib} | Routes: {route_count} ==\n")
@@ -177,3 +468,147 @@ def collect_advertised_routes(dev, peers, hostname, timestamp):
             f.write("=" * 60 + "\n\n")
 
     print(f"\n✅ Advertised route data saved to: {filename}")
+
+
+def _fetch_peer_routes(dev, peer_ip, rib, kind, engine, lean=False):
+    """
+    Runs one received/advertised route RPC and extracts its routes.
+
+    Returns:
+        routes (list[str]), route_count (int), error (str | None), seconds (float)
+    """
+    started = time.perf_counter()
+    try:
+        with metrics.rpc_sample("get_route_information", peer=peer_ip, kind=kind) as sample:
+            rpc = dev.rpc.get_route_information(**route_query(peer_ip, rib, kind, lean))
+            sample.reply(metrics.reply_size(dev))
+            routes, route_count = extract_routes_from_rpc(rpc, rib, engine)
+            sample.routes(route_count)
+        error = None
+    except Exception as e:
+        routes, route_count = [], 0
+        error = f"[!] Failed to get {kind} routes for {peer_ip}: {e}"
+    return routes, route_count, error, time.perf_counter() - started
+
+
+def _write_peer_sections(f, peers, results, kind):
+    """Writes every peer's section for one direction, in the original peer order."""
+    section = "RECEIVED ROUTES" if kind == "received" else "ADVERTISED ROUTES"
+
+    for index, peer in enumerate(peers):
+        peer_ip = peer["peer_ip"]
+        rib = peer["rib_table"]
+
+        if not rib or rib == "N/A":
+            f.write(f"== Peer: {peer_ip} | Table: N/A | Routes: 0 ==\n")
+            f.write("[!] Skipped — no rib table defined.\n")
+            f.write("=" * 60 + "\n\n")
+            continue
+
+        routes, route_count, error, _ = results[(index, kind)]
+        f.write(f"== Peer: {peer_ip} | Table: {rib} | Routes: {route_count} ==\n")
+        f.write(f"\n--- {section} ---\n")
+        if error:
+            f.write(error + "\n")
+        else:
+            for route in routes:
+                f.write(f"{route}\n")
+        f.write("=" * 60 + "\n\n")
+
+
+def collect_routes_parallel(dev, peers, hostname, timestamp, open_session=None, sessions=3, engine="lxml",
+                            lean=False, received_file=None, advertised_file=None):
+    """
+    Collects RECEIVED and ADVERTISED routes for every peer in one pass, spreading the
+    RPCs across a small pool of NETCONF sessions to the same device.
+
+    Parameters:
+        dev (Device): Already-open session; always used as the first worker.
+        open_session (callable): Returns a new open Device (or None) for each extra session.
+        sessions (int): Total concurrent sessions, including dev.
+        lean (bool): Ask the device for terse route output (see route_query()).
+        received_file, advertised_file (str): Output paths (default: the timestamped names).
+
+    Output:
+        Writes the same two timestamped files as collect_routes() and
+        collect_advertised_routes(), with peers in their original order.
+
+    Returns:
+        List[dict]: Per-peer timing (seconds spent on the received and advertised RPCs).
+    """
+    tasks = queue.Queue()
+    for index, peer in enumerate(peers):
+        rib = peer["rib_table"]
+        if not rib or rib == "N/A":
+            print(f"[!] Skipping {peer['peer_ip']} — no rib table defined.")
+            continue
+        tasks.put((index, "received"))
+        tasks.put((index, "advertised"))
+
+    # === Open the extra sessions (the caller's session is always worker #1) ===
+    workers_devs = [dev]
+    while open_session and len(workers_devs) < max(1, sessions):
+        extra = open_session()
+        if extra is None:
+            print("[!] Could not open another session — continuing with fewer workers.")
+            break
+        workers_devs.append(extra)
+
+    results = {}
+    results_lock = threading.Lock()
+    device = metrics.current_device() or hostname
+
+    def worker(worker_dev):
+        # Threads don't inherit the caller's device scope
+        with metrics.device_scope(device):
+            while True:
+                try:
+                    index, kind = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                peer = peers[index]
+                outcome = _fetch_peer_routes(worker_dev, peer["peer_ip"], peer["rib_table"], kind, engine, lean)
+                with results_lock:
+                    results[(index, kind)] = outcome
+                icon = "📥" if kind == "received" else "📤"
+                print(f"{icon} {kind.capitalize()} routes collected for {peer['peer_ip']} ({outcome[1]} routes)")
+
+    print(f"🔀 Collecting routes for {len(peers)} peers over {len(workers_devs)} sessions...")
+    threads = [threading.Thread(target=worker, args=(d,), daemon=True) for d in workers_devs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Close only the sessions we opened; the caller owns dev.
+    for extra in workers_devs[1:]:
+        try:
+            extra.close()
+        except Exception:
+            pass
+
+    # === Write both files in deterministic peer order ===
+    received_file = received_file or f"{hostname}-BGP-Routes-{timestamp}.txt"
+    with open(received_file, "w") as f:
+        f.write(f"BGP Route Collection for {hostname}\nGenerated: {timestamp}\n\n")
+        _write_peer_sections(f, peers, results, "received")
+
+    advertised_file = advertised_file or f"{hostname}-BGP-Advertised-Routes-{timestamp}.txt"
+    with open(advertised_file, "w") as f:
+        f.write(f"BGP Advertised Route Collection for {hostname}\nGenerated: {timestamp}\n\n")
+        _write_peer_sections(f, peers, results, "advertised")
+
+    # === Per-peer timing report ===
+    timings = []
+    print("\n⏱  Per-peer RPC timing:")
+    for index, peer in enumerate(peers):
+        if (index, "received") not in results:
+            continue
+        received_s = results[(index, "received")][3]
+        advertised_s = results[(index, "advertised")][3]
+        timings.append({"peer_ip": peer["peer_ip"], "received_s": received_s, "advertised_s": advertised_s})
+        print(f"    {peer['peer_ip']:<40} received: {received_s:.2f}s  advertised: {advertised_s:.2f}s")
+
+    print(f"\n✅ Received route data saved to: {received_file}")
+    print(f"✅ Advertised route data saved to: {advertised_file}")
+    return timings
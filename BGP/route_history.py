@@ -0,0 +1,365 @@
+# route_history.py
+
+# Indexed route history across many snapshots.
+#
+# Ingests the timestamped *-BGP-Routes-*.txt files written by route_dump into a
+# SQLite store. Instead of a copy of every table, each device keeps its current
+# routes plus one event per change (+ added, - removed, ~ next hop changed),
+# indexed by (device, peer, prefix). That keeps per-prefix timelines, churn rates
+# and top-N flapping queries to an index lookup or one grouped scan. Ingest is
+# incremental: only files not already in the store are read.
+
+import argparse
+import glob
+import os
+import sqlite3
+from datetime import datetime
+from itertools import groupby
+
+from diff_tool import iter_received_routes
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id        INTEGER PRIMARY KEY,
+    device    TEXT NOT NULL,
+    taken_at  TEXT NOT NULL,
+    path      TEXT NOT NULL UNIQUE,
+    routes    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_device ON snapshots (device, taken_at);
+
+CREATE TABLE IF NOT EXISTS current_routes (
+    device    TEXT NOT NULL,
+    peer      TEXT NOT NULL,
+    prefix    TEXT NOT NULL,
+    next_hop  TEXT,
+    since     INTEGER NOT NULL,
+    PRIMARY KEY (device, peer, prefix)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    device      TEXT NOT NULL,
+    peer        TEXT NOT NULL,
+    prefix      TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    kind        TEXT NOT NULL,
+    nh_before   TEXT,
+    nh_after    TEXT
+);
+CREATE INDEX IF NOT EXISTS events_prefix ON events (device, peer, prefix, snapshot_id);
+CREATE INDEX IF NOT EXISTS events_snapshot ON events (snapshot_id);
+"""
+
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M"
+
+
+def open_store(db_path="bgp_history.db"):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_snapshot_name(path):
+    """
+    Splits "<device>-BGP-Routes-<timestamp>.txt" into (device, ISO timestamp).
+    Falls back to the file's mtime when the timestamp isn't in route_dump's format.
+    """
+    name = os.path.basename(path)
+    if "-BGP-Routes-" not in name:
+        return None, None
+    device, stamp = name[:-len(".txt")].split("-BGP-Routes-", 1) if name.endswith(".txt") \
+        else name.split("-BGP-Routes-", 1)
+    try:
+        taken_at = datetime.strptime(stamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        taken_at = datetime.fromtimestamp(os.path.getmtime(path))
+    return device, taken_at.isoformat(timespec="seconds")
+
+
+def _scan_sections(path):
+    """
+    Returns (listed, failed): every peer with a section header in a snapshot, whether
+    or not it has routes, and the peers whose section carries an "[!]" error line
+    (same rule as incremental.failed_sections()).
+    """
+    listed = set()
+    failed = set()
+    current = None
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("== Peer: "):
+                current = line[len("== Peer: "):].split(" ", 1)[0]
+                listed.add(current)
+            elif line.startswith("[!]") and current is not None:
+                failed.add(current)
+    return listed, failed
+
+
+def _apply_snapshot(conn, device, snapshot_id, path, baseline):
+    """
+    Diffs one snapshot against the device's current routes, peer by peer, and
+    records the changes. The first snapshot of a device only seeds current_routes.
+
+    A peer section with no routes (skipped peer) or with an error marker (failed RPC,
+    or a stream cut short after some routes) says nothing reliable about the peer's
+    table, so its current routes are left as they are and no events are logged.
+    Only peers missing from the snapshot altogether lose their routes.
+
+    Returns:
+        (routes, events) counts.
+    """
+    listed, failed = _scan_sections(path)
+    seen_peers = set()
+    routes = 0
+    events = 0
+
+    for peer, rows in groupby(iter_received_routes(path), key=lambda r: r[0]):
+        new = {}
+        for _, prefix, nh in rows:
+            new[prefix] = nh
+        routes += len(new)
+        if peer in failed:
+            continue  # Possibly partial: not the peer's full table
+
+        # A peer's section may (rarely) appear twice; merge with what we already applied
+        if peer in seen_peers:
+            old = dict(conn.execute(
+                "SELECT prefix, next_hop FROM current_routes WHERE device=? AND peer=?", (device, peer)))
+            old.update(new)
+            new = old
+        seen_peers.add(peer)
+
+        old = dict(conn.execute(
+            "SELECT prefix, next_hop FROM current_routes WHERE device=? AND peer=?", (device, peer)))
+
+        added = [(p, nh) for p, nh in new.items() if p not in old]
+        removed = [(p, nh) for p, nh in old.items() if p not in new]
+        changed = [(p, old[p], nh) for p, nh in new.items() if p in old and old[p] != nh]
+
+        conn.executemany(
+            "INSERT INTO current_routes (device, peer, prefix, next_hop, since) VALUES (?, ?, ?, ?, ?)",
+            ((device, peer, p, nh, snapshot_id) for p, nh in added))
+        conn.executemany(
+            "DELETE FROM current_routes WHERE device=? AND peer=? AND prefix=?",
+            ((device, peer, p) for p, _ in removed))
+        conn.executemany(
+            "UPDATE current_routes SET next_hop=?, since=? WHERE device=? AND peer=? AND prefix=?",
+            ((nh, snapshot_id, device, peer, p) for p, _, nh in changed))
+
+        if not baseline:
+            conn.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(device, peer, p, snapshot_id, "+", None, nh) for p, nh in added]
+                + [(device, peer, p, snapshot_id, "-", nh, None) for p, nh in removed]
+                + [(device, peer, p, snapshot_id, "~", a, b) for p, a, b in changed])
+            events += len(added) + len(removed) + len(changed)
+
+    # Peers that vanished from this snapshot lose all their routes
+    gone = [row[0] for row in conn.execute(
+        "SELECT DISTINCT peer FROM current_routes WHERE device=?", (device,))
+        if row[0] not in seen_peers and row[0] not in listed]
+    for peer in gone:
+        rows = conn.execute(
+            "SELECT prefix, next_hop FROM current_routes WHERE device=? AND peer=?", (device, peer)).fetchall()
+        if not baseline:
+            conn.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((device, peer, p, snapshot_id, "-", nh, None) for p, nh in rows))
+            events += len(rows)
+        conn.execute("DELETE FROM current_routes WHERE device=? AND peer=?", (device, peer))
+
+    return routes, events
+
+
+def _rebuild_device(conn, device):
+    """
+    Replays every known snapshot of a device in time order (used for out-of-order ingest).
+    Snapshot files that have been deleted since they were ingested are skipped.
+    """
+    conn.execute("DELETE FROM current_routes WHERE device=?", (device,))
+    conn.execute("DELETE FROM events WHERE device=?", (device,))
+    snapshots = conn.execute(
+        "SELECT id, path FROM snapshots WHERE device=? ORDER BY taken_at, id", (device,)).fetchall()
+    baseline = True
+    for snapshot_id, path in snapshots:
+        if not os.path.exists(path):
+            print(f"[!] {path} no longer exists — left out of the rebuilt history")
+            continue
+        _apply_snapshot(conn, device, snapshot_id, path, baseline=baseline)
+        baseline = False
+
+
+def ingest(conn, paths):
+    """
+    Adds any snapshot files not already in the store, oldest first.
+
+    Returns:
+        int: Number of snapshots ingested.
+    """
+    known = {row[0] for row in conn.execute("SELECT path FROM snapshots")}
+    pending = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if path in known:
+            continue
+        device, taken_at = parse_snapshot_name(path)
+        if device:
+            pending.append((taken_at, device, path))
+
+    ingested = 0
+    for taken_at, device, path in sorted(pending):
+        with conn:
+            latest = conn.execute(
+                "SELECT MAX(taken_at), COUNT(*) FROM snapshots WHERE device=?", (device,)).fetchone()
+            cursor = conn.execute(
+                "INSERT INTO snapshots (device, taken_at, path, routes) VALUES (?, ?, ?, 0)",
+                (device, taken_at, path))
+            snapshot_id = cursor.lastrowid
+
+            if latest[0] is not None and taken_at < latest[0]:
+                print(f"[!] {os.path.basename(path)} is older than stored history — rebuilding {device}")
+                _rebuild_device(conn, device)
+                events = None
+                routes = sum(1 for _ in iter_received_routes(path))
+            else:
+                routes, events = _apply_snapshot(conn, device, snapshot_id, path, baseline=(latest[1] == 0))
+
+            conn.execute("UPDATE snapshots SET routes=? WHERE id=?", (routes, snapshot_id))
+
+        ingested += 1
+        if events is None:
+            note = "history rebuilt"
+        elif latest[1] == 0:
+            note = "baseline"
+        else:
+            note = f"{events} changes"
+        print(f"📥 Ingested {os.path.basename(path)} ({routes} routes, {note})")
+
+    return ingested
+
+
+def prefix_timeline(conn, device, peer, prefix):
+    """
+    Returns the change history of one prefix, oldest first:
+    [(taken_at, kind, nh_before, nh_after), ...]. Routes present since the first
+    snapshot show up as the current row's "since" only.
+    """
+    return conn.execute(
+        """SELECT s.taken_at, e.kind, e.nh_before, e.nh_after
+           FROM events e JOIN snapshots s ON s.id = e.snapshot_id
+           WHERE e.device=? AND e.peer=? AND e.prefix=?
+           ORDER BY s.taken_at, e.snapshot_id""",
+        (device, peer, prefix)).fetchall()
+
+
+def last_next_hop_change(conn, device, peer, prefix):
+    """When the prefix's next hop last changed, or None."""
+    row = conn.execute(
+        """SELECT s.taken_at, e.nh_before, e.nh_after
+           FROM events e JOIN snapshots s ON s.id = e.snapshot_id
+           WHERE e.device=? AND e.peer=? AND e.prefix=? AND e.kind='~'
+           ORDER BY s.taken_at DESC LIMIT 1""",
+        (device, peer, prefix)).fetchone()
+    return row
+
+
+def peer_churn(conn, device=None):
+    """
+    Per-peer churn: total change events, snapshots covered and events per snapshot.
+    Returns [(device, peer, events, snapshots, events_per_snapshot), ...] busiest first.
+    """
+    where, params = ("WHERE e.device=?", (device,)) if device else ("", ())
+    rows = conn.execute(
+        f"""SELECT e.device, e.peer, COUNT(*)
+            FROM events e {where}
+            GROUP BY e.device, e.peer""", params).fetchall()
+    snapshot_counts = dict(conn.execute("SELECT device, COUNT(*) FROM snapshots GROUP BY device"))
+
+    result = []
+    for dev, peer, events in rows:
+        intervals = max(snapshot_counts.get(dev, 1) - 1, 1)
+        result.append((dev, peer, events, snapshot_counts.get(dev, 0), round(events / intervals, 2)))
+    result.sort(key=lambda r: r[2], reverse=True)
+    return result
+
+
+def top_flapping(conn, limit=20, device=None):
+    """Prefixes with the most change events: [(device, peer, prefix, events), ...]."""
+    where, params = ("WHERE device=?", (device,)) if device else ("", ())
+    return conn.execute(
+        f"""SELECT device, peer, prefix, COUNT(*) AS n
+            FROM events {where}
+            GROUP BY device, peer, prefix
+            ORDER BY n DESC, device, peer, prefix
+            LIMIT ?""", params + (limit,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route history store for BGP snapshots.")
+    parser.add_argument("--db", default="bgp_history.db", help="SQLite history store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="Ingest new *-BGP-Routes-*.txt snapshots")
+    p_ingest.add_argument("paths", nargs="+", help="Snapshot files or directories")
+
+    p_timeline = sub.add_parser("timeline", help="Change history of one prefix")
+    p_timeline.add_argument("--device", required=True)
+    p_timeline.add_argument("--peer", required=True)
+    p_timeline.add_argument("--prefix", required=True)
+
+    p_churn = sub.add_parser("churn", help="Per-peer churn rates")
+    p_churn.add_argument("--device")
+
+    p_top = sub.add_parser("top", help="Top-N flapping prefixes")
+    p_top.add_argument("-n", type=int, default=20)
+    p_top.add_argument("--device")
+
+    args = parser.parse_args()
+    conn = open_store(args.db)
+
+    if args.command == "ingest":
+        files = []
+        for path in args.paths:
+            if os.path.isdir(path):
+                files.extend(glob.glob(os.path.join(path, "*-BGP-Routes-*.txt")))
+            else:
+                files.append(path)
+        count = ingest(conn, files)
+        print(f"✅ {count} new snapshots ingested")
+
+    elif args.command == "timeline":
+        current = conn.execute(
+            """SELECT c.next_hop, s.taken_at FROM current_routes c JOIN snapshots s ON s.id = c.since
+               WHERE c.device=? AND c.peer=? AND c.prefix=?""",
+            (args.device, args.peer, args.prefix)).fetchone()
+        print(f"\n=== Timeline for {args.prefix} via {args.peer} on {args.device} ===")
+        for taken_at, kind, nh_before, nh_after in prefix_timeline(conn, args.device, args.peer, args.prefix):
+            if kind == "+":
+                print(f"{taken_at}  + added (next hop: {nh_after})")
+            elif kind == "-":
+                print(f"{taken_at}  - removed (was: {nh_before})")
+            else:
+                print(f"{taken_at}  ~ next hop {nh_before} → {nh_after}")
+        if current:
+            print(f"Now: next hop {current[0]} (unchanged since {current[1]})")
+        else:
+            print("Now: not present")
+
+    elif args.command == "churn":
+        print(f"\n{'Device':<20} {'Peer':<40} {'Events':>8} {'Snaps':>6} {'Per snap':>9}")
+        for dev, peer, events, snaps, rate in peer_churn(conn, args.device):
+            print(f"{dev:<20} {peer:<40} {events:>8} {snaps:>6} {rate:>9}")
+
+    elif args.command == "top":
+        print(f"\n{'Device':<20} {'Peer':<40} {'Prefix':<44} {'Events':>6}")
+        for dev, peer, prefix, n in top_flapping(conn, args.n, args.device):
+            print(f"{dev:<20} {peer:<40} {prefix:<44} {n:>6}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
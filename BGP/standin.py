@@ -0,0 +1,302 @@
+# standin.py
+
+# Local stand-in for a Junos device, for offline and load testing.
+#
+# An inventory entry with a "standin" block is served from here instead of a NETCONF
+# session on port 830:
+#
+#   devices:
+#     - host: lab-r1
+#       username: lab
+#       standin:
+#         mode: record            # record | replay | synthetic
+#         path: recordings/lab-r1 # where replies are recorded / replayed from
+#         latency: 0.05           # seconds per RPC, or "recorded" to replay real timings
+#         jitter: 0.02            # +/- seconds of uniform jitter
+#         rpc_latency:            # per-RPC overrides
+#           get_route_information: 0.4
+#         bandwidth_mbps: 100     # optional: adds transfer time for large replies
+#
+# "record" connects to the real device and saves every dev.rpc.* reply (and how long
+# it took); "replay" answers the same calls from those files; "synthetic" answers
+# from a synthetic.SyntheticTopology built from the block's peers/routes/multipath/
+# ipv6_ratio keys. Replay and synthetic devices sleep for the configured latency,
+# which releases the GIL, so fleet workers and session pools overlap as they would
+# against real routers.
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from jnpr.junos.exception import RpcError
+from lxml import etree
+
+from synthetic import SyntheticTopology, rpc_key
+
+
+_PARSER = etree.XMLParser(huge_tree=True)
+
+# Sources are shared by every session opened to the same stand-in, so a session pool
+# doesn't render or load the same replies once per session.
+_SOURCES = {}
+_SOURCES_LOCK = threading.Lock()
+
+
+class LatencyModel:
+    """
+    Per-RPC delay: a base latency (or the recorded one), uniform jitter, and an
+    optional transfer time from reply size and bandwidth.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rpc_latency=None, bandwidth_mbps=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rpc_latency = rpc_latency or {}
+        self.bandwidth_mbps = bandwidth_mbps
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            latency=config.get("latency", 0.0),
+            jitter=float(config.get("jitter", 0.0)),
+            rpc_latency=config.get("rpc_latency"),
+            bandwidth_mbps=config.get("bandwidth_mbps"),
+            seed=config.get("seed"),
+        )
+
+    def delay(self, rpc_name, size, recorded=None):
+        base = self.rpc_latency.get(rpc_name, self.latency)
+        if base == "recorded":
+            base = recorded or 0.0
+        seconds = float(base)
+        if self.jitter:
+            seconds += self._random.uniform(-self.jitter, self.jitter)
+        if self.bandwidth_mbps:
+            seconds += size * 8 / (float(self.bandwidth_mbps) * 1_000_000)
+        return max(0.0, seconds)
+
+
+class RecordingStore:
+    """
+    Directory of recorded replies: one XML file per distinct RPC call, plus
+    index.json with the call arguments, reply size and device latency.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        try:
+            with open(self._index_path, "r") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def key(rpc_name, kwargs):
+        name, args = rpc_key(rpc_name, kwargs)
+        return json.dumps([name, args])
+
+    def reply_xml(self, rpc_name, kwargs):
+        entry = self.index.get(self.key(rpc_name, kwargs))
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+            return f.read()
+
+    def recorded_seconds(self, rpc_name, kwargs):
+        entry = self.index.get(self.key(rpc_name, kwargs))
+        return entry["seconds"] if entry else None
+
+    def record(self, rpc_name, kwargs, data, seconds):
+        key = self.key(rpc_name, kwargs)
+        filename = f"{rpc_name}-{hashlib.sha1(key.encode()).hexdigest()[:12]}.xml"
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, filename), "wb") as f:
+                f.write(data)
+            self.index[key] = {
+                "rpc": rpc_name,
+                "args": {k: str(v) for k, v in kwargs.items()},
+                "file": filename,
+                "bytes": len(data),
+                "seconds": round(seconds, 4),
+                "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            tmp_path = f"{self._index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(tmp_path, self._index_path)
+
+
+class SyntheticSource:
+    """Synthetic replies, rendered once per distinct call and shared between sessions."""
+
+    def __init__(self, topology):
+        self.topology = topology
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def reply_xml(self, rpc_name, kwargs):
+        key = rpc_key(rpc_name, kwargs)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self.topology.reply_xml(rpc_name, kwargs)
+            return self._cache[key]
+
+
+class _RpcProxy:
+    """dev.rpc.<name>(**kwargs) for the stand-in devices."""
+
+    def __init__(self, call):
+        self._call = call
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda **kwargs: self._call(name, kwargs)
+
+
+class StandinDevice:
+    """
+    Replays replies from a source (RecordingStore or SyntheticSource) with simulated
+    latency. Calls with no reply raise RpcError, as a real device would for a bad query.
+    """
+
+    def __init__(self, host, source, latency=None):
+        self.host = host
+        self.source = source
+        self.latency = latency or LatencyModel()
+        self.rpc = _RpcProxy(self._call)
+        self.timeout = 30
+        self.last_reply_bytes = None
+        self.connected = False
+        self.calls = 0
+
+    def _call(self, rpc_name, kwargs):
+        self.calls += 1
+        data = self.source.reply_xml(rpc_name, kwargs)
+        recorded = None
+        if hasattr(self.source, "recorded_seconds"):
+            recorded = self.source.recorded_seconds(rpc_name, kwargs)
+        time.sleep(self.latency.delay(rpc_name, len(data or b""), recorded))
+
+        self.last_reply_bytes = len(data) if data is not None else None
+        if data is None:
+            raise RpcError(rsp=etree.fromstring(
+                "<rpc-error><error-severity>error</error-severity>"
+                f"<error-message>stand-in {self.host} has no reply for {rpc_name} {kwargs}</error-message>"
+                "</rpc-error>"
+            ))
+        return etree.fromstring(data, parser=_PARSER)
+
+    def open(self):
+        self.connected = True
+        return self
+
+    def close(self):
+        self.connected = False
+
+
+class RecordingDevice:
+    """
+    Wraps an open PyEZ Device and saves every dev.rpc.* reply to a RecordingStore.
+    Everything else (close(), timeout) is the real device's.
+    """
+
+    def __init__(self, dev, store):
+        self._dev = dev
+        self._store = store
+        self.rpc = _RpcProxy(self._call)
+
+    def _call(self, rpc_name, kwargs):
+        started = time.perf_counter()
+        reply = getattr(self._dev.rpc, rpc_name)(**kwargs)
+        seconds = time.perf_counter() - started
+        data = etree.tostring(reply)
+        self._store.record(rpc_name, kwargs, data, seconds)
+        self.last_reply_bytes = len(data)
+        return reply
+
+    def __getattr__(self, name):
+        return getattr(self._dev, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_") or name in ("rpc", "last_reply_bytes"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._dev, name, value)
+
+
+def _shared_source(host, config):
+    mode = config.get("mode", "replay")
+    path = config.get("path") or os.path.join("recordings", str(host))
+    cache_key = (host, mode, path)
+
+    with _SOURCES_LOCK:
+        source = _SOURCES.get(cache_key)
+        if source is None:
+            if mode == "synthetic":
+                topology = SyntheticTopology(
+                    peers=int(config.get("peers", 4)),
+                    routes_per_peer=int(config.get("routes", 10000)),
+                    multipath=int(config.get("multipath", 1)),
+                    ipv6_ratio=float(config.get("ipv6_ratio", 0.0)),
+                    advertised_ratio=float(config.get("advertised_ratio", 0.1)),
+                    seed=int(config.get("seed", 1)),
+                )
+                source = SyntheticSource(topology)
+            else:
+                source = RecordingStore(path)
+            _SOURCES[cache_key] = source
+    return source
+
+
+def needs_password(device_info):
+    """Only stand-ins in record mode (and real devices) need credentials."""
+    config = device_info.get("standin")
+    return not config or config.get("mode", "replay") == "record"
+
+
+def open_standin(device_info, connect, password=None, timeout=None):
+    """
+    Opens the stand-in described by device_info["standin"].
+
+    Parameters:
+        connect (callable): Opens the real device; used in record mode only.
+
+    Returns:
+        An open device object with the dev.rpc.* interface, or None on failure.
+    """
+    host = device_info["host"]
+    config = device_info["standin"]
+    mode = config.get("mode", "replay")
+
+    if mode == "record":
+        real_info = {k: v for k, v in device_info.items() if k != "standin"}
+        dev = connect(real_info, password=password, timeout=timeout)
+        if dev is None:
+            return None
+        store = _shared_source(host, {**config, "mode": "replay"})
+        print(f"⏺️  Recording RPC replies from {host} to {store.directory}")
+        return RecordingDevice(dev, store)
+
+    if mode not in ("replay", "synthetic"):
+        print(f"[!] Unknown stand-in mode {mode!r} for {host}")
+        return None
+
+    source = _shared_source(host, config)
+    if mode == "replay" and not source.index:
+        print(f"[!] No recorded replies for {host} in {source.directory}")
+        return None
+
+    dev = StandinDevice(host, source, LatencyModel.from_config(config))
+    if timeout:
+        dev.timeout = int(timeout)
+    print(f"🎭 Using {mode} stand-in for {host}")
+    return dev.open()
@@ -0,0 +1,393 @@
+# synthetic.py
+
+# Synthetic Junos BGP data for benchmarks and offline testing.
+#
+# A SyntheticTopology describes a router's BGP peers (count, IPv4/IPv6 mix) and the
+# routes each one sends and receives (routes per peer, multipath next hops). From it
+# we can render the same replies a Junos box returns for
+#   get-bgp-summary-information, get-bgp-neighbor-information, get-route-information
+# and write text snapshots in exactly the layout route_dump produces. Everything is
+# derived from the seed, so the same parameters always give the same data, and
+# after() produces a second snapshot with a controlled amount of churn for diffs.
+
+import argparse
+import os
+import random
+from xml.sax.saxutils import escape
+
+from jnpr.junos.exception import RpcError
+from lxml import etree
+
+
+LOCAL_AS = 64512
+ELAPSED_TIME = "1w2d 3:04:05"
+
+
+def _v4_prefix(index, base=1 << 16):
+    value = (base + index) << 8
+    return f"{value >> 24 & 255}.{value >> 16 & 255}.{value >> 8 & 255}.0/24"
+
+
+def _v6_prefix(index, base=0x2400):
+    # Both groups are kept non-zero so the text is already in canonical form
+    return f"{base:x}:{0x1000 + (index >> 15):x}:{0x8000 | (index & 0x7fff):x}::/48"
+
+
+class SyntheticTopology:
+    """
+    Peers and routes of one synthetic router.
+
+    Parameters:
+        peers (int): Number of BGP peers.
+        routes_per_peer (int): Received routes per peer (before churn).
+        multipath (int): Next hops listed per route (Junos reports them as repeated <nh>).
+        ipv6_ratio (float): Fraction of peers that are IPv6 sessions in inet6.0.
+        advertised_ratio (float): Advertised routes per peer, relative to routes_per_peer.
+        churn (float): Fraction of routes removed, re-routed and added relative to the
+                       base data (split evenly). 0 for a baseline snapshot.
+        seed (int): Seed for everything random (peer ASNs, churn decisions).
+    """
+
+    def __init__(self, peers=4, routes_per_peer=1000, multipath=1, ipv6_ratio=0.0, advertised_ratio=0.1,
+                 churn=0.0, seed=1):
+        self.peer_count = peers
+        self.routes_per_peer = routes_per_peer
+        self.multipath = max(1, multipath)
+        self.ipv6_ratio = ipv6_ratio
+        self.advertised_ratio = advertised_ratio
+        self.churn = churn
+        self.seed = seed
+
+        rng = random.Random(seed)
+        v6_peers = round(peers * ipv6_ratio)
+        self.peers = []
+        for index in range(peers):
+            family = 6 if index >= peers - v6_peers else 4
+            peer_as = rng.choice([LOCAL_AS, rng.randint(64513, 65534)])
+            if family == 4:
+                address = f"10.{index >> 8 & 255}.{index & 255}.1"
+                local_address = f"10.{index >> 8 & 255}.{index & 255}.2"
+            else:
+                address = f"2001:db8:ffff:{index:x}::1"
+                local_address = f"2001:db8:ffff:{index:x}::2"
+            self.peers.append({
+                "index": index,
+                "family": family,
+                "address": address,
+                "local_address": local_address,
+                "peer_as": peer_as,
+                "table": "inet6.0" if family == 6 else "inet.0",
+                "group": "IBGP" if peer_as == LOCAL_AS else f"EBGP-{peer_as}",
+                "type": "Internal" if peer_as == LOCAL_AS else "External",
+            })
+
+    def after(self, churn=0.01, seed=None):
+        """Same peers, with churn applied to their routes (the "post-change" snapshot)."""
+        return SyntheticTopology(
+            self.peer_count, self.routes_per_peer, self.multipath, self.ipv6_ratio, self.advertised_ratio,
+            churn=churn, seed=self.seed if seed is None else seed,
+        )
+
+    def peer(self, address):
+        for peer in self.peers:
+            if peer["address"] == address:
+                return peer
+        return None
+
+    def _next_hops(self, peer, rerouted=False):
+        base = peer["address"].rsplit(".", 1)[0] + "." if peer["family"] == 4 else peer["address"][:-1]
+        first = 254 if rerouted else 1
+        return [f"{base}{first + k}" if peer["family"] == 4 else f"{base}{first + k:x}"
+                for k in range(self.multipath)]
+
+    def route_count(self, kind="received"):
+        if kind == "advertised":
+            return max(1, int(self.routes_per_peer * self.advertised_ratio))
+        return self.routes_per_peer
+
+    def routes(self, peer, kind="received"):
+        """
+        Yields (prefix, [next_hop, ...]) for one peer's received or advertised routes.
+        """
+        count = self.route_count(kind)
+        family = peer["family"]
+
+        if kind == "advertised":
+            # Locally originated space, the same for every peer, next hop "Self"
+            for i in range(count):
+                yield (_v6_prefix(i, base=0x2a00) if family == 6 else _v4_prefix(i, base=100 << 16)), ["Self"]
+            return
+
+        prefix_of = _v6_prefix if family == 6 else _v4_prefix
+        next_hops = self._next_hops(peer)
+        rerouted = self._next_hops(peer, rerouted=True)
+
+        if not self.churn:
+            for i in range(count):
+                yield prefix_of(i), next_hops
+            return
+
+        rng = random.Random(self.seed * 1_000_003 + peer["index"])
+        third = self.churn / 3
+        for i in range(count):
+            r = rng.random()
+            if r < third:
+                continue
+            yield prefix_of(i), rerouted if r < 2 * third else next_hops
+        for i in range(count, count + int(count * third)):
+            yield prefix_of(i), next_hops
+
+    # === Junos XML replies ===
+
+    def _rib_xml(self, peer, advertised=True):
+        received = self.route_count("received")
+        lines = [
+            "<bgp-rib>",
+            f"<name>{peer['table']}</name>",
+            f"<active-prefix-count>{received}</active-prefix-count>",
+            f"<received-prefix-count>{received}</received-prefix-count>",
+            f"<accepted-prefix-count>{received}</accepted-prefix-count>",
+            "<suppressed-prefix-count>0</suppressed-prefix-count>",
+        ]
+        if advertised:
+            lines.append(f"<advertised-prefix-count>{self.route_count('advertised')}</advertised-prefix-count>")
+        lines.append("</bgp-rib>")
+        return "\n".join(lines)
+
+    def summary_xml(self):
+        """<bgp-information> as returned by get-bgp-summary-information."""
+        parts = ["<bgp-information>", f"<group-count>{len({p['group'] for p in self.peers})}</group-count>",
+                 f"<peer-count>{len(self.peers)}</peer-count>"]
+        for peer in self.peers:
+            parts += [
+                "<bgp-peer>",
+                f"<peer-address>{peer['address']}</peer-address>",
+                f"<peer-as>{peer['peer_as']}</peer-as>",
+                "<input-messages>1024</input-messages>",
+                "<output-messages>1024</output-messages>",
+                "<flap-count>0</flap-count>",
+                "<peer-state>Established</peer-state>",
+                f"<elapsed-time>{ELAPSED_TIME}</elapsed-time>",
+                self._rib_xml(peer, advertised=False),
+                "</bgp-peer>",
+            ]
+        parts.append("</bgp-information>")
+        return "\n".join(parts).encode()
+
+    def neighbor_xml(self, neighbor_address=None):
+        """<bgp-information> as returned by get-bgp-neighbor-information (all peers, or one)."""
+        parts = ["<bgp-information>"]
+        for peer in self.peers:
+            if neighbor_address and peer["address"] != neighbor_address:
+                continue
+            parts += [
+                "<bgp-peer>",
+                f"<peer-address>{peer['address']}+179</peer-address>",
+                f"<peer-as>{peer['peer_as']}</peer-as>",
+                f"<local-address>{peer['local_address']}+54321</local-address>",
+                f"<local-as>{LOCAL_AS}</local-as>",
+                f"<peer-group>{peer['group']}</peer-group>",
+                "<peer-cfg-rti>master</peer-cfg-rti>",
+                "<peer-state>Established</peer-state>",
+                f"<peer-type>{peer['type']}</peer-type>",
+                "<peer-flags>Sync</peer-flags>",
+                "<last-state>OpenConfirm</last-state>",
+                "<holdtime>90</holdtime>",
+                self._rib_xml(peer),
+                "</bgp-peer>",
+            ]
+        parts.append("</bgp-information>")
+        return "\n".join(parts).encode()
+
+    def route_xml(self, peer, kind="received", terse=False):
+        """
+        <route-information> for one peer, as returned by get-route-information with
+        receive-protocol-name/peer (received) or advertising-protocol-name/neighbor.
+        terse=True renders the terse style, which leaves out MED and local preference.
+        """
+        table = peer["table"]
+        routes = list(self.routes(peer, kind))
+        as_path = "I" if peer["peer_as"] == LOCAL_AS else f"{peer['peer_as']} 65100 I"
+
+        parts = [
+            "<route-information>",
+            "<route-table>",
+            f"<table-name>{table}</table-name>",
+            f"<destination-count>{len(routes)}</destination-count>",
+            f"<total-route-count>{len(routes)}</total-route-count>",
+            f"<active-route-count>{len(routes)}</active-route-count>",
+            "<holddown-route-count>0</holddown-route-count>",
+            "<hidden-route-count>0</hidden-route-count>",
+        ]
+        append = parts.append
+        style = "terse" if terse else "brief"
+        attributes = "" if terse else "<med>0</med><local-preference>100</local-preference>"
+        for prefix, next_hops in routes:
+            nh_xml = "".join(f"<nh><to>{escape(nh)}</to></nh>" for nh in next_hops)
+            append(
+                f'<rt style="{style}"><rt-destination>{prefix}</rt-destination>'
+                f"<rt-entry><active-tag>*</active-tag>{nh_xml}{attributes}"
+                f"<as-path>{as_path}</as-path></rt-entry></rt>"
+            )
+        parts += ["</route-table>", "</route-information>"]
+        return "\n".join(parts).encode()
+
+    def reply_xml(self, rpc_name, kwargs):
+        """
+        Renders the reply to dev.rpc.<rpc_name>(**kwargs), or None for an RPC that
+        isn't modelled. Route queries for an unknown peer/table get an empty reply.
+        """
+        if rpc_name == "get_bgp_summary_information":
+            return self.summary_xml()
+        if rpc_name == "get_bgp_neighbor_information":
+            return self.neighbor_xml(kwargs.get("neighbor_address"))
+        if rpc_name == "get_route_information":
+            advertised = "advertising_protocol_name" in kwargs
+            peer = self.peer(kwargs.get("neighbor") if advertised else kwargs.get("peer"))
+            table = kwargs.get("table")
+            if peer is None or (table and table != peer["table"]):
+                return b"<route-information/>"
+            return self.route_xml(peer, "advertised" if advertised else "received",
+                                  terse=bool(kwargs.get("terse")))
+        return None
+
+    # === Text snapshots ===
+
+    def write_snapshot(self, path, hostname="synthetic", timestamp="2024-01-01_00-00", kind="received"):
+        """
+        Writes a snapshot file in the exact layout of route_dump.collect_routes()
+        (or collect_advertised_routes()). Returns the number of routes written.
+        """
+        if kind == "received":
+            title, section = "BGP Route Collection", "RECEIVED ROUTES"
+        else:
+            title, section = "BGP Advertised Route Collection", "ADVERTISED ROUTES"
+
+        total = 0
+        with open(path, "w") as f:
+            f.write(f"{title} for {hostname}\nGenerated: {timestamp}\n\n")
+            for peer in self.peers:
+                lines = [f"- {prefix}, Next hop: {next_hops[0]}\n" for prefix, next_hops in self.routes(peer, kind)]
+                f.write(f"== Peer: {peer['address']} | Table: {peer['table']} | Routes: {len(lines)} ==\n")
+                f.write(f"\n--- {section} ---\n")
+                f.writelines(lines)
+                f.write("=" * 60 + "\n\n")
+                total += len(lines)
+        return total
+
+
+def rpc_key(rpc_name, kwargs):
+    """Hashable identity of one dev.rpc.<rpc_name>(**kwargs) call."""
+    return rpc_name, tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+
+
+class _SyntheticRpc:
+    """dev.rpc.<name>(**kwargs), answered by the owning device."""
+
+    def __init__(self, device):
+        self._device = device
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda **kwargs: self._device.call(name, kwargs)
+
+
+class SyntheticDevice:
+    """
+    Stand-in for an open PyEZ Device that answers from a SyntheticTopology.
+
+    Replies are rendered once and kept as bytes; every call parses them into a fresh
+    element, the same work PyEZ does with a real reply.
+    """
+
+    def __init__(self, topology, hostname="synthetic"):
+        self.topology = topology
+        self.hostname = hostname
+        self.rpc = _SyntheticRpc(self)
+        self.timeout = 30
+        self.last_reply_bytes = None
+        self._replies = {}
+
+    def call(self, rpc_name, kwargs):
+        key = rpc_key(rpc_name, kwargs)
+        data = self._replies.get(key)
+        if data is None:
+            data = self.topology.reply_xml(rpc_name, kwargs)
+            if data is None:
+                # Same error path as a real device (and the replay stand-in) for a bad query
+                raise RpcError(rsp=etree.fromstring(
+                    "<rpc-error><error-severity>error</error-severity>"
+                    f"<error-message>synthetic device does not model {escape(rpc_name)}</error-message>"
+                    "</rpc-error>"
+                ))
+            self._replies[key] = data
+        self.last_reply_bytes = len(data)
+        return etree.fromstring(data, parser=etree.XMLParser(huge_tree=True))
+
+    def open(self):
+        return self
+
+    def close(self):
+        pass
+
+
+def write_dataset(topology, out_dir, hostname="synthetic", after_churn=0.01):
+    """
+    Writes XML replies and text snapshots for a topology to out_dir:
+      bgp-summary.xml, bgp-neighbor.xml, routes/<peer>-<kind>.xml and
+      before/after received snapshots plus the advertised snapshot.
+    """
+    os.makedirs(os.path.join(out_dir, "routes"), exist_ok=True)
+
+    with open(os.path.join(out_dir, "bgp-summary.xml"), "wb") as f:
+        f.write(topology.summary_xml())
+    with open(os.path.join(out_dir, "bgp-neighbor.xml"), "wb") as f:
+        f.write(topology.neighbor_xml())
+    for peer in topology.peers:
+        name = peer["address"].replace(":", "_")
+        for kind in ("received", "advertised"):
+            with open(os.path.join(out_dir, "routes", f"{name}-{kind}.xml"), "wb") as f:
+                f.write(topology.route_xml(peer, kind))
+
+    topology.write_snapshot(os.path.join(out_dir, f"{hostname}-BGP-Routes-before.txt"), hostname, "before")
+    topology.write_snapshot(os.path.join(out_dir, f"{hostname}-BGP-Advertised-Routes-before.txt"),
+                            hostname, "before", kind="advertised")
+    topology.after(after_churn).write_snapshot(
+        os.path.join(out_dir, f"{hostname}-BGP-Routes-after.txt"), hostname, "after"
+    )
+
+
+def add_topology_arguments(parser):
+    """Shared CLI flags for building a SyntheticTopology."""
+    parser.add_argument("--peers", type=int, default=4, help="Number of BGP peers")
+    parser.add_argument("--routes", type=int, default=10000, help="Received routes per peer")
+    parser.add_argument("--multipath", type=int, default=1, help="Next hops per route")
+    parser.add_argument("--ipv6-ratio", type=float, default=0.0, help="Fraction of IPv6 peers (0-1)")
+    parser.add_argument("--advertised-ratio", type=float, default=0.1,
+                        help="Advertised routes per peer, relative to --routes")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+
+
+def topology_from_args(args):
+    return SyntheticTopology(
+        peers=args.peers, routes_per_peer=args.routes, multipath=args.multipath,
+        ipv6_ratio=args.ipv6_ratio, advertised_ratio=args.advertised_ratio, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Junos BGP XML replies and snapshots.")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--hostname", default="synthetic", help="Hostname used in snapshot files")
+    parser.add_argument("--churn", type=float, default=0.01, help="Churn between the before/after snapshots")
+    add_topology_arguments(parser)
+    args = parser.parse_args()
+
+    topology = topology_from_args(args)
+    write_dataset(topology, args.out, hostname=args.hostname, after_churn=args.churn)
+    print(f"✅ Wrote {args.peers} peers x {args.routes} routes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
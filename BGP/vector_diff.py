@@ -0,0 +1,249 @@
+# vector_diff.py
+
+# NumPy-vectorized diff engine for million-route snapshots.
+#
+# Each snapshot is loaded into columnar arrays (peer id, family, network as two
+# uint64 halves, prefix length, next-hop id), with peers and next hops interned
+# into one table shared by both snapshots. Rows are keyed with a single lexsort,
+# de-duplicated, and the added / removed / changed sets are found with
+# searchsorted instead of per-prefix dict lookups. Only the changed rows go back
+# to Python for formatting, and the output is identical to diff_tool.diff_routes().
+#
+# Binary snapshots are loaded straight from their packed sections with
+# np.frombuffer, without formatting a single prefix.
+
+import socket
+
+import numpy as np
+
+from binary_snapshot import (
+    BinarySnapshotReader, is_binary_snapshot, pack_prefix, KIND_RECEIVED,
+)
+from diff_tool import iter_received_routes, format_change
+
+
+# Families used in the columns. Prefixes that aren't canonical IP text are keyed
+# by their interned string instead (family 0), so the join stays exact.
+FAMILY_STRING = 0
+FAMILY_V4 = 4
+FAMILY_V6 = 6
+
+_V4_DTYPE = np.dtype([("net", "<u4"), ("plen", "u1"), ("nh", "<u4")])
+_V6_DTYPE = np.dtype([("hi", ">u8"), ("lo", ">u8"), ("plen", "u1"), ("nh", "<u4")])
+_OTHER_DTYPE = np.dtype([("prefix", "<u4"), ("nh", "<u4")])
+
+
+class Interner:
+    """Maps strings to dense ids, shared by both snapshots of a diff."""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+
+def _empty_columns():
+    return {
+        "peer": np.empty(0, np.int64), "family": np.empty(0, np.uint8),
+        "hi": np.empty(0, np.uint64), "lo": np.empty(0, np.uint64),
+        "plen": np.empty(0, np.uint8), "nh": np.empty(0, np.int64),
+    }
+
+
+def _concat(parts):
+    if not parts:
+        return _empty_columns()
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+
+def _prefix_columns(prefix, interner):
+    """(family, hi, lo, plen) for one prefix string."""
+    packed = pack_prefix(prefix)
+    if packed is None:
+        return FAMILY_STRING, 0, interner.intern(prefix), 0
+    if packed[0] == 4:
+        return FAMILY_V4, 0, packed[1], packed[2]
+    network = int.from_bytes(packed[1], "big")
+    return FAMILY_V6, network >> 64, network & 0xFFFFFFFFFFFFFFFF, packed[2]
+
+
+def _load_text_columns(file_path, interner):
+    peers, nhs, prefix_rows = [], [], []
+    intern = interner.intern
+    # Full tables from several peers repeat the same prefixes, so each distinct
+    # prefix string is packed once and reused.
+    packed_cache = {}
+
+    for peer, prefix, nh in iter_received_routes(file_path):
+        row = packed_cache.get(prefix)
+        if row is None:
+            row = packed_cache[prefix] = _prefix_columns(prefix, interner)
+        peers.append(intern(peer))
+        nhs.append(intern(nh))
+        prefix_rows.append(row)
+
+    if not prefix_rows:
+        return _empty_columns()
+
+    families, his, los, plens = zip(*prefix_rows)
+    return {
+        "peer": np.array(peers, np.int64), "family": np.array(families, np.uint8),
+        "hi": np.array(his, np.uint64), "lo": np.array(los, np.uint64),
+        "plen": np.array(plens, np.uint8), "nh": np.array(nhs, np.int64),
+    }
+
+
+def _load_binary_columns(file_path, interner):
+    parts = []
+    with BinarySnapshotReader(file_path) as reader:
+        # File-local string ids → shared ids
+        string_map = np.array([interner.intern(s) for s in reader.strings], np.int64)
+
+        for section in reader.sections:
+            if section["kind"] != KIND_RECEIVED:
+                continue
+            data = reader._section_bytes(section)
+            n4, n6, n_other = np.frombuffer(data, "<u4", 3)
+            pos = 12
+            peer_id = interner.intern(section["peer"])
+
+            v4 = np.frombuffer(data, _V4_DTYPE, n4, pos)
+            pos += n4 * _V4_DTYPE.itemsize
+            v6 = np.frombuffer(data, _V6_DTYPE, n6, pos)
+            pos += n6 * _V6_DTYPE.itemsize
+            other = np.frombuffer(data, _OTHER_DTYPE, n_other, pos)
+
+            # Keep file order (v4, v6, other) — the same order iter_section() yields.
+            parts.append({
+                "peer": np.full(n4, peer_id, np.int64), "family": np.full(n4, FAMILY_V4, np.uint8),
+                "hi": np.zeros(n4, np.uint64), "lo": v4["net"].astype(np.uint64),
+                "plen": v4["plen"].copy(), "nh": string_map[v4["nh"]],
+            })
+            parts.append({
+                "peer": np.full(n6, peer_id, np.int64), "family": np.full(n6, FAMILY_V6, np.uint8),
+                "hi": v6["hi"].astype(np.uint64), "lo": v6["lo"].astype(np.uint64),
+                "plen": v6["plen"].copy(), "nh": string_map[v6["nh"]],
+            })
+            parts.append({
+                "peer": np.full(n_other, peer_id, np.int64), "family": np.full(n_other, FAMILY_STRING, np.uint8),
+                "hi": np.zeros(n_other, np.uint64), "lo": string_map[other["prefix"]].astype(np.uint64),
+                "plen": np.zeros(n_other, np.uint8), "nh": string_map[other["nh"]],
+            })
+
+    return _concat(parts)
+
+
+def load_columns(file_path, interner):
+    """Loads the RECEIVED routes of a text or binary snapshot into columnar arrays."""
+    if is_binary_snapshot(file_path):
+        return _load_binary_columns(file_path, interner)
+    return _load_text_columns(file_path, interner)
+
+
+def _format_prefix(family, hi, lo, plen, interner):
+    if family == FAMILY_V4:
+        return f"{socket.inet_ntop(socket.AF_INET, int(lo).to_bytes(4, 'big'))}/{plen}"
+    if family == FAMILY_V6:
+        network = (int(hi) << 64) | int(lo)
+        return f"{socket.inet_ntop(socket.AF_INET6, network.to_bytes(16, 'big'))}/{plen}"
+    return interner.values[int(lo)]
+
+
+def _latest_per_key(keys, nhs):
+    """Unique sorted keys with the next hop of their LAST occurrence (dict semantics)."""
+    if len(keys) == 0:
+        return keys, nhs
+    reversed_keys = keys[::-1]
+    unique_keys, first_in_reversed = np.unique(reversed_keys, return_index=True)
+    return unique_keys, nhs[::-1][first_in_reversed]
+
+
+def vector_diff(before_path, after_path, write=print):
+    """
+    Vectorized counterpart of diff_tool.diff_routes(); prints identical output.
+
+    Returns:
+        dict: Counts of added, removed and changed prefixes.
+    """
+    interner = Interner()
+    before = load_columns(before_path, interner)
+    after = load_columns(after_path, interner)
+    n_before = len(before["peer"])
+
+    # === One key per (peer, prefix) across both snapshots ===
+    cols = _concat([before, after])
+    order = np.lexsort((cols["plen"], cols["lo"], cols["hi"], cols["family"], cols["peer"]))
+    sorted_cols = {name: values[order] for name, values in cols.items()}
+    boundary = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        boundary[1:] = (
+            (np.diff(sorted_cols["peer"]) != 0)
+            | (sorted_cols["family"][1:] != sorted_cols["family"][:-1])
+            | (sorted_cols["hi"][1:] != sorted_cols["hi"][:-1])
+            | (sorted_cols["lo"][1:] != sorted_cols["lo"][:-1])
+            | (sorted_cols["plen"][1:] != sorted_cols["plen"][:-1])
+        )
+    group_of_sorted = np.cumsum(boundary) - 1
+    keys = np.empty(len(order), np.int64)
+    keys[order] = group_of_sorted
+    group_rows = order[boundary]  # one representative row per key
+
+    # === Join before/after on the key ===
+    keys_before, nh_before = _latest_per_key(keys[:n_before], cols["nh"][:n_before])
+    keys_after, nh_after = _latest_per_key(keys[n_before:], cols["nh"][n_before:])
+
+    pos = np.searchsorted(keys_after, keys_before)
+    pos_clipped = np.minimum(pos, max(len(keys_after) - 1, 0))
+    in_after = (pos < len(keys_after)) & (keys_after[pos_clipped] == keys_before) if len(keys_after) \
+        else np.zeros(len(keys_before), dtype=bool)
+    in_before = np.isin(keys_after, keys_before, assume_unique=True)
+
+    removed_idx = (~in_after).nonzero()[0]
+    added_idx = (~in_before).nonzero()[0]
+    both = in_after.nonzero()[0]
+    changed_idx = both[nh_before[both] != nh_after[pos[both]]]
+
+    counts = {"added": int(len(added_idx)), "removed": int(len(removed_idx)), "changed": int(len(changed_idx))}
+
+    # === Back to Python only for the rows that changed ===
+    # Next hops are gathered through the join indices; -1 marks a side without the route.
+    missing = np.int64(-1)
+    out_keys = np.concatenate([keys_before[removed_idx], keys_after[added_idx], keys_before[changed_idx]])
+    out_nh_before = np.concatenate([
+        nh_before[removed_idx], np.full(len(added_idx), missing), nh_before[changed_idx],
+    ])
+    out_nh_after = np.concatenate([
+        np.full(len(removed_idx), missing), nh_after[added_idx], nh_after[pos[changed_idx]],
+    ])
+    out_rows = group_rows[out_keys]
+
+    per_peer = {}
+    values = interner.values
+    for peer_id, family, hi, lo, plen, nh_b, nh_a in zip(
+        cols["peer"][out_rows].tolist(), cols["family"][out_rows].tolist(), cols["hi"][out_rows].tolist(),
+        cols["lo"][out_rows].tolist(), cols["plen"][out_rows].tolist(),
+        out_nh_before.tolist(), out_nh_after.tolist(),
+    ):
+        per_peer.setdefault(values[peer_id], []).append((
+            _format_prefix(family, hi, lo, plen, interner),
+            values[nh_b] if nh_b >= 0 else None,
+            values[nh_a] if nh_a >= 0 else None,
+        ))
+
+    all_peers = sorted({values[p] for p in np.unique(cols["peer"]).tolist()})
+    for peer in all_peers:
+        write(f"\n=== Diff for Peer: {peer} ===")
+        for prefix, nh_b, nh_a in sorted(per_peer.get(peer, [])):
+            change = format_change(prefix, nh_b, nh_a)
+            if change:
+                write(change)
+        write("-" * 50)
+
+    return counts
@@ -0,0 +1,247 @@
+# xml_extract.py
+
+# Direct lxml extraction engine for Junos BGP RPC replies.
+#
+# The original path serializes the element PyEZ hands back with etree.tostring()
+# and lets jxmlease re-parse the string into nested dicts. This module reads the
+# same fields straight off the element tree with compiled XPath, and returns the
+# same shapes, so both engines can be swapped, diffed and benchmarked.
+#
+# PyEZ strips namespaces from RPC replies, so plain tag names are used here.
+
+import argparse
+import time
+
+from lxml import etree
+
+
+ENGINES = ("lxml", "jxmlease")
+
+# === Compiled XPath expressions (compiled once, reused for every reply) ===
+_ROUTE_TABLES = etree.XPath("self::route-information/route-table")
+_TABLE_NAME = etree.XPath("string(table-name)")
+_ROUTES = etree.XPath("rt")
+_RT_DESTINATION = etree.XPath("rt-destination")
+_RT_ENTRIES = etree.XPath("rt-entry")
+_NEXT_HOPS = etree.XPath("nh")
+_NH_TO = etree.XPath("to")
+
+_BGP_PEERS = etree.XPath("self::bgp-information/bgp-peer")
+_BGP_RIBS = etree.XPath("bgp-rib")
+_LEAF_CHILDREN = etree.XPath("*[not(*)]")
+
+
+def _text(element):
+    """Returns stripped element text the way jxmlease reports it ("" when empty)."""
+    return (element.text or "").strip()
+
+
+def _leaf_fields(element):
+    """
+    Maps each leaf child tag to its text. The first occurrence wins when a tag repeats.
+    """
+    fields = {}
+    for child in _LEAF_CHILDREN(element):
+        if child.tag not in fields:
+            fields[child.tag] = _text(child)
+    return fields
+
+
+def iter_route_entries(element, expected_table):
+    """
+    Yields (destination, next_hop) pairs for every route in the named table.
+
+    Parameters:
+        element (lxml.etree._Element): <route-information> element returned by the RPC.
+        expected_table (str): Route table name (e.g. "CORE.inet.0") to filter for.
+    """
+    for table in _ROUTE_TABLES(element):
+        if _TABLE_NAME(table).strip() != expected_table:
+            continue
+
+        for route in _ROUTES(table):
+            dest_nodes = _RT_DESTINATION(route)
+            dest = _text(dest_nodes[0]) if dest_nodes else "N/A"
+            nh_to = "N/A"
+
+            # jxmlease turns repeated <rt-entry> into a list, which the original
+            # extractor could not .get() from, so those routes reported N/A.
+            # Mirror that so both engines produce identical snapshots.
+            entries = _RT_ENTRIES(route)
+            if len(entries) == 1:
+                next_hops = _NEXT_HOPS(entries[0])
+                if next_hops:
+                    to_nodes = _NH_TO(next_hops[0])
+                    if to_nodes:
+                        nh_to = _text(to_nodes[0])
+
+            yield dest, nh_to
+
+
+def extract_routes(element, expected_table):
+    """
+    lxml counterpart of route_dump.extract_destinations_from_rib().
+
+    Returns:
+        matched_routes (list[str]): Formatted route entries like "- 10.0.0.0/24, Next hop: 10.1.1.1".
+        count (int): Total number of routes matched in that table.
+    """
+    try:
+        matched_routes = [
+            f"- {dest}, Next hop: {nh_to}"
+            for dest, nh_to in iter_route_entries(element, expected_table)
+        ]
+        return matched_routes, len(matched_routes)
+
+    except Exception as e:
+        return [f"[!] Error extracting routes: {e}"], 0
+
+
+def extract_bgp_peers(element):
+    """
+    Reads every <bgp-peer> under a <bgp-information> element into a plain dict.
+
+    Leaf children are keyed by their XML tag (e.g. "peer-address"), and the first
+    <bgp-rib> block is nested under "bgp-rib", matching the jxmlease dict layout
+    that route_collector already consumes.
+
+    Returns:
+        List[dict]: One dict per <bgp-peer>.
+    """
+    peers = []
+    for peer in _BGP_PEERS(element):
+        fields = _leaf_fields(peer)
+        ribs = _BGP_RIBS(peer)
+        if ribs:
+            fields["bgp-rib"] = _leaf_fields(ribs[0])
+        peers.append(fields)
+    return peers
+
+
+def _local_name(tag):
+    """Drops any "{namespace}" prefix; CLI "| display xml" output is namespaced."""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else None
+
+
+def _route_from_streamed_element(route):
+    """
+    Same destination/next-hop rules as iter_route_entries(), for one (possibly
+    namespaced) <rt> element produced by the pull parser.
+    """
+    dest = "N/A"
+    entries = []
+    for child in route:
+        name = _local_name(child.tag)
+        if name == "rt-destination" and dest == "N/A":
+            dest = _text(child)
+        elif name == "rt-entry":
+            entries.append(child)
+
+    nh_to = "N/A"
+    if len(entries) == 1:
+        for nh in entries[0]:
+            if _local_name(nh.tag) != "nh":
+                continue
+            for to in nh:
+                if _local_name(to.tag) == "to":
+                    nh_to = _text(to)
+                    break
+            break
+
+    return dest, nh_to
+
+
+def iter_streamed_routes(chunks, expected_table):
+    """
+    Incrementally parses a <route-information> reply and yields (destination, next_hop)
+    pairs as soon as each <rt> element closes.
+
+    Every finished <rt> is cleared and detached from the tree, so memory stays flat no
+    matter how many routes the table holds.
+
+    Parameters:
+        chunks (Iterable[bytes]): Raw reply bytes, in any chunk sizes.
+        expected_table (str): Route table name (e.g. "CORE.inet.0") to filter for.
+    """
+    parser = etree.XMLPullParser(events=("start", "end"), remove_comments=True, huge_tree=True)
+    current_table = None
+
+    def drain():
+        nonlocal current_table
+        for event, element in parser.read_events():
+            name = _local_name(element.tag)
+
+            if event == "start":
+                if name == "route-table":
+                    current_table = None
+                continue
+
+            if name == "table-name":
+                current_table = _text(element)
+            elif name == "rt":
+                if current_table == expected_table:
+                    yield _route_from_streamed_element(element)
+                # Free the finished route and any siblings already handled
+                element.clear()
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+
+    parser.close()
+    yield from drain()
+
+
+def compare_engines(element, expected_table, rounds=1):
+    """
+    Runs both extraction engines against the same reply and reports whether they agree.
+
+    Returns:
+        dict: Match flag, route count and mean seconds per round for each engine.
+    """
+    # Imported here so route_dump can import this module without a cycle.
+    from route_dump import extract_destinations_from_rib
+
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        lxml_routes, lxml_count = extract_routes(element, expected_table)
+    timings["lxml"] = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        xml_str = etree.tostring(element, pretty_print=True, encoding="unicode")
+        jx_routes, jx_count = extract_destinations_from_rib(xml_str, expected_table)
+    timings["jxmlease"] = (time.perf_counter() - start) / rounds
+
+    return {
+        "match": lxml_routes == jx_routes and lxml_count == jx_count,
+        "routes": lxml_count,
+        "lxml_seconds": timings["lxml"],
+        "jxmlease_seconds": timings["jxmlease"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff and time the lxml and jxmlease route extractors.")
+    parser.add_argument("xml_file", help="Saved <route-information> reply")
+    parser.add_argument("--table", required=True, help="Route table to extract (e.g. inet.0)")
+    parser.add_argument("--rounds", type=int, default=3, help="Iterations per engine")
+    args = parser.parse_args()
+
+    element = etree.parse(args.xml_file).getroot()
+    result = compare_engines(element, args.table, rounds=args.rounds)
+
+    status = "✅ identical" if result["match"] else "❌ MISMATCH"
+    print(f"{status} — {result['routes']} routes")
+    print(f"    lxml:     {result['lxml_seconds']:.4f}s")
+    print(f"    jxmlease: {result['jxmlease_seconds']:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from jnpr.junos import Device
-from netmiko import ConnectHandler
+from netmiko_session import open_session
 from lxml import etree
 from datetime import datetime
 import os
@@ -14,7 +14,7 @@ def log_output(device_name, phase, content):
     print(f"[💾] Log saved to: {log_path}")
     return log_path
 
-def discover_and_cleanup(device):
+def discover_and_cleanup(device, timing="adaptive"):
     print("\n--- Phase 1: Discovery & Cleanup ---")
     hostname = model = version = None
 
@@ -29,7 +29,7 @@ def discover_and_cleanup(device):
 
         try:
             print(f"[↪] Connecting via Netmiko to run cleanup...")
-            net_connect = ConnectHandler(**netmiko_device)
+            net_connect = open_session(netmiko_device, mode=timing)
             cleanup_cmd = "request system storage cleanup no-confirm"
             print(f"[↪] Running: {cleanup_cmd}")
             output = net_connect.send_command(cleanup_cmd, expect_string=r"#")
@@ -1,6 +1,6 @@
 from datetime import datetime
 import os
-from netmiko import ConnectHandler
+from netmiko_session import open_session
 import time
 
 
@@ -24,7 +24,7 @@ def get_ex_success_strings():
     ]
 
 
-def install_ex_cli(device, image_filename):
+def install_ex_cli(device, image_filename, timing="adaptive"):
     print("\n🔧 [EX Mode] Using install_ex_cli.py for EX4300/EX4400 devices.\n")
     print("--- Phase 3: Junos OS Install (EX Series) ---")
     try:
@@ -37,16 +37,16 @@ def install_ex_cli(device, image_filename):
         command = f"request system software add {image_path} no-copy"
 
         print(f"[→] Connecting via Netmiko to {ip}...")
-        connection = ConnectHandler(
-            device_type="juniper",
-            host=ip,
-            username=username,
-            password=password,
-        )
+        connection = open_session({
+            "device_type": "juniper",
+            "host": ip,
+            "username": username,
+            "password": password,
+        }, mode=timing)
 
         print(f"[📦] Sending install command: {command}\n")
         connection.write_channel(command + "\n")
-        time.sleep(2)
+        time.sleep(2 * connection.poll_interval)
 
         output = "### INSTALL METHOD: install_ex_cli.py ###\n"
         timeout = 900  # 15 minutes max
@@ -70,7 +70,7 @@ def install_ex_cli(device, image_filename):
                 print(f"\n[!] Timeout reached. Installation result unclear.")
                 break
 
-            time.sleep(1)
+            time.sleep(connection.poll_interval)
 
         connection.disconnect()
         log_output(name, "phase3-install", output)
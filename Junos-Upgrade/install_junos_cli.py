@@ -1,7 +1,7 @@
 from datetime import datetime
 import os
 import time
-from netmiko import ConnectHandler
+from netmiko_session import open_session
 
 
 def log_output(device_name, phase, content):
@@ -31,7 +31,7 @@ def get_success_strings(model):
     return ["Install completed"]
 
 
-def install_junos_cli(device, image_filename):
+def install_junos_cli(device, image_filename, timing="adaptive"):
     print("\n--- Phase 3: Junos OS Install ---")
     try:
         ip = device["ip"]
@@ -43,16 +43,16 @@ def install_junos_cli(device, image_filename):
         command = f"request system software add {image_path} no-copy"
 
         print(f"[→] Connecting via Netmiko to {ip}...")
-        connection = ConnectHandler(
-            device_type="juniper",
-            host=ip,
-            username=username,
-            password=password,
-        )
+        connection = open_session({
+            "device_type": "juniper",
+            "host": ip,
+            "username": username,
+            "password": password,
+        }, mode=timing)
 
         print(f"[📦] Sending install command: {command}\n")
         connection.write_channel(command + "\n")
-        time.sleep(2)
+        time.sleep(2 * connection.poll_interval)
 
         output = ""
         timeout = 600
@@ -76,7 +76,7 @@ def install_junos_cli(device, image_filename):
                 print("\n[!] Timeout reached. Installation result unclear.")
                 break
 
-            time.sleep(1)
+            time.sleep(connection.poll_interval)
 
         connection.disconnect()
         log_output(name, "phase3-install", output)
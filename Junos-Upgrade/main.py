@@ -1,10 +1,16 @@
-from utils.inventory_loader import load_device_config
-from utils.discovery_and_cleanup import discover_and_cleanup, discover_only
-from utils.scp_transfer import scp_image_to_device
-from utils.install_junos_cli import install_junos_cli
-from utils.install_ex_cli import install_ex_cli
-import argparse
 import os
+import sys
+
+# Shared modules (netmiko_session.py) live at the repository root
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory_loader import load_device_config
+from discover_and_cleanup import discover_and_cleanup, discover_only
+from scp_transfer import scp_image_to_device
+from install_junos_cli import install_junos_cli
+from install_ex_cli import install_ex_cli
+from netmiko_session import TIMING_MODES
+import argparse
 
 
 def main():
@@ -16,6 +22,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--skip-cleanup", action="store_true", help="Skip storage cleanup")
     parser.add_argument("--skip-scp", action="store_true", help="Skip SCP file transfer")
+    parser.add_argument("--timing", choices=TIMING_MODES, default="adaptive",
+                        help="Netmiko timing: adaptive (RTT-tuned, falls back to slow) or slow")
     args = parser.parse_args()
 
     # Load device config
@@ -29,7 +37,7 @@ def main():
             print("[✖] Phase 1 discovery failed. Aborting.")
             return
     else:
-        success, hostname, model, version = discover_and_cleanup(device)
+        success, hostname, model, version = discover_and_cleanup(device, timing=args.timing)
         if not success:
             print("[✖] Phase 1 failed. Aborting.")
             return
@@ -61,10 +69,10 @@ def main():
     model_upper = model.upper()
     if "EX4400" in model_upper:
         print("[→] Using EX install method")
-        install_success = install_ex_cli(device, image_filename)
+        install_success = install_ex_cli(device, image_filename, timing=args.timing)
     else:
         print("[→] Using QFX install method")
-        install_success = install_junos_cli(device, image_filename)
+        install_success = install_junos_cli(device, image_filename, timing=args.timing)
 
     if not install_success:
         print("[✖] Phase 3 failed. Upgrade unsuccessful.")
@@ -0,0 +1,199 @@
+# config_store.py
+
+# Content-addressed, deduplicated store for configuration backups.
+#
+#   backups/
+#     objects/ab/ab12...ef.gz      one gzip blob per distinct config (sha256 of the text)
+#     deltas/<old>-<new>.diff.gz   optional unified diff between consecutive versions
+#     manifests/<timestamp>.json   one small file per run: host -> hash, site, role, ...
+#     latest.json                  host -> newest entry, for O(1) "latest config" lookups
+#
+# A config that is byte-identical to one already stored costs no new file at all; a
+# run only adds its manifest, plus blobs (and deltas) for configs that changed.
+# Entries also keep the device's newest commit line, so a later run can verify a
+# device as unchanged (verify_unchanged()) without downloading its config.
+# put() is safe to call from many backup workers at once; commit_run() writes the
+# manifest and the latest index atomically once the run is done. A resumed run puts
+# the entries checkpointed before the interruption back with restore_run() first.
+
+import argparse
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+
+DEFAULT_ROOT = "backups"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ConfigStore:
+    def __init__(self, root=DEFAULT_ROOT, keep_deltas=False):
+        self.root = root
+        self.keep_deltas = keep_deltas
+        self._lock = threading.Lock()
+        self._run = {}
+        try:
+            with open(os.path.join(root, "latest.json"), "r") as f:
+                self.latest_index = json.load(f)
+        except (OSError, ValueError):
+            self.latest_index = {}
+
+    # === Blobs ===
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.gz")
+
+    def get(self, digest):
+        """Returns the config text stored under digest."""
+        with gzip.open(self.blob_path(digest), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def _put_blob(self, text):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, gzip.compress(data, mtime=0))
+        return digest
+
+    def _put_delta(self, old_digest, new_digest, new_text):
+        path = os.path.join(self.root, "deltas", f"{old_digest[:16]}-{new_digest[:16]}.diff.gz")
+        if not os.path.exists(path):
+            diff = difflib.unified_diff(
+                self.get(old_digest).splitlines(keepends=True), new_text.splitlines(keepends=True),
+                fromfile=old_digest[:16], tofile=new_digest[:16],
+            )
+            _write_atomic(path, gzip.compress("".join(diff).encode("utf-8"), mtime=0))
+        return os.path.relpath(path, self.root)
+
+    # === Backups ===
+
+    def put(self, hostname, site, role, config_text, **extra):
+        """
+        Stores one device's config for the current run.
+
+        Returns:
+            dict: The manifest entry: hash, bytes, changed (vs. the latest stored
+                  version), delta (relative path, when kept) and any extra fields.
+        """
+        digest = self._put_blob(config_text)
+        previous = self.latest(hostname)
+        changed = previous is None or previous["hash"] != digest
+
+        entry = {
+            "site": site,
+            "role": role,
+            "hash": digest,
+            "bytes": len(config_text.encode("utf-8")),
+            "changed": changed,
+            "fetched": True,
+            "stored_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **extra,
+        }
+        if changed and previous and self.keep_deltas:
+            try:
+                entry["delta"] = self._put_delta(previous["hash"], digest, config_text)
+            except OSError:
+                pass  # Previous blob missing; the full blob is still stored
+
+        with self._lock:
+            self._run[hostname] = entry
+        return entry
+
+    def verify_unchanged(self, hostname, commit_marker):
+        """
+        Records hostname as verified for this run, without a download, when its newest
+        commit is the one the stored config was taken after.
+
+        Returns:
+            dict: The run entry (same hash, fetched=False), or None when the config
+                  has to be downloaded.
+        """
+        previous = self.latest(hostname)
+        if (not previous or previous.get("commit_marker") != commit_marker
+                or not os.path.exists(self.blob_path(previous["hash"]))):
+            return None
+
+        entry = {k: v for k, v in previous.items() if k not in ("delta", "run")}
+        entry.update({"changed": False, "fetched": False, "verified_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        with self._lock:
+            self._run[hostname] = entry
+        return entry
+
+    def run_entry(self, hostname):
+        """This run's entry for hostname, or None if it hasn't been stored yet."""
+        with self._lock:
+            return self._run.get(hostname)
+
+    def restore_run(self, entries):
+        """Adds entries stored earlier in the same run (host -> entry) back to the run."""
+        with self._lock:
+            self._run.update(entries)
+
+    def latest(self, hostname):
+        """Newest entry for hostname (this run's, if any), or None."""
+        with self._lock:
+            return self._run.get(hostname) or self.latest_index.get(hostname)
+
+    def latest_config(self, hostname):
+        entry = self.latest(hostname)
+        return self.get(entry["hash"]) if entry else None
+
+    def commit_run(self, timestamp):
+        """
+        Writes the run manifest and merges the run into latest.json.
+
+        Returns:
+            str: Path of the manifest written.
+        """
+        with self._lock:
+            run = dict(self._run)
+            self.latest_index.update({host: {**entry, "run": timestamp} for host, entry in run.items()})
+            latest = dict(self.latest_index)
+            self._run = {}
+
+        manifest_path = os.path.join(self.root, "manifests", f"{timestamp}.json")
+        _write_atomic(manifest_path, json.dumps({"timestamp": timestamp, "devices": run}, indent=2).encode())
+        _write_atomic(os.path.join(self.root, "latest.json"), json.dumps(latest, indent=2, sort_keys=True).encode())
+        return manifest_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up configs in the deduplicated backup store.")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Backup store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    latest = sub.add_parser("latest", help="Print the latest stored config for a host")
+    latest.add_argument("hostname")
+    show = sub.add_parser("show", help="Print the config stored under a hash")
+    show.add_argument("digest")
+    sub.add_parser("hosts", help="List hosts with their latest hash and run")
+    args = parser.parse_args()
+
+    store = ConfigStore(args.root)
+    if args.command == "latest":
+        config = store.latest_config(args.hostname)
+        if config is None:
+            print(f"[!] No backup stored for {args.hostname}", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.write(config)
+    elif args.command == "show":
+        sys.stdout.write(store.get(args.digest))
+    else:
+        for host, entry in sorted(store.latest_index.items()):
+            print(f"{host:<30} {entry['hash'][:16]}  {entry.get('run', '')}  {entry['site']}/{entry['role']}")
+
+
+if __name__ == "__main__":
+    main()
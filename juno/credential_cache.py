@@ -0,0 +1,68 @@
+# credential_cache.py
+
+# Remembers which account (PRIMARY or BACKUP) last logged in to each device, so the
+# next run tries that one first instead of burning an auth timeout on an account
+# that is known to fail there.
+#
+# Entries are keyed by hostname (falling back to IP), stored in one small JSON
+# file, and ignored and pruned max_age_days after the account was first
+# remembered ("since"; later successes with the same account don't extend it), so
+# a fixed PRIMARY account gets tried first again.
+
+import json
+import os
+import threading
+import time
+
+
+DEFAULT_PATH = "state/credential_affinity.json"
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+class CredentialCache:
+    def __init__(self, path=DEFAULT_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(hostname, ip):
+        return str(hostname or ip)
+
+    def _fresh(self, entry, now):
+        return now - entry.get("since", entry.get("last_success", 0)) <= self.max_age
+
+    def preferred(self, hostname, ip):
+        """Returns the label that last worked for the device, or None if unknown or aged out."""
+        with self._lock:
+            entry = self.entries.get(self.key(hostname, ip))
+        if entry and self._fresh(entry, time.time()):
+            return entry["label"]
+        return None
+
+    def record(self, hostname, ip, label):
+        now = time.time()
+        with self._lock:
+            key = self.key(hostname, ip)
+            entry = self.entries.get(key)
+            # Age counts from when this account was first remembered, not the latest login
+            since = entry.get("since", now) if entry and entry["label"] == label and self._fresh(entry, now) else now
+            self.entries[key] = {"label": label, "ip": ip, "since": since, "last_success": now}
+
+    def save(self):
+        """Writes the cache atomically, dropping aged-out entries."""
+        now = time.time()
+        with self._lock:
+            self.entries = {k: e for k, e in self.entries.items() if self._fresh(e, now)}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
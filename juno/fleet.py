@@ -0,0 +1,142 @@
+# fleet.py
+
+# Concurrent backup engine for the whole inventory.
+#
+# Devices run on one bounded thread pool (the global limit). Each site also has its
+# own limit, so a big site can't flood its jump host or TACACS servers: the
+# scheduler only starts a device when both a worker and a slot for its site are
+# free, and otherwise moves on to the next site's queue instead of blocking a worker.
+# Results come back in inventory order, in the same shape utils.print_summary() reads.
+
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import juniper
+
+
+def inventory_jobs(inventory, site_filter=None):
+    """
+    Flattens the site -> role -> devices inventory into one job per device.
+
+    Returns:
+        List[dict]: hostname, ip, port, site and role for every device, in inventory order.
+    """
+    jobs = []
+    for site, roles in inventory.items():
+        if site_filter and site.upper() != site_filter.upper():
+            continue
+        for role, devices in roles.items():
+            for device in devices:
+                jobs.append({
+                    "hostname": device["hostname"],
+                    "ip": device["ip"],
+                    "port": device.get("port", 22),
+                    "site": site,
+                    "role": role,
+                })
+    return jobs
+
+
+def _backup_job(job, credentials, store, timeout, credential_cache, precheck, timing):
+    started = time.monotonic()
+    try:
+        result = juniper.backup_device(
+            hostname=job["hostname"],
+            ip=job["ip"],
+            port=job["port"],
+            credentials=credentials,
+            site=job["site"],
+            role=job["role"],
+            store=store,
+            timeout=timeout,
+            credential_cache=credential_cache,
+            precheck=precheck,
+            timing=timing
+        )
+    except Exception as e:
+        # Anything Netmiko doesn't classify as auth/timeout (resets, read timeouts, disk errors)
+        result = {"site": job["site"], "hostname": job["hostname"], "ip": job["ip"],
+                  "success": False, "auth_used": "None", "error": str(e)}
+    result["seconds"] = round(time.monotonic() - started, 1)
+    return result
+
+
+def _format_eta(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def run_fleet_backup(jobs, credentials, store, workers=16, site_limit=4, timeout=120, credential_cache=None,
+                     precheck=False, timing="adaptive", on_result=None):
+    """
+    Backs up every job concurrently.
+
+    Parameters:
+        jobs (List[dict]): From inventory_jobs().
+        credentials (dict): load_env() output.
+        store (ConfigStore): Where configs are saved; the caller commits the run.
+        workers (int): Devices in flight across the whole fleet.
+        site_limit (int): Devices in flight per site (0 = no per-site limit).
+        timeout (int): Per-device budget in seconds, shared by connect, auth and the reads
+                       across both accounts (see juniper.backup_device()).
+        credential_cache (CredentialCache): Tries each device's last working account first.
+        precheck (bool): Skip the config download on devices with no commit since the stored one.
+        timing (str): Netmiko timing mode, "adaptive" or "slow" (see netmiko_session).
+        on_result (callable): Called with each result as its device finishes, from this
+                              thread (used to checkpoint the run journal).
+
+    Returns:
+        List[dict]: One backup_device() result per job (plus "seconds"), in job order.
+    """
+    workers = max(1, workers)
+    site_limit = site_limit if site_limit and site_limit > 0 else workers
+
+    # Per-site FIFO queues, visited round-robin so one site can't starve the others
+    queues = OrderedDict()
+    for index, job in enumerate(jobs):
+        queues.setdefault(job["site"], deque()).append(index)
+    active = {site: 0 for site in queues}
+
+    results = [None] * len(jobs)
+    started = time.monotonic()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+
+        def fill():
+            while len(running) < workers:
+                site = next((s for s, q in queues.items() if q and active[s] < site_limit), None)
+                if site is None:
+                    return
+                index = queues[site].popleft()
+                queues.move_to_end(site)
+                active[site] += 1
+                print(f"🔄 Connecting to {jobs[index]['hostname']} ({jobs[index]['ip']})...")
+                running[pool.submit(_backup_job, jobs[index], credentials, store, timeout, credential_cache, precheck, timing)] = index
+
+        fill()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                result = future.result()
+                results[index] = result
+                active[jobs[index]["site"]] -= 1
+                if on_result:
+                    on_result(result)
+                done += 1
+
+                elapsed = time.monotonic() - started
+                eta = elapsed / done * (len(jobs) - done)
+                status = "✅" if result["success"] else "❌"
+                line = (f"{status} {result['hostname']} ({result['site']}) in {result['seconds']}s "
+                        f"[{done}/{len(jobs)}, {len(running)} running, ETA {_format_eta(eta)}]")
+                if result.get("error"):
+                    line += f"  ({result['error']})"
+                print(line)
+            fill()
+
+    return results
@@ -1,14 +1,46 @@
-from netmiko import ConnectHandler, NetmikoAuthenticationException, NetmikoTimeoutException
-from backup_engine.utils import get_timestamp, create_backup_path
+import time
 
-def backup_device(hostname, ip, port, credentials, site, role):
-    timestamp = get_timestamp()
+from netmiko import NetmikoAuthenticationException, NetmikoTimeoutException
+from netmiko_session import open_session, DEFAULT_TIMING_LOG
+
+def last_commit_marker(connection, read_timeout=10.0):
+    # Newest line of the commit history ("0   2024-05-01 02:13:07 UTC by admin via cli"):
+    # a few bytes from the device instead of the whole configuration.
+    output = connection.send_command('show system commit | match "^0 " | no-more', read_timeout=read_timeout)
+    for line in output.splitlines():
+        if line.strip().startswith("0 "):
+            return " ".join(line.split())
+    return None
+
+def backup_device(hostname, ip, port, credentials, site, role, store, timeout=None, credential_cache=None,
+                  precheck=False, timing="adaptive", timing_log=DEFAULT_TIMING_LOG):
     tried_users = [
         ("PRIMARY", credentials["primary_user"], credentials["primary_pass"]),
         ("BACKUP", credentials["backup_user"], credentials["backup_pass"])
     ]
 
-    for label, user, password in tried_users:
+    # Try the account that worked last time first (credential_cache.CredentialCache)
+    preferred = credential_cache.preferred(hostname, ip) if credential_cache else None
+    if preferred:
+        tried_users.sort(key=lambda user: user[0] != preferred)
+
+    # Per-device time budget shared by every phase (connect, auth, reads) of both accounts:
+    # each phase only gets what the earlier ones left over
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining(default):
+        if deadline is None:
+            return default
+        return max(1.0, deadline - time.monotonic())
+
+    for attempt, (label, user, password) in enumerate(tried_users):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        limits = {}
+        if deadline is not None:
+            left = remaining(None)
+            limits = {"conn_timeout": left, "auth_timeout": left, "banner_timeout": left}
+
         try:
             device = {
                 "device_type": "juniper",
@@ -16,34 +48,53 @@ def backup_device(hostname, ip, port, credentials, site, role):
                 "username": user,
                 "password": password,
                 "port": port,
-                "fast_cli": False
+                **limits
             }
 
-            connection = ConnectHandler(**device)
-            output = connection.send_command("show configuration | display set | no-more")
-            connection.disconnect()
+            # Timing mode (adaptive or slow) is chosen by netmiko_session, not fast_cli
+            connection = open_session(device, mode=timing, timing_log=timing_log)
+            try:
+                # Precheck: no download when nothing was committed since the stored config
+                commit_marker = last_commit_marker(connection, remaining(10.0)) if precheck else None
+                entry = store.verify_unchanged(hostname, commit_marker) if commit_marker else None
+                if entry is None:
+                    output = connection.send_command("show configuration | display set | no-more",
+                                                     read_timeout=remaining(10.0))
+            finally:
+                connection.disconnect()
+
+            # Save output (config_store.ConfigStore keeps identical configs once)
+            if entry is None:
+                entry = store.put(hostname, site, role, output, commit_marker=commit_marker)
 
-            # Save output
-            backup_path = create_backup_path(site, role, hostname, timestamp)
-            file_path = backup_path / f"{hostname}_config.txt"
-            with open(file_path, "w") as f:
-                f.write(output)
+            if credential_cache:
+                credential_cache.record(hostname, ip, label)
 
             return {
                 "site": site,
                 "hostname": hostname,
                 "ip": ip,
                 "success": True,
-                "auth_used": label
+                "auth_used": label,
+                "config_hash": entry["hash"],
+                "changed": entry["changed"],
+                "fetched": entry["fetched"],
+                # 0 = the first account tried worked; above 0 = a fallback login was needed
+                "attempt": attempt,
+                # Logged in first time with an account the default order would have tried second
+                "fallback_avoided": attempt == 0 and label != "PRIMARY"
             }
 
         except (NetmikoAuthenticationException, NetmikoTimeoutException) as e:
             continue
 
-    return {
+    result = {
         "site": site,
         "hostname": hostname,
         "ip": ip,
         "success": False,
         "auth_used": "None"
     }
+    if deadline is not None and time.monotonic() >= deadline:
+        result["error"] = f"time budget of {timeout}s used up"
+    return result
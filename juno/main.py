@@ -1,46 +1,120 @@
-import yaml
 import argparse
-from backup_engine import juniper
-from backup_engine.utils import load_env, get_timestamp, create_backup_path, print_summary
-
-# Load .env
-secrets = load_env()
-
-# Parse CLI arguments
-parser = argparse.ArgumentParser(description="NetConfigVault - Juniper Config Backup")
-parser.add_argument("--site", help="Run backups for a specific site only")
-args = parser.parse_args()
-
-# Load inventory
-with open("inventory/inventory.yml") as f:
-    inventory = yaml.safe_load(f)
-
-# Track results
-summary = []
-
-# Loop through sites
-for site, roles in inventory.items():
-    if args.site and site.upper() != args.site.upper():
-        continue
-
-    for role, devices in roles.items():
-        for device in devices:
-            hostname = device["hostname"]
-            ip = device["ip"]
-            port = device.get("port", 22)
-
-            print(f"🔄 Connecting to {hostname} ({ip})...")
-
-            result = juniper.backup_device(
-                hostname=hostname,
-                ip=ip,
-                port=port,
-                credentials=secrets,
-                site=site,
-                role=role
-            )
-
-            summary.append(result)
-
-# Print summary
-print_summary(summary)
+import os
+import sys
+
+import yaml
+
+# Shared modules (netmiko_session.py) live at the repository root
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigStore, DEFAULT_ROOT
+from credential_cache import CredentialCache, DEFAULT_PATH, DEFAULT_MAX_AGE_DAYS
+from fleet import inventory_jobs, run_fleet_backup
+from run_journal import RunJournal, DEFAULT_PATH as DEFAULT_JOURNAL
+from utils import load_env, get_timestamp, print_summary
+from netmiko_session import TIMING_MODES
+
+
+def main():
+    # Parse CLI arguments
+    parser = argparse.ArgumentParser(description="NetConfigVault - Juniper Config Backup")
+    parser.add_argument("--site", help="Run backups for a specific site only")
+    parser.add_argument("--workers", type=int, default=16, help="Max devices backed up at once")
+    parser.add_argument("--site-limit", type=int, default=4,
+                        help="Max devices backed up at once per site (0 = no per-site limit)")
+    parser.add_argument("--timeout", type=int, default=120,
+                        help="Per-device time budget in seconds (connect, login and reads, across both accounts)")
+    parser.add_argument("--credential-cache", default=DEFAULT_PATH,
+                        help="File remembering which account last worked per device")
+    parser.add_argument("--credential-max-age", type=int, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Days before a remembered account is forgotten")
+    parser.add_argument("--no-credential-cache", action="store_true",
+                        help="Always try PRIMARY first, and don't update the cache")
+    parser.add_argument("--store", default=DEFAULT_ROOT, help="Deduplicated backup store directory")
+    parser.add_argument("--keep-deltas", action="store_true",
+                        help="Also keep a unified diff against the previous version of each changed config")
+    parser.add_argument("--precheck", action="store_true",
+                        help="Check the last commit first and only download configs committed since the last backup")
+    parser.add_argument("--timing", choices=TIMING_MODES, default="adaptive",
+                        help="Netmiko timing: adaptive (RTT-tuned, falls back to slow per device) or slow")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL,
+                        help="Run journal: every device's outcome, checkpointed as it finishes")
+    rerun = parser.add_mutually_exclusive_group()
+    rerun.add_argument("--resume", action="store_true",
+                       help="Continue the journaled run, skipping devices it already backed up")
+    rerun.add_argument("--retry-failed", action="store_true",
+                       help="Re-run only the devices whose last journaled result was a failure")
+    rerun.add_argument("--new-run", action="store_true",
+                       help="Start a fresh run even if the journaled one was interrupted (discards its checkpoint)")
+    args = parser.parse_args()
+
+    # Load .env
+    secrets = load_env()
+
+    # Load inventory
+    with open("inventory/inventory.yml") as f:
+        inventory = yaml.safe_load(f)
+
+    all_jobs = inventory_jobs(inventory, site_filter=args.site)
+    store = ConfigStore(args.store, keep_deltas=args.keep_deltas)
+
+    # Fresh run, or continue the journaled one under its original run timestamp
+    if args.resume or args.retry_failed:
+        journal = RunJournal.load(args.journal)
+        if journal is None:
+            print(f"[!] No run journal at {args.journal}; nothing to {'resume' if args.resume else 'retry'}")
+            sys.exit(1)
+        if args.resume and journal.committed:
+            print(f"✅ Run {journal.run} already completed ({journal.committed}); nothing to resume")
+            return
+        if args.resume:
+            done = journal.succeeded()
+            jobs = [job for job in all_jobs if job["hostname"] not in done]
+        else:
+            failed = journal.failed()
+            jobs = [job for job in all_jobs if job["hostname"] in failed]
+        store.restore_run(journal.stored_entries())
+        print(f"♻️  Continuing run {journal.run}: {len(journal.succeeded())} devices already backed up")
+    else:
+        # Don't throw away an interrupted run's checkpoint by accident
+        previous = RunJournal.load(args.journal)
+        if previous and not previous.committed and not args.new_run:
+            print(f"[!] Run {previous.run} was interrupted ({len(previous.succeeded())} devices backed up, "
+                  f"no manifest written). Use --resume or --retry-failed to finish it, or --new-run to discard it.")
+            sys.exit(1)
+        journal = RunJournal.start(args.journal, get_timestamp())
+        jobs = all_jobs
+
+    print(f"🗂  Backing up {len(jobs)} devices ({args.workers} workers, {args.site_limit or 'no'} per site)")
+
+    credential_cache = None
+    if not args.no_credential_cache:
+        credential_cache = CredentialCache(args.credential_cache, max_age_days=args.credential_max_age)
+
+    # Back up every device concurrently, checkpointing each outcome as it lands
+    results = run_fleet_backup(
+        jobs, secrets, store,
+        workers=args.workers, site_limit=args.site_limit, timeout=args.timeout,
+        credential_cache=credential_cache, precheck=args.precheck,
+        timing=args.timing,
+        on_result=lambda result: journal.record(result, store.run_entry(result["hostname"]))
+    )
+
+    if credential_cache:
+        credential_cache.save()
+
+    manifest = store.commit_run(journal.run)
+    journal.mark_committed(manifest)
+
+    # Whole run in inventory order, including devices finished before a resume
+    by_host = {**journal.results, **{result["hostname"]: result for result in results}}
+    summary = [by_host[job["hostname"]] for job in all_jobs if job["hostname"] in by_host]
+    changed = sum(1 for item in summary if item.get("changed"))
+    print(f"🗄  Run manifest saved to: {manifest} ({changed} configs changed)")
+
+    # Print summary
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# run_journal.py
+
+# Checkpoint file for one backup run, so a run that dies halfway (crash, Ctrl-C,
+# jump host reboot) can be picked up where it stopped instead of starting over.
+#
+#   state/backup_run.jsonl
+#     {"run": "2024-05-01_02-00", "started_at": "..."}          header, one per run
+#     {"hostname": "r1", "result": {...}, "entry": {...}}      one line per finished device
+#     {"committed": "backups/manifests/2024-05-01_02-00.json"}  once the manifest is written
+#
+# Each device line is appended and fsync'd as soon as the device finishes. "entry" is
+# the device's ConfigStore run entry (None on failure): the config blob itself is
+# already on disk, so replaying the entries is enough to rebuild the run manifest.
+# A device can appear more than once (it was retried); its last line wins. A journal
+# without the "committed" line belongs to an interrupted run, and main.py won't start
+# a fresh run over it unless told to (--new-run).
+
+import json
+import os
+import time
+
+
+DEFAULT_PATH = "state/backup_run.jsonl"
+
+
+class RunJournal:
+    def __init__(self, path, run, started_at=None):
+        self.path = path
+        self.run = run
+        self.started_at = started_at
+        self.results = {}
+        self.entries = {}
+        self.committed = None
+
+    @classmethod
+    def start(cls, path, run):
+        """Begins a new run, replacing any previous journal (check load() first)."""
+        journal = cls(path, run, time.strftime("%Y-%m-%d %H:%M:%S"))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(json.dumps({"run": run, "started_at": journal.started_at}) + "\n")
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an existing journal.
+
+        Returns:
+            RunJournal: With the last recorded result per device, or None when there is no journal.
+        """
+        try:
+            with open(path, "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+
+        journal = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Line cut short by the crash we're recovering from
+            if "run" in record:
+                journal = cls(path, record["run"], record.get("started_at"))
+            elif journal is None:
+                continue
+            elif "hostname" in record:
+                journal.results[record["hostname"]] = record["result"]
+                journal.entries[record["hostname"]] = record.get("entry")
+                journal.committed = None
+            elif "committed" in record:
+                journal.committed = record["committed"]
+        return journal
+
+    def _append(self, record):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, result, entry=None):
+        """Checkpoints one finished device. Called from the scheduler thread only."""
+        hostname = result["hostname"]
+        self.results[hostname] = result
+        self.entries[hostname] = entry if result["success"] else None
+        self._append({"hostname": hostname, "result": result, "entry": self.entries[hostname]})
+
+    def mark_committed(self, manifest_path):
+        self.committed = manifest_path
+        self._append({"committed": manifest_path, "at": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+    def succeeded(self):
+        return {host for host, result in self.results.items() if result["success"]}
+
+    def failed(self):
+        return {host for host, result in self.results.items() if not result["success"]}
+
+    def stored_entries(self):
+        """Run entries of the devices backed up so far, for ConfigStore.restore_run()."""
+        return {host: self.entries[host] for host in self.succeeded() if self.entries.get(host)}
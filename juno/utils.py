@@ -1,7 +1,6 @@
 import os
 import dotenv
 from datetime import datetime
-from pathlib import Path
 
 def load_env(env_path="secrets/.env"):
     dotenv.load_dotenv(env_path)
@@ -15,11 +14,6 @@ def load_env(env_path="secrets/.env"):
 def get_timestamp():
     return datetime.now().strftime("%Y-%m-%d_%H-%M")
 
-def create_backup_path(site, role, hostname, timestamp):
-    path = Path(f"backups/{site}/{role}/{hostname}/{timestamp}")
-    path.mkdir(parents=True, exist_ok=True)
-    return path
-
 def print_summary(summary):
     from rich import print
     from rich.table import Table
@@ -34,14 +28,23 @@ def print_summary(summary):
     success_count = 0
     fail_count = 0
     fallback_used = 0
+    fallback_avoided = 0
+    verified_unchanged = 0
 
     for item in summary:
         status = "✅ SUCCESS" if item["success"] else "❌ FAILED"
         table.add_row(item["site"], item["hostname"], item["ip"], status, item["auth_used"])
         if item["success"]:
             success_count += 1
-            if item["auth_used"] == "BACKUP":
+            # A remembered BACKUP account that worked first time isn't a fallback
+            # (results journaled before "attempt" was recorded: BACKUP means fallback)
+            attempt = item.get("attempt", 1 if item["auth_used"] == "BACKUP" else 0)
+            if attempt > 0:
                 fallback_used += 1
+            if item.get("fallback_avoided"):
+                fallback_avoided += 1
+            if item.get("fetched") is False:
+                verified_unchanged += 1
         else:
             fail_count += 1
 
@@ -50,3 +53,5 @@ def print_summary(summary):
     print(f"✔ Backups completed: {success_count}")
     print(f"✖ Failures: {fail_count}")
     print(f"🔁 Fallback logins used: {fallback_used}")
+    print(f"⚡ Fallback round trips avoided (remembered credentials): {fallback_avoided}")
+    print(f"🔎 Verified unchanged without download (commit precheck): {verified_unchanged}")
@@ -0,0 +1,226 @@
+# netmiko_session.py
+
+# Shared Netmiko session factory for the backup (juno/) and upgrade (Junos-Upgrade/) tools.
+#
+# Timing modes:
+#   slow      - Netmiko's conservative timing (fast_cli off, full delay factors): what
+#               every session in this repo used before.
+#   adaptive  - fast_cli on. After login the prompt is detected once and the channel
+#               round-trip time measured; delay factors, send_command_timing()'s quiet
+#               period and polling intervals are derived from that RTT, and commands
+#               match the known prompt instead of re-detecting it each time.
+#
+# An adaptive session that misbehaves (login prompt detection or calibration fails,
+# a command can't find the prompt) is reopened in slow mode and the command retried
+# once; that host then stays on slow timing for the rest of the process. A command
+# that hits its own read_timeout is not a timing problem (Netmiko 4 waits on
+# read_timeout, not the delay factor) and is raised as-is. Every session appends one JSON line with its
+# timings to logs/netmiko-timing.jsonl so the two modes can be compared per device.
+
+import json
+import os
+import re
+import threading
+import time
+
+from netmiko import ConnectHandler
+from netmiko.exceptions import ReadTimeout
+
+
+TIMING_MODES = ("adaptive", "slow")
+DEFAULT_TIMING_LOG = os.path.join("logs", "netmiko-timing.jsonl")
+
+# Hosts that needed the slow fallback in this process
+_SLOW_HOSTS = set()
+_LOCK = threading.Lock()
+
+# fast_cli's own global_delay_factor; calibration only ever goes below it
+FAST_CLI_DELAY_FACTOR = 0.1
+
+# Problems that mean "this device doesn't keep up with fast timing": while logging
+# in and calibrating, a prompt that never shows up or can't be recognised ...
+_CONNECT_TIMING_ERRORS = (ReadTimeout, ValueError)
+# ... and, for commands, only prompt-detection failures. A command's ReadTimeout
+# means its read_timeout was too short for the output, which slow timing won't fix.
+_COMMAND_TIMING_ERRORS = (ValueError,)
+
+
+class Session:
+    """
+    One Netmiko session with a timing mode. send_command(), send_command_timing() and
+    read_channel() etc. behave like Netmiko's; anything else is passed to the connection.
+    """
+
+    def __init__(self, params, mode="adaptive", timing_log=DEFAULT_TIMING_LOG):
+        if mode not in TIMING_MODES:
+            raise ValueError(f"Unknown timing mode {mode!r}")
+        self.params = dict(params)
+        self.params.pop("fast_cli", None)
+        self.host = self.params.get("host") or self.params.get("ip")
+        self.requested_mode = mode
+        self.mode = "slow" if mode == "adaptive" and self.host in _SLOW_HOSTS else mode
+        self.timing_log = timing_log
+        self.connection = None
+        self.prompt = None
+        self.rtt = None
+        self.fallback = None
+        self.stats = {"connect_s": 0.0, "commands": 0, "command_s": 0.0}
+
+    # === Connection ===
+
+    def _connect(self):
+        params = dict(self.params)
+        if self.mode == "slow":
+            params.update({"fast_cli": False, "global_delay_factor": 1})
+        else:
+            params["fast_cli"] = True
+
+        started = time.perf_counter()
+        self.connection = ConnectHandler(**params)
+        self.stats["connect_s"] += time.perf_counter() - started
+
+        if self.mode == "adaptive":
+            self._calibrate()
+
+    def _calibrate(self):
+        """Detects the prompt and tunes read delays from the measured round-trip time."""
+        connection = self.connection
+        self.prompt = connection.find_prompt()
+        pattern = re.escape(self.prompt.strip())
+
+        samples = []
+        for _ in range(3):
+            started = time.perf_counter()
+            connection.write_channel(connection.RETURN)
+            connection.read_until_pattern(pattern=pattern, read_timeout=10)
+            samples.append(time.perf_counter() - started)
+        self.rtt = sorted(samples)[len(samples) // 2]
+
+        # 8 ms RTT or less -> 0.02, 40 ms or more -> fast_cli's own 0.1 (never slower than plain fast_cli)
+        connection.global_delay_factor = min(FAST_CLI_DELAY_FACTOR, max(0.02, self.rtt * 2.5))
+
+    def open(self):
+        try:
+            self._connect()
+        except _CONNECT_TIMING_ERRORS as e:
+            if self.mode != "adaptive":
+                raise
+            self._fall_back(f"connect: {type(e).__name__}: {e}")
+        return self
+
+    def _fall_back(self, reason):
+        with _LOCK:
+            _SLOW_HOSTS.add(self.host)
+        self.fallback = reason
+        print(f"[!] {self.host}: adaptive timing failed ({reason}) — reconnecting with slow timing")
+        if self.connection is not None:
+            try:
+                self.connection.disconnect()
+            except Exception:
+                pass
+        self.mode = "slow"
+        self.prompt = self.rtt = None
+        self._connect()
+
+    # === Derived timing ===
+
+    @property
+    def last_read(self):
+        """Quiet period send_command_timing() waits for (Netmiko's default is 2s)."""
+        return 2.0 if self.mode == "slow" else min(2.0, max(0.2, self.rtt * 4))
+
+    @property
+    def poll_interval(self):
+        """Seconds between read_channel() polls when watching long-running output."""
+        return 1.0 if self.mode == "slow" else min(1.0, max(0.2, self.rtt * 4))
+
+    # === Commands ===
+
+    def _run(self, method, command, **kwargs):
+        started = time.perf_counter()
+        try:
+            if self.mode == "adaptive":
+                try:
+                    return method(self, command, **kwargs)
+                except _COMMAND_TIMING_ERRORS as e:
+                    self._fall_back(f"{command!r}: {type(e).__name__}: {e}")
+            return method(self, command, **kwargs)
+        finally:
+            self.stats["commands"] += 1
+            self.stats["command_s"] += time.perf_counter() - started
+
+    def _send_command(self, command, **kwargs):
+        if self.mode == "adaptive" and "expect_string" not in kwargs:
+            # The prompt is known; skip Netmiko's find_prompt() round trip per command
+            kwargs.setdefault("auto_find_prompt", False)
+        return self.connection.send_command(command, **kwargs)
+
+    def _send_command_timing(self, command, **kwargs):
+        kwargs.setdefault("last_read", self.last_read)
+        return self.connection.send_command_timing(command, **kwargs)
+
+    def send_command(self, command, **kwargs):
+        return self._run(Session._send_command, command, **kwargs)
+
+    def send_command_timing(self, command, **kwargs):
+        return self._run(Session._send_command_timing, command, **kwargs)
+
+    def __getattr__(self, name):
+        # write_channel(), read_channel(), ... straight from the Netmiko connection
+        return getattr(self.connection, name)
+
+    # === Teardown ===
+
+    def disconnect(self):
+        if self.connection is not None:
+            try:
+                self.connection.disconnect()
+            finally:
+                self.connection = None
+                self._log()
+
+    def _log(self):
+        if not self.timing_log:
+            return
+        record = {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "host": self.host,
+            "requested_mode": self.requested_mode,
+            "mode": self.mode,
+            "fallback": self.fallback,
+            "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            "connect_s": round(self.stats["connect_s"], 3),
+            "commands": self.stats["commands"],
+            "command_s": round(self.stats["command_s"], 3),
+        }
+        try:
+            directory = os.path.dirname(self.timing_log)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _LOCK, open(self.timing_log, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass  # Timing is diagnostics only
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.disconnect()
+
+
+def open_session(params, mode="adaptive", timing_log=DEFAULT_TIMING_LOG):
+    """
+    Opens a Netmiko session with the given timing mode.
+
+    Parameters:
+        params (dict): ConnectHandler arguments (device_type, host/ip, username, ...).
+                       Any "fast_cli" is ignored; the mode decides.
+        mode (str): "adaptive" or "slow".
+        timing_log (str): JSON-lines file for per-session timings (None to disable).
+
+    Returns:
+        Session: Open session. Authentication and TCP connect errors are raised as
+                 Netmiko raises them, so callers can still try other credentials.
+    """
+    return Session(params, mode, timing_log).open()
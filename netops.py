@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# netops.py
+
+# One entry point for the tools in this repository:
+#
+#   python3 netops.py bgp snapshot [options]   -> BGP/fleet.py
+#   python3 netops.py bgp diff [options]       -> BGP/diff_tool.py
+#   python3 netops.py backup [options]         -> juno/main.py
+#   python3 netops.py upgrade [options]        -> Junos-Upgrade/main.py
+#   python3 netops.py check-startup            -> import-time regression check
+#
+# Only the standard library is loaded up front. A subcommand puts its tool's
+# directory on sys.path and imports that tool's main() when it runs, so offline
+# commands such as "bgp diff" never pay for PyEZ, lxml, jxmlease, Netmiko or
+# paramiko. Options after the subcommand go to the tool unchanged ("--help" included).
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (command words) -> (tool directory, module with main(), description)
+COMMANDS = {
+    ("bgp", "snapshot"): ("BGP", "fleet", "Concurrent BGP snapshot across the inventory"),
+    ("bgp", "diff"): ("BGP", "diff_tool", "Diff received routes between two snapshots (offline)"),
+    ("backup",): ("juno", "main", "Back up Juniper configurations for every site"),
+    ("upgrade",): ("Junos-Upgrade", "main", "Discover, clean up, transfer and install Junos OS"),
+}
+
+# Commands that never touch a device, and the modules they must not import
+OFFLINE_COMMANDS = (("bgp", "diff"),)
+HEAVY_MODULES = ("jnpr", "lxml", "jxmlease", "netmiko", "paramiko", "yaml", "numpy", "dotenv", "rich", "tqdm")
+
+
+def print_usage(stream=sys.stdout):
+    print("usage: netops.py <command> [options]\n\ncommands:", file=stream)
+    for words, (_, _, description) in COMMANDS.items():
+        print(f"  {' '.join(words):<16} {description}", file=stream)
+    print(f"  {'check-startup':<16} Fail if offline commands import heavy modules or start slowly", file=stream)
+    print("\nRun 'netops.py <command> --help' for the options of each command.", file=stream)
+
+
+def resolve(argv):
+    """
+    Matches the leading words of argv against COMMANDS.
+
+    Returns:
+        (words, rest): The matched command words and the tool's own arguments,
+                       or (None, argv) when nothing matches.
+    """
+    for words in sorted(COMMANDS, key=len, reverse=True):
+        if tuple(argv[:len(words)]) == words:
+            return words, argv[len(words):]
+    return None, argv
+
+
+def run_command(words, rest):
+    """
+    Imports the tool behind words and hands it the remaining arguments.
+
+    Returns:
+        The tool's main() result, or 1 when the tool can't be imported.
+    """
+    directory, module_name, _ = COMMANDS[words]
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+    import importlib
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        # A missing dependency or a module the tool needs that isn't in this checkout
+        missing = f"module {e.name!r}" if e.name else str(e)
+        print(f"[!] '{' '.join(words)}' is not available: {missing} could not be imported "
+              f"(needed by {directory}/{module_name}.py)", file=sys.stderr)
+        return 1
+
+    # The tools parse sys.argv themselves; the prog name keeps their usage lines accurate
+    sys.argv = [" ".join(("netops.py",) + words)] + list(rest)
+    return module.main()
+
+
+# === Import-time regression check ===
+
+def _write_sample_snapshots(directory):
+    """Two tiny received-route snapshots, enough to drive a real offline diff."""
+    paths = []
+    for name, next_hop in (("before", "10.0.0.1"), ("after", "10.0.0.2")):
+        path = os.path.join(directory, f"{name}.txt")
+        with open(path, "w") as f:
+            f.write(f"BGP Route Collection for check\nGenerated: {name}\n\n")
+            f.write("== Peer: 192.0.2.1 | Table: inet.0 | Routes: 1 ==\n")
+            f.write("\n--- RECEIVED ROUTES ---\n")
+            f.write(f"- 198.51.100.0/24, Next hop: {next_hop}\n")
+            f.write("=" * 60 + "\n\n")
+        paths.append(path)
+    return paths
+
+
+def measure_startup(argv):
+    """
+    Runs "netops.py <argv>" under -X importtime.
+
+    Returns:
+        dict: wall-clock milliseconds, total import milliseconds, and the heavy modules imported.
+    """
+    import subprocess
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__)] + list(argv),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    import_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        import_us += int(self_us)
+        modules.add(name.strip().split(".")[0])
+
+    return {
+        "argv": list(argv),
+        "returncode": proc.returncode,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(import_us / 1000, 1),
+        "heavy": sorted(modules.intersection(HEAVY_MODULES)),
+    }
+
+
+def check_startup(budget_ms=100.0):
+    """
+    Times the offline commands and fails if any imports a heavy module or spends more
+    than budget_ms importing modules.
+
+    Returns:
+        int: 0 when every command passed, 1 otherwise.
+    """
+    import tempfile
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="netops-startup-") as directory:
+        before, after = _write_sample_snapshots(directory)
+        runs = [["--help"]]
+        for words in OFFLINE_COMMANDS:
+            runs.append(list(words) + ["--help"])
+        runs.append(["bgp", "diff", "--before", before, "--after", after])
+
+        for argv in runs:
+            result = measure_startup(argv)
+            label = " ".join(a if not os.path.isabs(a) else os.path.basename(a) for a in argv)
+            problems = []
+            if result["returncode"] != 0:
+                problems.append(f"exit code {result['returncode']}")
+            if result["heavy"]:
+                problems.append(f"imported {', '.join(result['heavy'])}")
+            if result["import_ms"] > budget_ms:
+                problems.append(f"imports took {result['import_ms']}ms (budget {budget_ms}ms)")
+
+            status = "❌" if problems else "✅"
+            line = f"{status} {label:<48} imports {result['import_ms']:>7.1f}ms  wall {result['wall_ms']:>7.1f}ms"
+            if problems:
+                line += "  (" + "; ".join(problems) + ")"
+                failures += 1
+            print(line)
+
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return 0
+
+    if argv[0] == "check-startup":
+        import argparse
+        parser = argparse.ArgumentParser(prog="netops.py check-startup",
+                                         description="Import-time regression check for offline commands.")
+        parser.add_argument("--budget-ms", type=float, default=100.0,
+                            help="Maximum milliseconds an offline command may spend importing modules")
+        args = parser.parse_args(argv[1:])
+        return check_startup(args.budget_ms)
+
+    words, rest = resolve(argv)
+    if words is None:
+        print(f"[!] Unknown command: {' '.join(argv[:2])}\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        return 2
+
+    return run_command(words, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)